@@ -1,6 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 
 from app.api.dependencies import DBDep, UserIdDep
+from app.api.idempotency import IdempotencyKeyDep, idempotent
+from app.exceptions.base import ObjectNotFoundError
 from app.schemes.cart import CartItemAdd, CartItemUpdate, CartGet
 from app.services.cart import CartService
 
@@ -18,52 +20,89 @@ async def get_cart(
 @router.post("/items", summary="Добавление товара в корзину")
 async def add_to_cart(
     db: DBDep,
+    request: Request,
     user_id: UserIdDep,
     cart_item: CartItemAdd,
+    idempotency_key: IdempotencyKeyDep = None,
 ) -> dict[str, str]:
-    try:
-        await CartService(db).add_item(user_id, cart_item)
-    except ObjectNotFoundError:
-        raise HTTPException(status_code=404, detail="Товар не найден")
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async def handler():
+        try:
+            await CartService(db).add_item(user_id, cart_item)
+        except ObjectNotFoundError:
+            raise HTTPException(status_code=404, detail="Товар не найден")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {"status": "OK"}
     
-    return {"status": "OK"}
+    return await idempotent(db, request, user_id, idempotency_key, cart_item.model_dump(), handler)
 
 
 @router.put("/items/{item_id}", summary="Обновление количества товара в корзине")
 async def update_cart_item(
     db: DBDep,
+    request: Request,
     user_id: UserIdDep,
     item_id: int,
     cart_item: CartItemUpdate,
+    idempotency_key: IdempotencyKeyDep = None,
 ) -> dict[str, str]:
-    try:
-        await CartService(db).update_item(user_id, item_id, cart_item.quantity)
-    except ObjectNotFoundError:
-        raise HTTPException(status_code=404, detail="Товар не найден в корзине")
+    async def handler():
+        try:
+            await CartService(db).update_item(user_id, item_id, cart_item.quantity)
+        except ObjectNotFoundError:
+            raise HTTPException(status_code=404, detail="Товар не найден в корзине")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {"status": "OK"}
     
-    return {"status": "OK"}
+    return await idempotent(db, request, user_id, idempotency_key, cart_item.model_dump(), handler)
 
 
 @router.delete("/items/{item_id}", summary="Удаление товара из корзины")
 async def remove_from_cart(
     db: DBDep,
+    request: Request,
     user_id: UserIdDep,
     item_id: int,
+    idempotency_key: IdempotencyKeyDep = None,
 ) -> dict[str, str]:
+    async def handler():
+        try:
+            await CartService(db).remove_item(user_id, item_id)
+        except ObjectNotFoundError:
+            raise HTTPException(status_code=404, detail="Товар не найден в корзине")
+        
+        return {"status": "OK"}
+    
+    return await idempotent(db, request, user_id, idempotency_key, None, handler)
+
+
+@router.post("/checkout", summary="Начало оформления заказа: удержание товаров корзины")
+async def start_checkout(
+    db: DBDep,
+    user_id: UserIdDep,
+) -> dict[str, str | int]:
     try:
-        await CartService(db).remove_item(user_id, item_id)
+        expires_in = await CartService(db).start_checkout(user_id)
     except ObjectNotFoundError:
-        raise HTTPException(status_code=404, detail="Товар не найден в корзине")
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {"status": "OK"}
+    return {"status": "OK", "expires_in": expires_in}
 
 
 @router.delete("/", summary="Очистка корзины")
 async def clear_cart(
     db: DBDep,
+    request: Request,
     user_id: UserIdDep,
+    idempotency_key: IdempotencyKeyDep = None,
 ) -> dict[str, str]:
-    await CartService(db).clear_cart(user_id)
-    return {"status": "OK"}
\ No newline at end of file
+    async def handler():
+        await CartService(db).clear_cart(user_id)
+        return {"status": "OK"}
+    
+    return await idempotent(db, request, user_id, idempotency_key, None, handler)
\ No newline at end of file
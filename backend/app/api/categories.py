@@ -1,9 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request, Response
 
 from app.api.dependencies import DBDep
-from app.exceptions.base import ObjectNotFoundError, ObjectNotFoundHTTPError
-from app.schemes.categories import CategoryCreate, CategoryUpdate, CategoryGetWithChildren
+from app.exceptions.base import ObjectAlreadyExistsError, ObjectNotFoundError, ObjectNotFoundHTTPError
+from app.schemes.categories import CategoryCreate, CategoryUpdate, CategoryGet, CategoryGetWithChildren
 from app.services.categories import CategoriesService
+from app.utils.http_cache import conditional_response, make_etag
 
 router = APIRouter(prefix="/categories", tags=["Категории"])
 
@@ -11,8 +12,18 @@ router = APIRouter(prefix="/categories", tags=["Категории"])
 @router.get("/", summary="Получение дерева категорий")
 async def get_categories_tree(
     db: DBDep,
+    request: Request,
+    response: Response,
 ) -> list[CategoryGetWithChildren]:
-    return await CategoriesService(db).get_tree()
+    service = CategoriesService(db)
+    updated_at, category_count = await service.get_tree_version()
+    if updated_at is not None:
+        not_modified = conditional_response(
+            request, response, make_etag("categories", updated_at, category_count), updated_at
+        )
+        if not_modified is not None:
+            return not_modified
+    return await service.get_tree()
 
 
 @router.get("/{category_id}", summary="Получение информации о категории")
@@ -26,6 +37,17 @@ async def get_category(
         raise ObjectNotFoundHTTPError
 
 
+@router.get("/{category_id}/breadcrumbs", summary="Путь от корня до категории")
+async def get_breadcrumbs(
+    db: DBDep,
+    category_id: int,
+) -> list[CategoryGet]:
+    try:
+        return await CategoriesService(db).get_breadcrumbs(category_id)
+    except ObjectNotFoundError:
+        raise ObjectNotFoundHTTPError
+
+
 @router.post("/", summary="Создание новой категории")
 async def create_category(
     db: DBDep,
@@ -49,5 +71,7 @@ async def update_category(
         await CategoriesService(db).update_category(category_id, category_data)
     except ObjectNotFoundError:
         raise ObjectNotFoundHTTPError
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {"status": "OK"}
\ No newline at end of file
@@ -0,0 +1,78 @@
+from typing import Annotated, Any, Awaitable, Callable
+
+from fastapi import Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+
+from app.database.db_manager import DBManager
+from app.exceptions.idempotency import (
+    IdempotencyKeyInProgressError,
+    IdempotencyKeyInProgressHTTPError,
+    IdempotencyKeyReusedError,
+    IdempotencyKeyReusedHTTPError,
+)
+from app.services.idempotency import IdempotencyService
+from app.utils.serialization import FastJSONResponse
+
+IdempotencyKeyDep = Annotated[
+    str | None,
+    Header(
+        alias="Idempotency-Key",
+        min_length=1,
+        max_length=255,
+        description="Ключ идемпотентности: повтор запроса с тем же ключом вернет первый ответ",
+    ),
+]
+
+
+async def idempotent(
+    db: DBManager,
+    request: Request,
+    user_id: int,
+    key: str | None,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Выполняет обработчик запроса не больше одного раза на ключ.
+    Изменения обработчика и его успешный ответ фиксируются одной
+    транзакцией; ошибки 4xx тоже сохраняются. Сохраненный ответ
+    возвращается повторам с заголовком Idempotent-Replayed; после сбоя
+    (5xx) ключ освобождается. Без ключа обработчик просто выполняется
+    """
+    if key is None:
+        return await handler()
+    
+    service = IdempotencyService(db)
+    try:
+        claim = await service.begin(user_id, key, f"{request.method} {request.url.path}", payload)
+    except IdempotencyKeyInProgressError:
+        raise IdempotencyKeyInProgressHTTPError
+    except IdempotencyKeyReusedError:
+        raise IdempotencyKeyReusedHTTPError
+    if isinstance(claim, tuple):
+        status_code, body = claim
+        return FastJSONResponse(body, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+    
+    # Запись блокировки заодно начинает транзакцию до первой точки
+    # сохранения (см. DBManager.single_transaction)
+    try:
+        await service.lock(user_id, key, claim)
+    except IdempotencyKeyInProgressError:
+        await db.rollback()
+        raise IdempotencyKeyInProgressHTTPError
+    
+    try:
+        async with db.single_transaction():
+            result = await handler()
+            await service.complete(user_id, key, claim, 200, jsonable_encoder(result))
+    except HTTPException as ex:
+        # Изменения неудачного запроса откачены вместе с транзакцией
+        if ex.status_code >= 500:
+            await service.abandon(user_id, key, claim)
+        else:
+            await service.complete(user_id, key, claim, ex.status_code, {"detail": ex.detail})
+        raise
+    except Exception:
+        await service.abandon(user_id, key, claim)
+        raise
+    return result
@@ -1,15 +1,39 @@
-from fastapi import APIRouter, Query
+import io
+
+from fastapi import APIRouter, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
 from app.api.dependencies import DBDep, UserIdDep, PaginationDep
-from app.exceptions.base import ObjectNotFoundError, ObjectNotFoundHTTPError
+from app.exceptions.base import (
+    InvalidFieldsError,
+    InvalidFieldsHTTPError,
+    ObjectAlreadyExistsError,
+    ObjectNotFoundError,
+    ObjectNotFoundHTTPError,
+)
+from app.config import settings
+from app.exceptions.items import (
+    InvalidCursorError,
+    InvalidCursorHTTPError,
+    InvalidImportFileError,
+    InvalidImportFileHTTPError,
+    InvalidItemIdsError,
+    InvalidItemIdsHTTPError,
+    InvalidSpecFilterError,
+    InvalidSpecFilterHTTPError,
+)
 from app.schemes.items import (
     ItemCreate, 
     ItemUpdate, 
     ItemGetWithRelations,
     ItemSearchParams
 )
-from app.services.items import ItemsService
+from app.services.items import ItemsService, search_cache
+from app.utils.catalog_import import detect_format, iter_import_rows
+from app.utils.export import EXPORT_MEDIA_TYPES
+from app.utils.http_cache import conditional_response, make_etag
+from app.utils.serialization import json_response
 
 router = APIRouter(prefix="/items", tags=["Товары"])
 
@@ -17,14 +41,33 @@ router = APIRouter(prefix="/items", tags=["Товары"])
 @router.get("/", summary="Поиск и фильтрация товаров")
 async def search_items(
     db: DBDep,
-    name: Optional[str] = Query(None, description="Название товара"),
+    request: Request,
+    response: Response,
+    name: Optional[str] = Query(
+        None, description="Поисковая строка: название, артикул, бренд, описание"
+    ),
     category_id: Optional[int] = Query(None, description="ID категории"),
     brand_id: Optional[int] = Query(None, description="ID бренда"),
     min_price: Optional[int] = Query(None, ge=0, description="Минимальная цена"),
     max_price: Optional[int] = Query(None, ge=0, description="Максимальная цена"),
     in_stock: Optional[bool] = Query(None, description="В наличии"),
-    sort_by: Optional[str] = Query("created_at", description="Сортировка по"),
+    spec: Optional[list[str]] = Query(
+        None, description="Фильтр по характеристике в ее единицах: RAM>=16 (можно несколько)"
+    ),
+    sort_by: Optional[str] = Query(
+        "created_at", description="Сортировка по: price, name, created_at, rating, relevance"
+    ),
     sort_order: Optional[str] = Query("desc", description="Порядок сортировки"),
+    cursor: Optional[str] = Query(
+        None, description="Курсор следующей страницы (pagination.next_cursor)"
+    ),
+    approximate_total: bool = Query(
+        False, description="Приблизительное общее количество (быстрее для широких фильтров)"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Только эти поля товара через запятую: id,name,price"
+    ),
+    view: Optional[str] = Query(None, description="Набор полей: card или full"),
     pagination: PaginationDep = None,
 ) -> dict:
     search_params = ItemSearchParams(
@@ -34,25 +77,148 @@ async def search_items(
         min_price=min_price,
         max_price=max_price,
         in_stock=in_stock,
+        specs=spec,
         sort_by=sort_by,
         sort_order=sort_order,
     )
     
-    result = await ItemsService(db).search_items(
-        search_params,
-        page=pagination.page,
-        per_page=pagination.per_page
+    # Любое изменение каталога меняет ETag всех списков
+    service = ItemsService(db)
+    version = await service.get_catalog_version()
+    not_modified = conditional_response(
+        request, response, make_etag("items", version, str(request.query_params))
+    )
+    if not_modified is not None:
+        return not_modified
+    
+    try:
+        result = await service.search_items(
+            search_params,
+            page=pagination.page,
+            per_page=pagination.per_page,
+            cursor=cursor,
+            approximate_total=approximate_total,
+            fields=fields,
+            view=view,
+        )
+    except InvalidCursorError:
+        raise InvalidCursorHTTPError
+    except InvalidFieldsError:
+        raise InvalidFieldsHTTPError
+    except InvalidSpecFilterError:
+        raise InvalidSpecFilterHTTPError
+    return json_response(result, response)
+
+
+@router.get("/facets", summary="Счетчики фасетов для текущих фильтров")
+async def get_facets(
+    db: DBDep,
+    response: Response,
+    name: Optional[str] = Query(
+        None, description="Поисковая строка: название, артикул, бренд, описание"
+    ),
+    category_id: Optional[int] = Query(None, description="ID категории"),
+    brand_id: Optional[int] = Query(None, description="ID бренда"),
+    min_price: Optional[int] = Query(None, ge=0, description="Минимальная цена"),
+    max_price: Optional[int] = Query(None, ge=0, description="Максимальная цена"),
+    in_stock: Optional[bool] = Query(None, description="В наличии"),
+    spec: Optional[list[str]] = Query(
+        None, description="Фильтр по характеристике в ее единицах: RAM>=16 (можно несколько)"
+    ),
+) -> dict:
+    search_params = ItemSearchParams(
+        name=name,
+        category_id=category_id,
+        brand_id=brand_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        specs=spec,
+    )
+    
+    try:
+        result = await ItemsService(db).get_facets(search_params)
+    except InvalidSpecFilterError:
+        raise InvalidSpecFilterHTTPError
+    response.headers["Cache-Control"] = f"public, max-age={settings.FACETS_MAX_AGE}"
+    return json_response(result, response)
+
+
+@router.get("/suggest", summary="Подсказки для строки поиска")
+async def suggest(
+    db: DBDep,
+    q: str = Query(..., min_length=1, max_length=100, description="Начало слова из названия"),
+    limit: int = Query(settings.SUGGEST_LIMIT, ge=1, le=20, description="Подсказок каждого вида"),
+) -> dict:
+    return json_response(await ItemsService(db).suggest(q, limit))
+
+
+@router.get("/batch", summary="Несколько товаров по списку id")
+async def get_items_batch(
+    db: DBDep,
+    ids: str = Query(
+        ..., description=f"id товаров через запятую, не больше {settings.BATCH_MAX_ITEMS}"
+    ),
+) -> dict:
+    try:
+        return json_response(await ItemsService(db).get_items_batch(ids))
+    except InvalidItemIdsError:
+        raise InvalidItemIdsHTTPError
+
+
+@router.get("/export", summary="Выгрузка всего каталога (для продавца и администратора)")
+async def export_items(
+    db: DBDep,
+    user_id: UserIdDep,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson или csv"),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Продолжить выгрузку после товара с этим id"
+    ),
+) -> StreamingResponse:
+    # Проверяем, что пользователь является продавцом или администратором
+    user = await db.users.get_one_or_none_with_role(id=user_id)
+    if not user or user.role.name not in ("seller", "admin"):
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    return StreamingResponse(
+        ItemsService(db).export_items(format, after_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="catalog.{format}"'},
     )
-    return result
+
+
+@router.get("/cache-stats", summary="Статистика кэша поиска (для администраторов)")
+async def get_cache_stats(
+    db: DBDep,
+    user_id: UserIdDep,
+) -> dict:
+    # Проверяем, что пользователь является администратором
+    user = await db.users.get_one_or_none_with_role(id=user_id)
+    if not user or user.role.name != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    return search_cache.stats()
 
 
 @router.get("/{item_id}", summary="Получение информации о товаре")
 async def get_item(
     db: DBDep,
+    request: Request,
+    response: Response,
     item_id: int,
 ) -> ItemGetWithRelations:
+    service = ItemsService(db)
     try:
-        return await ItemsService(db).get_item(item_id)
+        updated_at, specification_count = await service.get_item_version(item_id)
+        not_modified = conditional_response(
+            request,
+            response,
+            make_etag("item", item_id, updated_at, specification_count),
+            updated_at,
+        )
+        if not_modified is not None:
+            return not_modified
+        return json_response(await service.get_item(item_id), response)
     except ObjectNotFoundError:
         raise ObjectNotFoundHTTPError
 
@@ -78,6 +244,30 @@ async def create_item(
     return {"status": "OK"}
 
 
+@router.post("/import", summary="Массовая загрузка товаров из CSV или NDJSON (для продавца и администратора)")
+async def import_items(
+    db: DBDep,
+    user_id: UserIdDep,
+    file: UploadFile = File(..., description="Файл в формате выгрузки /items/export"),
+    format: Optional[str] = Query(
+        None, pattern="^(ndjson|csv)$", description="ndjson или csv; по умолчанию по расширению файла"
+    ),
+) -> dict:
+    # Проверяем, что пользователь является продавцом или администратором
+    user = await db.users.get_one_or_none_with_role(id=user_id)
+    if not user or user.role.name not in ("seller", "admin"):
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    import_format = format or detect_format(file.filename)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return await ItemsService(db).import_items(iter_import_rows(stream, import_format))
+    except InvalidImportFileError:
+        raise InvalidImportFileHTTPError
+    finally:
+        stream.detach()
+
+
 @router.put("/{item_id}", summary="Обновление товара (для продавца)")
 async def update_item(
     db: DBDep,
@@ -94,6 +284,8 @@ async def update_item(
         await ItemsService(db).update_item(item_id, item_data)
     except ObjectNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {"status": "OK"}
 
@@ -1,8 +1,14 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
 
 from app.api.dependencies import DBDep, UserIdDep, PaginationDep
-from app.schemes.orders import OrderCreate, OrderGet
+from app.api.idempotency import IdempotencyKeyDep, idempotent
+from app.config import settings
+from app.exceptions.base import InvalidFieldsError, InvalidFieldsHTTPError, ObjectNotFoundError
+from app.schemes.orders import OrderCreate, OrderGet, OrdersCancel
 from app.services.orders import OrdersService
+from app.utils.serialization import json_response
 
 router = APIRouter(prefix="/orders", tags=["Заказы"])
 
@@ -11,29 +17,90 @@ router = APIRouter(prefix="/orders", tags=["Заказы"])
 async def get_orders(
     db: DBDep,
     user_id: UserIdDep,
+    fields: Optional[str] = Query(
+        None, description="Только эти поля заказа через запятую: id,status,total_amount"
+    ),
+    view: Optional[str] = Query(None, description="Набор полей: summary или full"),
     pagination: PaginationDep = None,
 ) -> dict:
-    return await OrdersService(db).get_user_orders(
-        user_id, 
-        page=pagination.page, 
-        per_page=pagination.per_page
-    )
+    try:
+        result = await OrdersService(db).get_user_orders(
+            user_id, 
+            page=pagination.page, 
+            per_page=pagination.per_page,
+            fields=fields,
+            view=view,
+        )
+    except InvalidFieldsError:
+        raise InvalidFieldsHTTPError
+    return json_response(result)
 
 
 @router.post("/", summary="Создание нового заказа")
 async def create_order(
     db: DBDep,
+    request: Request,
     user_id: UserIdDep,
     order_data: OrderCreate,
+    idempotency_key: IdempotencyKeyDep = None,
+) -> dict[str, str | int]:
+    async def handler():
+        try:
+            # В режиме очереди заказ создаст фоновый обработчик, клиент
+            # опрашивает статус заявки: GET /orders/checkout/{checkout_id}
+            if settings.CHECKOUT_QUEUE_ENABLED:
+                checkout_id = await OrdersService(db).enqueue_order(user_id, order_data)
+                return {"status": "queued", "checkout_id": checkout_id}
+            order_id = await OrdersService(db).create_order(user_id, order_data)
+        except ObjectNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {"status": "OK", "order_id": order_id}
+    
+    return await idempotent(db, request, user_id, idempotency_key, order_data.model_dump(), handler)
+
+
+@router.post("/cancel", summary="Массовая отмена заказов (для администраторов)")
+async def cancel_orders(
+    db: DBDep,
+    user_id: UserIdDep,
+    data: OrdersCancel,
+) -> dict[str, list[int]]:
+    user = await db.users.get_one_or_none_with_role(id=user_id)
+    if not user or user.role.name != "admin":
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    
+    return await OrdersService(db).cancel_orders(data.order_ids)
+
+
+@router.post("/{order_id}/cancel", summary="Отмена заказа")
+async def cancel_order(
+    db: DBDep,
+    user_id: UserIdDep,
+    order_id: int,
 ) -> dict[str, str]:
     try:
-        order_id = await OrdersService(db).create_order(user_id, order_data)
+        await OrdersService(db).cancel_order(user_id, order_id)
     except ObjectNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    return {"status": "OK", "order_id": order_id}
+    return {"status": "OK"}
+
+
+@router.get("/checkout/{checkout_id}", summary="Статус заявки на оформление из очереди")
+async def get_checkout_request(
+    db: DBDep,
+    user_id: UserIdDep,
+    checkout_id: int,
+) -> dict[str, str | int | None]:
+    try:
+        return await OrdersService(db).get_checkout_request(user_id, checkout_id)
+    except ObjectNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @router.get("/{order_id}", summary="Получение информации о заказе")
@@ -25,6 +25,67 @@ class Settings(BaseSettings):
     # Настройки приложения
     PAGE_SIZE: int = 20
     MAX_COMPARISON_ITEMS: int = 5
+    # Не больше стольких товаров в одном запросе /items/batch
+    BATCH_MAX_ITEMS: int = 50
+    # Товаров в одной пачке выгрузки каталога
+    EXPORT_CHUNK_SIZE: int = 1000
+    # Строк в одной пачке импорта каталога и потолок ошибок в отчете импорта
+    IMPORT_CHUNK_SIZE: int = 2000
+    IMPORT_MAX_ERRORS: int = 1000
+    # Удержание товара в корзине и на оформлении заказа, секунды
+    RESERVATION_CART_TTL: int = 1800
+    RESERVATION_CHECKOUT_TTL: int = 900
+    # Как часто снимаются истекшие удержания и сколько за одну транзакцию
+    RESERVATION_SWEEP_INTERVAL: float = 30
+    RESERVATION_SWEEP_BATCH: int = 500
+    # Сколько хранится ответ на запрос с Idempotency-Key, секунды
+    IDEMPOTENCY_KEY_TTL: int = 86400
+    # Аренда ключа на время выполнения запроса, секунды: после сбоя процесса
+    # ключ снова можно занять по ее истечении
+    IDEMPOTENCY_LEASE_TTL: int = 60
+    # Как часто удаляются истекшие ключи и сколько за одну транзакцию
+    IDEMPOTENCY_PRUNE_INTERVAL: float = 600
+    IDEMPOTENCY_PRUNE_BATCH: int = 1000
+    # Очередь оформления заказов: POST /orders ставит заявку, заказы создают
+    # фоновые обработчики пачками (для пиковых распродаж)
+    CHECKOUT_QUEUE_ENABLED: bool = False
+    CHECKOUT_WORKERS: int = 4
+    CHECKOUT_BATCH_SIZE: int = 20
+    # Как часто обработчик проверяет очередь, если его не разбудили, секунды
+    CHECKOUT_POLL_INTERVAL: float = 0.5
+    # Повтор оформления и отмены заказа при deadlock / serialization failure:
+    # число попыток и границы случайной паузы между ними, секунды
+    ORDER_RETRY_ATTEMPTS: int = 5
+    ORDER_RETRY_BASE_DELAY: float = 0.01
+    ORDER_RETRY_MAX_DELAY: float = 0.5
+    # Горячий слой корзин в памяти с отложенной записью в БД (write-behind),
+    # см. app/utils/cart_store.py
+    CART_STORE_ENABLED: bool = False
+    # Как часто изменения корзин сбрасываются в БД, секунды: столько
+    # изменений может потеряться при аварийном завершении процесса
+    CART_STORE_FLUSH_INTERVAL: float = 1
+    # Позиций в одной транзакции сброса и корзин в памяти
+    CART_STORE_FLUSH_BATCH: int = 1000
+    CART_STORE_MAX_CARTS: int = 100000
+    # Потолок приблизительного подсчета результатов поиска
+    SEARCH_COUNT_CAP: int = 10000
+    # Нижние границы ценовых диапазонов фасетного поиска
+    FACET_PRICE_BOUNDS: list[int] = [0, 1000, 5000, 10000, 30000, 50000, 100000]
+    # Время кэширования фасетов клиентом и прокси, секунды
+    FACETS_MAX_AGE: int = 60
+    # Кэш результатов поиска: время жизни записи (секунды) и объем записей
+    # по длине их JSON, байты (в памяти объекты занимают в несколько раз больше)
+    SEARCH_CACHE_TTL: float = 30
+    SEARCH_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # Колоночный снимок каталога в памяти (нужен numpy), интервалы в секундах
+    CATALOG_SNAPSHOT_ENABLED: bool = False
+    CATALOG_SNAPSHOT_REFRESH_INTERVAL: float = 5
+    CATALOG_SNAPSHOT_FULL_RELOAD_INTERVAL: float = 600
+    CATALOG_SNAPSHOT_OVERLAP: float = 60
+    # Подсказки строки поиска: число подсказок каждого вида и интервал
+    # полной перезагрузки индекса, секунды
+    SUGGEST_LIMIT: int = 8
+    SUGGEST_RELOAD_INTERVAL: float = 300
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -1,41 +1,84 @@
-from app.database.database import async_session_maker
-from app.repositories.roles import RolesRepository
-from app.repositories.users import UsersRepository
-from app.repositories.items import ItemsRepository
-from app.repositories.categories import CategoriesRepository
-from app.repositories.brands import BrandsRepository
-from app.repositories.orders import OrdersRepository
-from app.repositories.order_items import OrderItemsRepository
-from app.repositories.cart_items import CartItemsRepository
-from app.repositories.comparisons import ComparisonsRepository, ComparisonItemsRepository
-from app.repositories.reviews import ReviewsRepository
-
-
-class DBManager:
-    def __init__(self, session_factory: async_session_maker):
-        self.session_factory = session_factory
-
-    async def __aenter__(self):
-        self.session = self.session_factory()
-        
-        # Подключаем все репозитории
-        self.users = UsersRepository(self.session)
-        self.roles = RolesRepository(self.session)
-        self.items = ItemsRepository(self.session)
-        self.categories = CategoriesRepository(self.session)
-        self.brands = BrandsRepository(self.session)
-        self.orders = OrdersRepository(self.session)
-        self.order_items = OrderItemsRepository(self.session)
-        self.cart_items = CartItemsRepository(self.session)
-        self.comparisons = ComparisonsRepository(self.session)
-        self.comparison_items = ComparisonItemsRepository(self.session)
-        self.reviews = ReviewsRepository(self.session)
-        
-        return self
-
-    async def __aexit__(self, *args):
-        await self.session.rollback()
-        await self.session.close()
-
-    async def commit(self):
-        await self.session.commit()
\ No newline at end of file
+from contextlib import asynccontextmanager
+
+from app.database.database import async_session_maker
+from app.repositories.roles import RolesRepository
+from app.repositories.users import UsersRepository
+from app.repositories.item import ItemsRepository
+from app.repositories.categories import CategoriesRepository
+from app.repositories.brands import BrandsRepository
+from app.repositories.orders import OrdersRepository
+from app.repositories.order_items import OrderItemsRepository
+from app.repositories.cart_items import CartItemsRepository
+from app.repositories.checkout_requests import CheckoutRequestsRepository
+from app.repositories.comparisons import ComparisonsRepository, ComparisonItemsRepository
+from app.repositories.idempotency_keys import IdempotencyKeysRepository
+from app.repositories.reservations import ReservationsRepository
+from app.repositories.reviews import ReviewsRepository
+from app.repositories.specifications import SpecificationsRepository
+
+
+class DBManager:
+    def __init__(self, session_factory: async_session_maker):
+        self.session_factory = session_factory
+
+    async def __aenter__(self):
+        self.session = self.session_factory()
+        self._savepoint = None
+        
+        # Подключаем все репозитории
+        self.users = UsersRepository(self.session)
+        self.roles = RolesRepository(self.session)
+        self.items = ItemsRepository(self.session)
+        self.categories = CategoriesRepository(self.session)
+        self.brands = BrandsRepository(self.session)
+        self.orders = OrdersRepository(self.session)
+        self.order_items = OrderItemsRepository(self.session)
+        self.cart_items = CartItemsRepository(self.session)
+        self.comparisons = ComparisonsRepository(self.session)
+        self.comparison_items = ComparisonItemsRepository(self.session)
+        self.reviews = ReviewsRepository(self.session)
+        self.specifications = SpecificationsRepository(self.session)
+        self.reservations = ReservationsRepository(self.session)
+        self.idempotency_keys = IdempotencyKeysRepository(self.session)
+        self.checkout_requests = CheckoutRequestsRepository(self.session)
+        
+        return self
+
+    async def __aexit__(self, *args):
+        await self.session.rollback()
+        await self.session.close()
+
+    async def commit(self):
+        if self._savepoint is not None:
+            await self._savepoint.commit()
+            self._savepoint = await self.session.begin_nested()
+            return
+        await self.session.commit()
+
+    async def rollback(self):
+        if self._savepoint is not None:
+            await self._savepoint.rollback()
+            self._savepoint = await self.session.begin_nested()
+            return
+        await self.session.rollback()
+
+    @asynccontextmanager
+    async def single_transaction(self):
+        """
+        Все изменения блока фиксируются одной транзакцией при выходе из него.
+        commit() и rollback() внутри блока работают с точкой сохранения
+        (SAVEPOINT): фиксируют сделанное с прошлого коммита или откатывают
+        только его. Исключение из блока откатывает транзакцию целиком.
+        В SQLite транзакция должна быть уже начата записью до входа в блок:
+        драйвер не начинает ее перед SAVEPOINT
+        """
+        self._savepoint = await self.session.begin_nested()
+        try:
+            yield
+            await self._savepoint.commit()
+            self._savepoint = None
+            await self.session.commit()
+        except BaseException:
+            self._savepoint = None
+            await self.session.rollback()
+            raise
\ No newline at end of file
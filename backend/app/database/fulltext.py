@@ -0,0 +1,168 @@
+"""
+Полнотекстовый поиск по товарам.
+
+PostgreSQL: колонка items.search_vector (tsvector) с GIN-индексом, которую
+заполняет триггер из названия, артикула, бренда и описания. Конфигурация
+russian стеммит русские слова, а латиницу - английским стеммером.
+SQLite: виртуальная таблица FTS5 items_fts, синхронизируемая триггерами,
+чтобы поиск работал в локальной БД и тестах.
+"""
+import re
+
+from sqlalchemy import DDL, column, event, func, literal, literal_column, select, table
+
+# Не больше стольких слов из поисковой строки попадает в запрос
+MAX_SEARCH_TOKENS = 8
+
+items_fts = table("items_fts", column("rowid"))
+
+# Артикул индексируется по частям: парсер PostgreSQL читает "SKU-12" как
+# слово и отрицательное число "-12", и поиск "sku 12" его бы не нашел
+ITEMS_SEARCH_VECTOR_FUNCTION = """
+    CREATE OR REPLACE FUNCTION items_search_vector_update() RETURNS trigger AS $$
+    DECLARE
+        brand_name text;
+    BEGIN
+        SELECT name INTO brand_name FROM brands WHERE id = NEW.brand_id;
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector(
+                'simple', regexp_replace(coalesce(NEW.sku, ''), '[^[:alnum:]]+', ' ', 'g')
+            ), 'A') ||
+            setweight(to_tsvector('simple', coalesce(brand_name, '')), 'B') ||
+            setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+POSTGRESQL_DDL = [
+    ITEMS_SEARCH_VECTOR_FUNCTION,
+    """
+    CREATE TRIGGER items_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, sku, description, brand_id ON items
+    FOR EACH ROW EXECUTE FUNCTION items_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION brands_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE items SET brand_id = brand_id WHERE brand_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS brands_search_vector_trigger ON brands",
+    """
+    CREATE TRIGGER brands_search_vector_trigger
+    AFTER UPDATE OF name ON brands
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION brands_search_vector_update()
+    """,
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        name, sku, brand, description,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts (rowid, name, sku, brand, description)
+        VALUES (
+            new.id, new.name, new.sku,
+            (SELECT name FROM brands WHERE id = new.brand_id), new.description
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_update AFTER UPDATE OF name, sku, description, brand_id ON items
+    BEGIN
+        DELETE FROM items_fts WHERE rowid = old.id;
+        INSERT INTO items_fts (rowid, name, sku, brand, description)
+        VALUES (
+            new.id, new.name, new.sku,
+            (SELECT name FROM brands WHERE id = new.brand_id), new.description
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN
+        DELETE FROM items_fts WHERE rowid = old.id;
+    END
+    """,
+    "DROP TRIGGER IF EXISTS brands_fts_update",
+    """
+    CREATE TRIGGER brands_fts_update AFTER UPDATE OF name ON brands BEGIN
+        UPDATE items_fts SET brand = new.name
+        WHERE rowid IN (SELECT id FROM items WHERE brand_id = new.id);
+    END
+    """,
+]
+
+
+def register_fulltext_ddl(items_table) -> None:
+    """Создает поисковые триггеры и таблицы вместе с таблицей items (create_all)"""
+    for statement in POSTGRESQL_DDL:
+        event.listen(
+            items_table, "after_create", DDL(statement).execute_if(dialect="postgresql")
+        )
+    for statement in SQLITE_DDL:
+        event.listen(
+            items_table, "after_create", DDL(statement).execute_if(dialect="sqlite")
+        )
+    event.listen(
+        items_table,
+        "before_drop",
+        DDL("DROP TABLE IF EXISTS items_fts").execute_if(dialect="sqlite"),
+    )
+
+
+def search_tokens(search_text: str) -> list[str]:
+    """Слова поисковой строки; все прочие символы отбрасываются"""
+    return re.findall(r"\w+", search_text.lower())[:MAX_SEARCH_TOKENS]
+
+
+def _postgresql_query(tokens: list[str]):
+    """tsquery: каждое слово как префикс, слова объединяются через И"""
+    ts_query = None
+    for token in tokens:
+        prefix = f"{token}:*"
+        token_query = func.to_tsquery("russian", prefix).op("||")(
+            func.to_tsquery("simple", prefix)
+        )
+        ts_query = token_query if ts_query is None else ts_query.op("&&")(token_query)
+    return ts_query
+
+
+def _sqlite_match(tokens: list[str]):
+    """Условие FTS5 MATCH: префиксный поиск по каждому слову"""
+    expression = " ".join(f'"{token}"*' for token in tokens)
+    return literal_column("items_fts").op("MATCH")(expression)
+
+
+def match_clause(dialect_name: str, model, tokens: list[str]):
+    """Условие WHERE: товар подходит под все слова поисковой строки"""
+    if dialect_name == "postgresql":
+        return model.search_vector.op("@@")(_postgresql_query(tokens))
+    if dialect_name == "sqlite":
+        matched = select(items_fts.c.rowid).where(_sqlite_match(tokens))
+        return model.id.in_(matched)
+    # Для прочих СУБД остается поиск по подстроке в названии
+    return model.name.ilike(f"%{' '.join(tokens)}%")
+
+
+def rank_expression(dialect_name: str, model, tokens: list[str]):
+    """Релевантность товара запросу: чем больше, тем лучше"""
+    if dialect_name == "postgresql":
+        return func.ts_rank_cd(model.search_vector, _postgresql_query(tokens))
+    if dialect_name == "sqlite":
+        # bm25 возвращает отрицательные значения, лучшие совпадения - меньше
+        return (
+            select(-func.bm25(literal_column("items_fts"), 10.0, 10.0, 5.0, 1.0))
+            .select_from(items_fts)
+            .where(_sqlite_match(tokens), items_fts.c.rowid == model.id)
+            .scalar_subquery()
+        )
+    return literal(0.0)
@@ -0,0 +1,60 @@
+"""
+Повтор транзакций, прерванных конфликтом блокировок.
+
+PostgreSQL прерывает одну из транзакций взаимной блокировки (deadlock)
+и транзакции уровня SERIALIZABLE, которые нельзя упорядочить; SQLite
+отвечает "database is locked", если запись занята дольше таймаута.
+Такая транзакция ничего не изменила, ее можно откатить и выполнить заново.
+Пауза перед повтором растет экспоненциально и выбирается случайно
+(full jitter), чтобы столкнувшиеся транзакции не повторялись одновременно.
+"""
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLSTATE: serialization_failure, deadlock_detected
+RETRYABLE_SQLSTATES = ("40001", "40P01")
+
+
+def is_retryable(error: DBAPIError) -> bool:
+    """Прервана ли транзакция конфликтом, после которого ее можно повторить"""
+    sqlstate = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+    if sqlstate in RETRYABLE_SQLSTATES:
+        return True
+    return "database is locked" in str(error.orig)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Случайная пауза перед повтором номер attempt (с 1): от 0 до base_delay * 2^(attempt-1)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+async def run_with_retry(
+    db,
+    operation: Callable[[], Awaitable[T]],
+    attempts: int,
+    base_delay: float,
+    max_delay: float,
+) -> T:
+    """
+    Выполняет operation - транзакцию, которая сама фиксируется через
+    db.commit(). Если транзакция прервана конфликтом блокировок, она
+    откатывается и выполняется заново, всего не больше attempts раз.
+    Прочие ошибки и конфликт на последней попытке пробрасываются
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await operation()
+        except DBAPIError as e:
+            await db.rollback()
+            if attempt == attempts or not is_retryable(e):
+                raise
+            logger.info("Конфликт блокировок, повтор %s из %s: %s", attempt, attempts - 1, e.orig)
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
@@ -26,3 +26,12 @@ class ObjectAlreadyExistsError(MyAppError):
 
 class InvalidDateRangeError(MyAppError):
     detail = "Дата заезда не может быть позже даты выезда"
+
+
+class InvalidFieldsError(MyAppError):
+    detail = "Неизвестное поле или представление"
+
+
+class InvalidFieldsHTTPError(MyAppHTTPError):
+    status_code = 400
+    detail = "Неизвестное поле или представление в fields/view"
@@ -0,0 +1,19 @@
+from app.exceptions.base import MyAppError, MyAppHTTPError
+
+
+class IdempotencyKeyReusedError(MyAppError):
+    detail = "Ключ идемпотентности уже использован для другого запроса"
+
+
+class IdempotencyKeyReusedHTTPError(MyAppHTTPError):
+    status_code = 422
+    detail = "Ключ идемпотентности уже использован для другого запроса"
+
+
+class IdempotencyKeyInProgressError(MyAppError):
+    detail = "Запрос с этим ключом идемпотентности еще выполняется"
+
+
+class IdempotencyKeyInProgressHTTPError(MyAppHTTPError):
+    status_code = 409
+    detail = "Запрос с этим ключом идемпотентности еще выполняется, повторите позже"
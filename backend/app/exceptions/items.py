@@ -0,0 +1,37 @@
+from app.exceptions.base import MyAppError, MyAppHTTPError
+
+
+class InvalidCursorError(MyAppError):
+    detail = "Неверный курсор пагинации"
+
+
+class InvalidCursorHTTPError(MyAppHTTPError):
+    status_code = 400
+    detail = "Неверный курсор пагинации"
+
+
+class InvalidSpecFilterError(MyAppError):
+    detail = "Неверный фильтр по характеристике, ожидается вид RAM>=16"
+
+
+class InvalidSpecFilterHTTPError(MyAppHTTPError):
+    status_code = 400
+    detail = "Неверный фильтр по характеристике, ожидается вид RAM>=16"
+
+
+class InvalidItemIdsError(MyAppError):
+    detail = "Неверный список id товаров"
+
+
+class InvalidItemIdsHTTPError(MyAppHTTPError):
+    status_code = 400
+    detail = "Неверный список id товаров: ожидаются числа через запятую"
+
+
+class InvalidImportFileError(MyAppError):
+    detail = "Файл импорта не удалось прочитать"
+
+
+class InvalidImportFileHTTPError(MyAppHTTPError):
+    status_code = 400
+    detail = "Файл импорта не удалось прочитать: ожидается UTF-8 CSV или NDJSON"
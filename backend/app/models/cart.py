@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.database import Base
 
@@ -10,6 +10,10 @@ if TYPE_CHECKING:
 
 class CartItemModel(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # Одна строка на товар: добавление в корзину - INSERT ... ON CONFLICT
+        UniqueConstraint("user_id", "item_id", name="uq_cart_items_user_item"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     quantity: Mapped[int] = mapped_column(nullable=False, default=1)
     
@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING
-from sqlalchemy import String
+from sqlalchemy import ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.database import Base
 
@@ -16,4 +16,23 @@ class CategoryModel(Base):
     # Связи
     items: Mapped[list["ItemModel"]] = relationship(back_populates="category")
     children: Mapped[list["CategoryModel"]] = relationship(back_populates="parent")
-    parent: Mapped["CategoryModel"] = relationship(back_populates="children", remote_side=[id])
\ No newline at end of file
+    parent: Mapped["CategoryModel"] = relationship(back_populates="children", remote_side=[id])
+
+
+class CategoryClosureModel(Base):
+    """
+    Таблица замыкания иерархии категорий: строка на каждую пару
+    (предок, потомок), включая саму категорию с depth = 0.
+    Поддерживается CategoriesService при создании и перемещении категорий
+    """
+    __tablename__ = "category_closure"
+    __table_args__ = (
+        Index("ix_category_closure_descendant_depth", "descendant_id", "depth"),
+    )
+    ancestor_id: Mapped[int] = mapped_column(
+        ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[int] = mapped_column(
+        ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
+    )
+    depth: Mapped[int] = mapped_column(nullable=False)
\ No newline at end of file
@@ -0,0 +1,26 @@
+from sqlalchemy import JSON, ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.database import Base
+
+
+class CheckoutRequestModel(Base):
+    """
+    Заявка на оформление заказа в очереди (режим CHECKOUT_QUEUE_ENABLED).
+    Позиции корзины и цены фиксируются при постановке в очередь, заказ
+    создает фоновый обработчик: queued -> done (order_id) или failed (error)
+    """
+    __tablename__ = "checkout_requests"
+    __table_args__ = (
+        Index("ix_checkout_requests_status_id", "status", "id"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
+    shipping_address: Mapped[str] = mapped_column(String(500), nullable=False)
+    contact_phone: Mapped[str] = mapped_column(String(20), nullable=False)
+    notes: Mapped[str | None] = mapped_column(String(1000), nullable=True)
+    # Позиции: [{"item_id", "name", "price", "quantity"}]
+    lines: Mapped[list] = mapped_column(JSON, nullable=False)
+    error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    order_id: Mapped[int | None] = mapped_column(ForeignKey("orders.id"), nullable=True)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import JSON, ForeignKey, Index, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.database import Base
+
+
+class IdempotencyKeyModel(Base):
+    """
+    Ключ идемпотентности запроса (заголовок Idempotency-Key) и сохраненный
+    ответ на него. Пока запрос выполняется, status_code и response пустые
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Метод и путь запроса, например "POST /orders/"
+    scope: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Хэш тела запроса: повтор с тем же ключом должен совпадать с оригиналом
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int | None] = mapped_column(nullable=True)
+    response: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False)
+    
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -1,7 +1,9 @@
 from typing import TYPE_CHECKING
-from sqlalchemy import String, Text, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Float, Index, String, Text, ForeignKey, case
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
 from app.database.database import Base
+from app.database.fulltext import register_fulltext_ddl
 
 if TYPE_CHECKING:
     from app.models.categories import CategoryModel
@@ -14,14 +16,39 @@ if TYPE_CHECKING:
 
 class ItemModel(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # Индексы под keyset-пагинацию каталога: (ключ сортировки, id)
+        Index("ix_items_price_id", "price", "id"),
+        Index("ix_items_name_id", "name", "id"),
+        Index("ix_items_created_at_id", "created_at", "id"),
+        Index("ix_items_average_rating_id", "average_rating", "id"),
+        Index("ix_items_updated_at", "updated_at"),
+        Index("ix_items_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     sku: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)  # Артикул
     price: Mapped[int] = mapped_column(nullable=False)
     discount_price: Mapped[int | None] = mapped_column(nullable=True)  # Цена со скидкой
+    # Цена продажи: цена со скидкой, если она задана и ниже обычной
+    sale_price: Mapped[int] = column_property(
+        case((discount_price < price, discount_price), else_=price)
+    )
     quantity: Mapped[int] = mapped_column(nullable=False, default=0)
+    # Удержано покупателями (сумма stock_reservations.quantity)
+    reserved_quantity: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    # Доступно к продаже: остаток за вычетом удержаний
+    available_quantity: Mapped[int] = column_property(quantity - reserved_quantity)
     description: Mapped[str] = mapped_column(Text, nullable=True)
     main_image_url: Mapped[str] = mapped_column(String(500), nullable=True)
+    # Агрегаты одобренных отзывов, поддерживаются ReviewsService
+    average_rating: Mapped[float] = mapped_column(Float, nullable=False, default=0, server_default="0")
+    review_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    # Поисковый вектор, заполняется триггером (см. app/database/fulltext.py)
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR().with_variant(Text(), "sqlite"), nullable=True, deferred=True
+    )
     
     # Внешние ключи
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False)
@@ -34,5 +61,6 @@ class ItemModel(Base):
     order_items: Mapped[list["OrderItemModel"]] = relationship(back_populates="item")
     reviews: Mapped[list["ReviewModel"]] = relationship(back_populates="item")
     comparison_items: Mapped[list["ComparisonItemModel"]] = relationship(back_populates="item")
-    
-    # Вычисляемое свойство для среднего рейтинга (будет в сервисе)
\ No newline at end of file
+
+
+register_fulltext_ddl(ItemModel.__table__)
\ No newline at end of file
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import TYPE_CHECKING
+from sqlalchemy import ForeignKey, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.database.database import Base
+
+if TYPE_CHECKING:
+    from app.models.items import ItemModel
+
+
+class StockReservationModel(Base):
+    """
+    Временное удержание товара за покупателем (товар в корзине или на
+    оформлении). Сумма активных удержаний товара хранится в
+    items.reserved_quantity и меняется в той же транзакции, что и строки
+    этой таблицы; истекшие удержания снимает ReservationsService.release_expired.
+    Удержания заявки из очереди оформления (checkout_request_id) отделены
+    от корзины: не истекают и снимаются обработчиком заявки
+    """
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Одно удержание товара в корзине покупателя
+        Index(
+            "uq_stock_reservations_user_item",
+            "user_id",
+            "item_id",
+            unique=True,
+            postgresql_where=text("checkout_request_id IS NULL"),
+            sqlite_where=text("checkout_request_id IS NULL"),
+        ),
+        Index("ix_stock_reservations_expires_at", "expires_at"),
+        Index("ix_stock_reservations_checkout_request_id", "checkout_request_id"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    quantity: Mapped[int] = mapped_column(nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(nullable=False)
+    
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    item_id: Mapped[int] = mapped_column(ForeignKey("items.id", ondelete="CASCADE"), nullable=False)
+    checkout_request_id: Mapped[int | None] = mapped_column(
+        ForeignKey("checkout_requests.id"), nullable=True
+    )
+    
+    item: Mapped["ItemModel"] = relationship()
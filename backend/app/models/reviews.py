@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import Index, String, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.database import Base
 
@@ -9,6 +9,10 @@ if TYPE_CHECKING:
 
 class ReviewModel(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_item_id_status", "item_id", "status"),
+    )
+    
     id: Mapped[int] = mapped_column(primary_key=True)
     rating: Mapped[int] = mapped_column(nullable=False)
     description: Mapped[str] = mapped_column(String(500), nullable=False)
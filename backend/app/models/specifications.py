@@ -1,5 +1,5 @@
 from typing import TYPE_CHECKING
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import Float, Index, String, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.database import Base
 
@@ -10,8 +10,16 @@ if TYPE_CHECKING:
 
 class SpecificationModel(Base):
     __tablename__ = "specifications"
+    __table_args__ = (
+        # Диапазонные фильтры по характеристике; item_id делает индекс покрывающим
+        Index("ix_specifications_type_numeric_item", "specification_type_id", "numeric_value", "item_id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     value: Mapped[str] = mapped_column(String(500), nullable=False)
+    # Число из value в единицах типа характеристики (None, если значение не
+    # числовое). Разбирается при каждой записи через SpecificationsRepository;
+    # загруженные в обход приложения строки заполняет app.scripts.parse_spec_values
+    numeric_value: Mapped[float | None] = mapped_column(Float, nullable=True)
     
     item_id: Mapped[int] = mapped_column(ForeignKey("items.id"), nullable=False)
     specification_type_id: Mapped[int] = mapped_column(ForeignKey("specification_types.id"), nullable=False)
@@ -14,6 +14,11 @@ class BaseRepository:
     def __init__(self, session):
         self.session = session
 
+    @property
+    def dialect_name(self) -> str:
+        """Имя диалекта БД текущей сессии: postgresql, sqlite, ..."""
+        return self.session.bind.dialect.name
+
     async def get_filtered(
         self,
         limit: int | None = None,
@@ -47,11 +52,16 @@ class BaseRepository:
         result = await self.session.execute(query)
 
         model = result.scalars().one_or_none()
-        if model is None:
-            return None
+        if model is None or self.schema is None:
+            return model
         result = self.schema.model_validate(model, from_attributes=True)
         return result
 
+    async def get_names(self) -> list[tuple[int, str]]:
+        """Пары (id, название) всех записей, для индекса подсказок"""
+        result = await self.session.execute(select(self.model.id, self.model.name))
+        return [tuple(row) for row in result.all()]
+
     async def add(self, data: BaseModel):
         try:
             add_stmt = (
@@ -71,11 +81,20 @@ class BaseRepository:
 
     async def add_bulk(self, data: list[BaseModel]) -> None | BaseModel:
         """
-        Метод для множественного добавления данных в таблицу
+        Метод для множественного добавления данных в таблицу.
+        Строки передаются executemany: драйвер сам разбивает их на пачки,
+        число параметров одного запроса не упирается в лимит СУБД
         """
-        add_stmt = insert(self.model).values([item.model_dump() for item in data])
-        # print(add_stmt.compile(compile_kwargs={"literal_binds": True}))
-        await self.session.execute(add_stmt)
+        if not data:
+            return
+        await self.session.execute(insert(self.model), [item.model_dump() for item in data])
+
+    async def get_existing_ids(self, ids: set[int]) -> set[int]:
+        """Какие из ids есть в таблице - одним запросом"""
+        if not ids:
+            return set()
+        result = await self.session.execute(select(self.model.id).where(self.model.id.in_(ids)))
+        return set(result.scalars().all())
 
     async def delete(self, *filters, **filter_by) -> None:
         delete_stmt = delete(self.model)
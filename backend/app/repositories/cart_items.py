@@ -1,7 +1,10 @@
-from sqlalchemy import select, delete
-from sqlalchemy.orm import selectinload
+from sqlalchemy import literal, select, delete, func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.models.cart import CartItemModel
+from app.models.items import ItemModel
+from app.models.reservations import StockReservationModel
 from app.repositories.base import BaseRepository
 
 
@@ -9,33 +12,123 @@ class CartItemsRepository(BaseRepository):
     model = CartItemModel
     schema = None  # Используется только через сервисы
 
-    async def get_user_cart(self, user_id: int):
-        """Получение корзины пользователя с информацией о товарах"""
+    async def get_user_cart(self, user_id: int) -> list[dict]:
+        """
+        Корзина пользователя одним запросом: позиции с ценой продажи (с
+        учетом скидки) и суммой строки, а также итоги корзины total_items и
+        total_amount, посчитанные оконными функциями и повторенные в каждой строке
+        """
+        line_total = ItemModel.sale_price * self.model.quantity
         query = (
-            select(self.model)
-            .options(selectinload(self.model.item))
-            .filter_by(user_id=user_id)
+            select(
+                self.model.id,
+                self.model.item_id,
+                ItemModel.name.label("item_name"),
+                ItemModel.price.label("item_price"),
+                ItemModel.sale_price.label("item_sale_price"),
+                ItemModel.main_image_url.label("item_image_url"),
+                self.model.quantity,
+                line_total.label("total_price"),
+                func.sum(self.model.quantity).over().label("total_items"),
+                func.sum(line_total).over().label("total_amount"),
+            )
+            .join(ItemModel, ItemModel.id == self.model.item_id)
+            .where(self.model.user_id == user_id)
+            .order_by(self.model.id)
         )
         
         result = await self.session.execute(query)
-        return result.scalars().all()
-
-    async def add_cart_item(self, user_id: int, cart_item_data):
-        """Добавление товара в корзину"""
-        cart_item = {
-            "user_id": user_id,
-            "item_id": cart_item_data.item_id,
-            "quantity": cart_item_data.quantity
-        }
-        
-        return await self.add(cart_item)
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_checkout_lines(self, user_id: int):
+        """
+        Позиции корзины для оформления заказа одним запросом: словари
+        item_id, name, price (цена продажи с учетом скидки), quantity
+        """
+        query = (
+            select(
+                self.model.item_id,
+                ItemModel.name,
+                ItemModel.sale_price.label("price"),
+                self.model.quantity,
+            )
+            .join(ItemModel, ItemModel.id == self.model.item_id)
+            .where(self.model.user_id == user_id)
+            .order_by(self.model.item_id)
+        )
+        result = await self.session.execute(query)
+        return [dict(row._mapping) for row in result.all()]
+
+    async def get_quantities(self, user_id: int) -> dict[int, int]:
+        """Количества товаров в корзине: id товара -> количество"""
+        query = select(self.model.item_id, self.model.quantity).filter_by(user_id=user_id)
+        result = await self.session.execute(query)
+        return {item_id: quantity for item_id, quantity in result.all()}
+
+    async def apply_changes(self, changes: list[tuple[int, int, int]]) -> None:
+        """
+        Записывает пачку изменений (user_id, item_id, количество) двумя
+        запросами: позиции с количеством - одним INSERT ... ON CONFLICT,
+        позиции с нулем удаляются одним DELETE
+        """
+        upserts = [
+            {"user_id": user_id, "item_id": item_id, "quantity": quantity}
+            for user_id, item_id, quantity in changes if quantity > 0
+        ]
+        removed = [(user_id, item_id) for user_id, item_id, quantity in changes if quantity <= 0]
+        if upserts:
+            insert = postgresql_insert if self.dialect_name == "postgresql" else sqlite_insert
+            query = insert(self.model)
+            query = query.on_conflict_do_update(
+                index_elements=["user_id", "item_id"],
+                set_={"quantity": query.excluded.quantity},
+            )
+            await self.session.execute(query, upserts)
+        if removed:
+            await self.session.execute(
+                delete(self.model).where(tuple_(self.model.user_id, self.model.item_id).in_(removed))
+            )
+
+    async def add_quantity(self, user_id: int, item_id: int, quantity: int) -> int | None:
+        """
+        Добавляет товар в корзину одним INSERT ... ON CONFLICT (user_id,
+        item_id) DO UPDATE: новая строка или прибавка к количеству.
+        Количество в корзине не может превысить доступное покупателю -
+        остаток за вычетом удержаний других покупателей и заявок из очереди
+        оформления, в том числе своих. Возвращает новое количество или None,
+        если товара нет или его не хватает
+        """
+        held = (
+            select(StockReservationModel.quantity)
+            .filter_by(user_id=user_id, item_id=item_id)
+            .where(StockReservationModel.checkout_request_id.is_(None))
+            .scalar_subquery()
+        )
+        available = (
+            select(ItemModel.available_quantity + func.coalesce(held, 0))
+            .where(ItemModel.id == item_id)
+            .scalar_subquery()
+        )
+        insert = postgresql_insert if self.dialect_name == "postgresql" else sqlite_insert
+        query = insert(self.model).from_select(
+            ["user_id", "item_id", "quantity"],
+            select(literal(user_id), literal(item_id), literal(quantity)).where(available >= quantity),
+        )
+        new_quantity = self.model.quantity + query.excluded.quantity
+        query = query.on_conflict_do_update(
+            index_elements=["user_id", "item_id"],
+            set_={"quantity": new_quantity},
+            where=available >= new_quantity,
+        ).returning(self.model.quantity)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
 
     async def update_quantity(self, user_id: int, item_id: int, quantity: int):
         """Обновление количества товара в корзине"""
-        await self.edit(
-            {"quantity": quantity},
-            user_id=user_id,
-            item_id=item_id
+        await self.session.execute(
+            update(self.model)
+            .filter_by(user_id=user_id, item_id=item_id)
+            .values(quantity=quantity)
         )
 
     async def delete(self, user_id: int = None, item_id: int = None, **kwargs):
@@ -1,7 +1,7 @@
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import delete, insert, literal, select, func
+from sqlalchemy.orm import aliased, selectinload
 
-from app.models.categories import CategoryModel
+from app.models.categories import CategoryClosureModel, CategoryModel
 from app.models.items import ItemModel
 from app.repositories.base import BaseRepository
 from app.schemes.categories import CategoryGet, CategoryGetWithChildren
@@ -24,8 +24,10 @@ class CategoriesRepository(BaseRepository):
         if model is None:
             return None
             
-        # Считаем количество товаров в категории
-        count_query = select(func.count(ItemModel.id)).where(ItemModel.category_id == category_id)
+        # Считаем количество товаров в категории вместе с подкатегориями
+        count_query = select(func.count(ItemModel.id)).where(
+            ItemModel.category_id.in_(self.subtree_ids_query(category_id))
+        )
         count_result = await self.session.execute(count_query)
         item_count = count_result.scalar() or 0
         
@@ -44,4 +46,92 @@ class CategoriesRepository(BaseRepository):
         result = await self.session.execute(query)
         categories = result.scalars().all()
         
-        return [CategoryGetWithChildren.model_validate(cat, from_attributes=True) for cat in categories]
\ No newline at end of file
+        return [CategoryGetWithChildren.model_validate(cat, from_attributes=True) for cat in categories]
+
+    async def get_version(self) -> tuple:
+        """Версия дерева категорий: последнее изменение и число категорий"""
+        query = select(func.max(self.model.updated_at), func.count(self.model.id))
+        return tuple((await self.session.execute(query)).one())
+
+    @staticmethod
+    def subtree_ids_query(category_id: int):
+        """Подзапрос id категории и всех ее потомков"""
+        return select(CategoryClosureModel.descendant_id).where(
+            CategoryClosureModel.ancestor_id == category_id
+        )
+
+    async def get_subtree_ids(self, category_id: int) -> list[int]:
+        result = await self.session.execute(self.subtree_ids_query(category_id))
+        return list(result.scalars().all())
+
+    async def get_ancestor_ids(self, category_id: int) -> list[int]:
+        """id категории и всех ее предков"""
+        query = select(CategoryClosureModel.ancestor_id).where(
+            CategoryClosureModel.descendant_id == category_id
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def get_breadcrumbs(self, category_id: int) -> list[CategoryGet]:
+        """Путь от корня дерева до категории включительно"""
+        query = (
+            select(self.model)
+            .join(CategoryClosureModel, CategoryClosureModel.ancestor_id == self.model.id)
+            .where(CategoryClosureModel.descendant_id == category_id)
+            .order_by(CategoryClosureModel.depth.desc())
+        )
+        result = await self.session.execute(query)
+        return [self.schema.model_validate(model, from_attributes=True) for model in result.scalars().all()]
+
+    async def is_in_subtree(self, category_id: int, root_id: int) -> bool:
+        """Является ли category_id самой root_id или ее потомком"""
+        query = select(CategoryClosureModel.depth).filter_by(
+            ancestor_id=root_id, descendant_id=category_id
+        )
+        result = await self.session.execute(query)
+        return result.first() is not None
+
+    async def add_to_closure(self, category_id: int, parent_id: int | None) -> None:
+        """Добавляет новую категорию-лист: ссылка на себя и на всех предков родителя"""
+        closure = CategoryClosureModel
+        rows = select(literal(category_id), literal(category_id), literal(0))
+        if parent_id is not None:
+            rows = rows.union_all(
+                select(closure.ancestor_id, literal(category_id), closure.depth + 1)
+                .where(closure.descendant_id == parent_id)
+            )
+        await self.session.execute(
+            insert(closure).from_select(["ancestor_id", "descendant_id", "depth"], rows)
+        )
+
+    async def move_subtree(self, category_id: int, new_parent_id: int | None) -> None:
+        """
+        Переносит категорию вместе с потомками под new_parent_id
+        (None - в корень): связи поддерева с прежними предками удаляются,
+        с предками нового родителя - создаются
+        """
+        closure = CategoryClosureModel
+        subtree = select(closure.descendant_id).where(closure.ancestor_id == category_id)
+        await self.session.execute(
+            delete(closure).where(
+                closure.descendant_id.in_(subtree),
+                closure.ancestor_id.not_in(subtree),
+            )
+        )
+        if new_parent_id is None:
+            return
+        ancestors = aliased(closure)
+        descendants = aliased(closure)
+        rows = (
+            select(
+                ancestors.ancestor_id,
+                descendants.descendant_id,
+                ancestors.depth + descendants.depth + 1,
+            )
+            .select_from(ancestors)
+            .join(descendants, descendants.ancestor_id == category_id)
+            .where(ancestors.descendant_id == new_parent_id)
+        )
+        await self.session.execute(
+            insert(closure).from_select(["ancestor_id", "descendant_id", "depth"], rows)
+        )
\ No newline at end of file
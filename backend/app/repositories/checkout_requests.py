@@ -0,0 +1,52 @@
+from sqlalchemy import insert, select, update
+
+from app.models.checkout_requests import CheckoutRequestModel
+from app.repositories.base import BaseRepository
+
+
+class CheckoutRequestsRepository(BaseRepository):
+    model = CheckoutRequestModel
+    schema = None  # Используется только через OrdersService
+
+    async def add_request(self, user_id: int, order_data, lines: list[dict]) -> int:
+        """Ставит заявку в очередь, возвращает ее id"""
+        query = (
+            insert(self.model)
+            .values(
+                user_id=user_id,
+                status="queued",
+                shipping_address=order_data.shipping_address,
+                contact_phone=order_data.contact_phone,
+                notes=order_data.notes,
+                lines=lines,
+            )
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def claim_batch(self, limit: int) -> list[CheckoutRequestModel]:
+        """
+        Самые старые заявки в очереди, не больше limit. Строки блокируются до
+        конца транзакции, заявки, занятые другими обработчиками, пропускаются.
+        Если обработчик упадет, транзакция откатится и заявки останутся в очереди
+        """
+        query = (
+            select(self.model)
+            .where(self.model.status == "queued")
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
+
+    async def mark_done(self, request_id: int, order_id: int) -> None:
+        await self.session.execute(
+            update(self.model).filter_by(id=request_id).values(status="done", order_id=order_id)
+        )
+
+    async def mark_failed(self, request_id: int, error: str) -> None:
+        await self.session.execute(
+            update(self.model).filter_by(id=request_id).values(status="failed", error=error[:500])
+        )
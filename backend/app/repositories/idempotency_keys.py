@@ -0,0 +1,110 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models.idempotency_keys import IdempotencyKeyModel
+from app.repositories.base import BaseRepository
+
+
+class IdempotencyKeysRepository(BaseRepository):
+    model = IdempotencyKeyModel
+    schema = None  # Используется только через IdempotencyService
+
+    async def claim(
+        self,
+        user_id: int,
+        key: str,
+        scope: str,
+        request_hash: str,
+        expires_at: datetime,
+        now: datetime,
+    ) -> bool:
+        """
+        Занимает ключ под выполнение запроса до expires_at (аренда). Ключ с
+        истекшей арендой или сроком хранения ответа занимается заново.
+        False - ключ уже занят действующей записью
+        """
+        values = {
+            "user_id": user_id, "key": key, "scope": scope, "request_hash": request_hash,
+            "status_code": None, "response": None, "expires_at": expires_at,
+        }
+        insert = postgresql_insert if self.dialect_name == "postgresql" else sqlite_insert
+        query = (
+            insert(self.model)
+            .values(**values)
+            .on_conflict_do_update(
+                index_elements=["user_id", "key"],
+                set_=values,
+                where=self.model.expires_at <= now,
+            )
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none() is not None
+
+    async def get(self, user_id: int, key: str) -> IdempotencyKeyModel | None:
+        return await self.get_one_or_none(user_id=user_id, key=key)
+
+    def _claimed(self, user_id: int, key: str, lease: datetime):
+        """Условие: ключ все еще занят запросом, получившим аренду lease"""
+        return (
+            (self.model.user_id == user_id)
+            & (self.model.key == key)
+            & self.model.status_code.is_(None)
+            & (self.model.expires_at == lease)
+        )
+
+    async def lock_claim(self, user_id: int, key: str, lease: datetime) -> bool:
+        """
+        Блокирует строку занятого ключа до конца транзакции (UPDATE без
+        изменений). False - аренда истекла и ключ занял другой запрос
+        """
+        query = (
+            update(self.model)
+            .where(self._claimed(user_id, key, lease))
+            .values(status_code=None)
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none() is not None
+
+    async def save_response(
+        self,
+        user_id: int,
+        key: str,
+        lease: datetime,
+        status_code: int,
+        response,
+        expires_at: datetime,
+    ) -> bool:
+        """Сохраняет ответ, если ключ все еще занят арендой lease"""
+        query = (
+            update(self.model)
+            .where(self._claimed(user_id, key, lease))
+            .values(status_code=status_code, response=response, expires_at=expires_at)
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none() is not None
+
+    async def remove(self, user_id: int, key: str, lease: datetime) -> None:
+        await self.session.execute(delete(self.model).where(self._claimed(user_id, key, lease)))
+
+    async def remove_expired(self, now: datetime, limit: int) -> int:
+        """Удаляет до limit истекших ключей, возвращает число удаленных"""
+        expired = (
+            select(self.model.id)
+            .where(self.model.expires_at <= now)
+            .order_by(self.model.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            delete(self.model)
+            .where(self.model.id.in_(expired.scalar_subquery()))
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(query)
+        return len(result.all())
@@ -1,15 +1,32 @@
-from sqlalchemy import select, func, and_
-from sqlalchemy.orm import selectinload, joinedload
+from datetime import datetime
 
+from sqlalchemy import Float, bindparam, case, cast, select, func, and_, or_, text, tuple_, update
+from sqlalchemy.orm import selectinload, joinedload, noload
+
+from app.database.fulltext import match_clause, rank_expression, search_tokens
+from app.models.brands import BrandModel
+from app.models.categories import CategoryClosureModel, CategoryModel
 from app.models.items import ItemModel
+from app.models.order_items import OrderItemModel
+from app.models.reservations import StockReservationModel
 from app.models.reviews import ReviewModel
+from app.models.specification_types import SpecificationTypeModel
+from app.models.specifications import SpecificationModel
 from app.repositories.base import BaseRepository
-from app.schemes.items import ItemGet, ItemGetWithRelations
+from app.schemes.items import ItemCreate, ItemGet, ItemGetWithRelations
+from app.utils.serialization import type_adapter
+from app.utils.spec_values import SPEC_OPERATORS
 
 
 class ItemsRepository(BaseRepository):
     model = ItemModel
     schema = ItemGet
+    
+    # Связи, которые можно запросить в списке полями: модель и внешний ключ товара
+    LIST_RELATIONS = {
+        "category": (CategoryModel, "category_id"),
+        "brand": (BrandModel, "brand_id"),
+    }
 
     async def get_with_relations(self, item_id: int) -> ItemGetWithRelations | None:
         query = (
@@ -17,7 +34,7 @@ class ItemsRepository(BaseRepository):
             .options(
                 selectinload(self.model.category),
                 selectinload(self.model.brand),
-                selectinload(self.model.specifications).joinedload("specification_type"),
+                selectinload(self.model.specifications).joinedload(SpecificationModel.specification_type),
             )
             .filter_by(id=item_id)
         )
@@ -27,42 +44,165 @@ class ItemsRepository(BaseRepository):
         
         if model is None:
             return None
-            
-        # Вычисляем средний рейтинг
-        rating_query = select(func.avg(ReviewModel.rating)).where(ReviewModel.item_id == item_id)
-        rating_result = await self.session.execute(rating_query)
-        average_rating = rating_result.scalar()
-        
-        # Получаем количество отзывов
-        count_query = select(func.count(ReviewModel.id)).where(ReviewModel.item_id == item_id)
-        count_result = await self.session.execute(count_query)
-        review_count = count_result.scalar()
-        
-        item_data = ItemGetWithRelations.model_validate(model, from_attributes=True)
-        item_data.average_rating = float(average_rating) if average_rating else None
-        item_data.review_count = review_count or 0
         
-        return item_data
+        # Рейтинг и число отзывов хранятся в самой строке товара
+        return ItemGetWithRelations.model_validate(model, from_attributes=True)
 
-    async def search_items(self, filters: dict, limit: int = 20, offset: int = 0):
-        query = select(self.model).options(
-            selectinload(self.model.category),
-            selectinload(self.model.brand),
+    async def get_many_with_relations(
+        self,
+        item_ids: list[int],
+        with_specifications: bool = False,
+    ) -> list[ItemGetWithRelations]:
+        """
+        Товары для списков по id одним запросом, в порядке item_ids.
+        Отсутствующие id пропускаются. Характеристики загружаются только при
+        with_specifications - вторым запросом сразу для всех товаров
+        """
+        if with_specifications:
+            specifications = selectinload(self.model.specifications).joinedload(
+                SpecificationModel.specification_type
+            )
+        else:
+            specifications = noload(self.model.specifications)
+        query = (
+            select(self.model)
+            .options(
+                joinedload(self.model.category),
+                joinedload(self.model.brand),
+                specifications,
+            )
+            .where(self.model.id.in_(item_ids))
         )
-        
-        # Применяем фильтры
+        result = await self.session.execute(query)
+        models = {model.id: model for model in result.scalars().all()}
+        return type_adapter(list[ItemGetWithRelations]).validate_python(
+            [models[item_id] for item_id in item_ids if item_id in models],
+            from_attributes=True,
+        )
+
+    async def get_many_projected(self, item_ids: list[int], fields: tuple[str, ...]) -> list[dict]:
+        """Как get_many_with_relations, но только поля fields, словарями"""
+        query = self._projection_query(fields).where(self.model.id.in_(item_ids))
+        result = await self.session.execute(query)
+        rows = {row.id: self._projected_row(row) for row in result.all()}
+        return [rows[item_id] for item_id in item_ids if item_id in rows]
+
+    def _projection_query(self, fields: tuple[str, ...]):
+        """
+        SELECT только колонок fields (среди них должен быть id). Связи
+        category/brand присоединяются JOIN'ом, если запрошены, их колонки
+        получают метки вида category__name
+        """
+        columns = []
+        joins = []
+        for field in fields:
+            if field in self.LIST_RELATIONS:
+                model, foreign_key = self.LIST_RELATIONS[field]
+                columns.extend(
+                    column.label(f"{field}__{column.key}") for column in model.__table__.columns
+                )
+                joins.append((model, model.id == getattr(self.model, foreign_key)))
+            else:
+                columns.append(getattr(self.model, field).label(field))
+        query = select(*columns).select_from(self.model)
+        for model, onclause in joins:
+            query = query.join(model, onclause)
+        return query
+
+    @staticmethod
+    def _projected_row(row) -> dict:
+        """Строка проекции -> словарь, колонки связей собираются во вложенные словари"""
+        item = {}
+        for key, value in row._mapping.items():
+            if key == "total_count":
+                continue
+            field, _, column = key.partition("__")
+            if column:
+                item.setdefault(field, {})[column] = value
+            else:
+                item[field] = value
+        return item
+
+    def _apply_filters(self, query, filters: dict):
         if filters.get("name"):
-            query = query.filter(self.model.name.ilike(f"%{filters['name']}%"))
+            # Полнотекстовый поиск по названию, артикулу, бренду и описанию
+            tokens = search_tokens(filters["name"])
+            if tokens:
+                query = query.filter(match_clause(self.dialect_name, self.model, tokens))
         if filters.get("category_id"):
-            query = query.filter_by(category_id=filters["category_id"])
+            # Категория вместе со всеми подкатегориями
+            subtree_ids = select(CategoryClosureModel.descendant_id).where(
+                CategoryClosureModel.ancestor_id == filters["category_id"]
+            )
+            query = query.filter(self.model.category_id.in_(subtree_ids))
         if filters.get("brand_id"):
-            query = query.filter_by(brand_id=filters["brand_id"])
+            query = query.filter(self.model.brand_id == filters["brand_id"])
         if filters.get("min_price"):
             query = query.filter(self.model.price >= filters["min_price"])
         if filters.get("max_price"):
             query = query.filter(self.model.price <= filters["max_price"])
         if filters.get("in_stock"):
-            query = query.filter(self.model.quantity > 0)
+            # В наличии - есть что продать сверх удержанного в корзинах
+            query = query.filter(self.model.available_quantity > 0)
+        if filters.get("specs"):
+            query = query.filter(*self._spec_conditions(filters["specs"]))
+        return query
+
+    def _spec_conditions(self, specs: list[tuple[str, str, float]]) -> list:
+        """
+        Условия по характеристикам: все границы одного типа объединяются в
+        один диапазон, который читается из индекса
+        (specification_type_id, numeric_value, item_id)
+        """
+        bounds_by_type = {}
+        for spec_type, op, value in specs:
+            bounds_by_type.setdefault(spec_type, []).append((op, value))
+        
+        conditions = []
+        for spec_type, bounds in bounds_by_type.items():
+            if spec_type.isdigit():
+                type_match = SpecificationModel.specification_type_id == int(spec_type)
+            else:
+                type_ids = select(SpecificationTypeModel.id).where(SpecificationTypeModel.name == spec_type)
+                type_match = SpecificationModel.specification_type_id.in_(type_ids)
+            matched = select(SpecificationModel.item_id).where(
+                type_match,
+                *[SPEC_OPERATORS[op](SpecificationModel.numeric_value, value) for op, value in bounds],
+            )
+            conditions.append(self.model.id.in_(matched))
+        return conditions
+
+    async def search_items(
+        self,
+        filters: dict,
+        limit: int = 20,
+        offset: int = 0,
+        after: tuple | None = None,
+        with_total: bool = False,
+    ) -> tuple[list[ItemGetWithRelations] | list[dict], int | None]:
+        """
+        Поиск товаров с сортировкой.
+        after - ключ (значение сортировки, id) последней строки предыдущей
+        страницы: при его передаче вместо OFFSET используется keyset-пагинация.
+        with_total - посчитать общее количество найденных товаров оконной
+        функцией в том же запросе (None, если страница пуста).
+        filters["fields"] - загрузить только эти поля: товары возвращаются
+        словарями, без ORM-объектов и схем
+        """
+        fields = filters.get("fields")
+        if fields:
+            query = self._projection_query(fields)
+        else:
+            query = select(self.model).options(
+                # many-to-one связи подгружаются JOIN'ом в том же запросе
+                joinedload(self.model.category),
+                joinedload(self.model.brand),
+                # Характеристики в списке не нужны
+                noload(self.model.specifications),
+            )
+        
+        # Применяем фильтры
+        query = self._apply_filters(query, filters)
             
         # Сортировка
         sort_by = filters.get("sort_by", "created_at")
@@ -73,41 +213,526 @@ class ItemsRepository(BaseRepository):
         elif sort_by == "name":
             order_column = self.model.name
         elif sort_by == "rating":
-            # Здесь нужен подзапрос для рейтинга
-            rating_subq = (
-                select(ReviewModel.item_id, func.avg(ReviewModel.rating).label('avg_rating'))
-                .group_by(ReviewModel.item_id)
-                .subquery()
-            )
-            query = query.outerjoin(rating_subq, self.model.id == rating_subq.c.item_id)
-            order_column = func.coalesce(rating_subq.c.avg_rating, 0)
+            order_column = self.model.average_rating
+        elif sort_by == "relevance":
+            tokens = search_tokens(filters.get("name", ""))
+            order_column = rank_expression(self.dialect_name, self.model, tokens)
+            query = query.add_columns(order_column.label("relevance"))
         else:  # created_at
             order_column = self.model.created_at
+
+        if with_total:
+            # count(*) OVER () считается до LIMIT/OFFSET по всей выборке
+            query = query.add_columns(func.count().over().label("total_count"))
+
+        # Keyset: строки строго после последней строки предыдущей страницы,
+        # id разрешает равные значения сортировки
+        if after is not None:
+            sort_key = tuple_(order_column, self.model.id)
+            if sort_order == "desc":
+                query = query.filter(sort_key < tuple_(*after))
+            else:
+                query = query.filter(sort_key > tuple_(*after))
+            offset = 0
             
         if sort_order == "desc":
-            query = query.order_by(order_column.desc())
+            query = query.order_by(order_column.desc(), self.model.id.desc())
         else:
-            query = query.order_by(order_column.asc())
+            query = query.order_by(order_column.asc(), self.model.id.asc())
             
         # Пагинация
         query = query.limit(limit).offset(offset)
         
         result = await self.session.execute(query)
-        items = result.scalars().all()
         
-        return [ItemGetWithRelations.model_validate(item, from_attributes=True) for item in items]
+        rows = result.all()
+        if fields:
+            items = [self._projected_row(row) for row in rows]
+        else:
+            # Вся страница валидируется одним вызовом
+            items = type_adapter(list[ItemGetWithRelations]).validate_python(
+                [row[0] for row in rows], from_attributes=True
+            )
+            if sort_by == "relevance":
+                for item, row in zip(items, rows):
+                    item.relevance = row.relevance
+        total_count = rows[0].total_count if with_total and rows else None
+        return items, total_count
+
+    async def count_items(self, filters: dict, limit: int | None = None) -> int:
+        """
+        Подсчет товаров по фильтрам.
+        limit ограничивает просмотр: результат не превышает limit
+        """
+        if limit is None:
+            query = self._apply_filters(select(func.count(self.model.id)), filters)
+        else:
+            matched = self._apply_filters(select(self.model.id), filters).limit(limit)
+            query = select(func.count()).select_from(matched.subquery())
+        result = await self.session.execute(query)
+        return result.scalar() or 0
+
+    async def facet_counts(self, filters: dict, price_bounds: list[int]) -> dict:
+        """
+        Количество товаров по брендам, категориям и ценовым диапазонам.
+        Каждый фасет считается без собственного фильтра (выбор другого
+        бренда не обнуляет счетчики брендов), по одному GROUP BY на фасет.
+        price_bounds - возрастающие нижние границы диапазонов
+        """
+        def without(*keys):
+            return {k: v for k, v in filters.items() if k not in keys}
+
+        brands_query = self._apply_filters(
+            select(BrandModel.id, BrandModel.name, func.count(self.model.id).label("count"))
+            .select_from(self.model)
+            .join(BrandModel, self.model.brand_id == BrandModel.id)
+            .group_by(BrandModel.id, BrandModel.name)
+            .order_by(func.count(self.model.id).desc(), BrandModel.name),
+            without("brand_id"),
+        )
+        categories_query = self._apply_filters(
+            select(CategoryModel.id, CategoryModel.name, func.count(self.model.id).label("count"))
+            .select_from(self.model)
+            .join(CategoryModel, self.model.category_id == CategoryModel.id)
+            .group_by(CategoryModel.id, CategoryModel.name)
+            .order_by(func.count(self.model.id).desc(), CategoryModel.name),
+            without("category_id"),
+        )
+        # Номер диапазона: последняя граница, не превышающая цену
+        bucket = case(
+            *[
+                (self.model.price >= bound, index)
+                for index, bound in reversed(list(enumerate(price_bounds)))
+            ],
+            else_=-1,
+        ).label("bucket")
+        prices_query = self._apply_filters(
+            select(bucket, func.count(self.model.id).label("count")).group_by(bucket),
+            without("min_price", "max_price"),
+        )
+
+        brands = await self.session.execute(brands_query)
+        categories = await self.session.execute(categories_query)
+        prices = await self.session.execute(prices_query)
+
+        bucket_counts = {row.bucket: row.count for row in prices.all()}
+        price_ranges = [
+            {
+                "min": bound,
+                "max": price_bounds[index + 1] if index + 1 < len(price_bounds) else None,
+                "count": bucket_counts.get(index, 0),
+            }
+            for index, bound in enumerate(price_bounds)
+        ]
+        return {
+            "brands": [dict(row._mapping) for row in brands.all()],
+            "categories": [dict(row._mapping) for row in categories.all()],
+            "price_ranges": price_ranges,
+        }
+
+    async def iter_export_chunks(self, after_id: int | None = None, chunk_size: int = 1000):
+        """
+        Все товары по возрастанию id с названиями категории и бренда,
+        пачками по chunk_size словарей. Строки читаются серверным курсором
+        (yield_per), поэтому в памяти одновременно не больше одной пачки.
+        after_id - продолжить выгрузку после товара с этим id
+        """
+        columns = [
+            column for column in self.model.__table__.columns if column.key != "search_vector"
+        ]
+        query = (
+            select(
+                *columns,
+                CategoryModel.name.label("category_name"),
+                BrandModel.name.label("brand_name"),
+            )
+            .join(CategoryModel, CategoryModel.id == self.model.category_id)
+            .join(BrandModel, BrandModel.id == self.model.brand_id)
+            .order_by(self.model.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        if after_id is not None:
+            query = query.where(self.model.id > after_id)
+        result = await self.session.stream(query)
+        async for partition in result.partitions():
+            yield [dict(row._mapping) for row in partition]
+
+    async def get_ids_by_sku(self, skus: list[str]) -> dict[str, int]:
+        """id существующих товаров с такими артикулами: артикул -> id"""
+        if not skus:
+            return {}
+        query = select(self.model.sku, self.model.id).where(self.model.sku.in_(skus))
+        result = await self.session.execute(query)
+        return {sku: item_id for sku, item_id in result.all()}
+
+    async def upsert_by_sku(self, data: list[ItemCreate]) -> tuple[int, int]:
+        """
+        Создает товары с новыми артикулами и обновляет товары с уже
+        существующими. Артикулы в data должны быть уникальны. Остаток
+        существующего товара не опускается ниже удержанного в корзинах
+        покупателей: удержания остаются в силе, а лишнее снимется, когда
+        покупатели уберут товар из корзины или удержание истечет.
+        Возвращает (создано, обновлено)
+        """
+        if not data:
+            return 0, 0
+        if self.dialect_name == "postgresql":
+            return await self._upsert_by_sku_copy(data)
+        existing = await self.get_ids_by_sku([item.sku for item in data])
+        await self.add_bulk([item for item in data if item.sku not in existing])
+        changed = [
+            {"item_id": existing[item.sku], **item.model_dump(exclude={"sku"})}
+            for item in data
+            if item.sku in existing
+        ]
+        if changed:
+            # UPDATE по первичному ключу через executemany
+            table = self.model.__table__
+            values = {column: bindparam(column) for column in changed[0] if column != "item_id"}
+            values["quantity"] = case(
+                (bindparam("quantity") >= table.c.reserved_quantity, bindparam("quantity")),
+                else_=table.c.reserved_quantity,
+            )
+            query = update(table).where(table.c.id == bindparam("item_id")).values(values)
+            await self.session.execute(query, changed)
+        return len(data) - len(changed), len(changed)
+
+    async def _upsert_by_sku_copy(self, data: list[ItemCreate]) -> tuple[int, int]:
+        """
+        PostgreSQL: строки загружаются COPY во временную таблицу и переносятся
+        в items одним INSERT ... ON CONFLICT (sku) DO UPDATE
+        """
+        columns = list(ItemCreate.model_fields)
+        await self.session.execute(text(
+            "CREATE TEMP TABLE items_import ("
+            "name varchar(255), sku varchar(100), price integer, discount_price integer, "
+            "quantity integer, description text, main_image_url varchar(500), "
+            "category_id integer, brand_id integer"
+            ")"
+        ))
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "items_import",
+            records=[tuple(getattr(item, column) for column in columns) for item in data],
+            columns=columns,
+        )
+        column_list = ", ".join(columns)
+        assignments = ", ".join(
+            f"{column} = EXCLUDED.{column}" for column in columns if column not in ("sku", "quantity")
+        )
+        # Остаток не опускается ниже удержанного в корзинах
+        assignments += ", quantity = GREATEST(EXCLUDED.quantity, items.reserved_quantity)"
+        result = await self.session.execute(text(
+            f"INSERT INTO items ({column_list}) SELECT {column_list} FROM items_import "
+            f"ON CONFLICT (sku) DO UPDATE SET {assignments}, updated_at = now() "
+            # xmax = 0 только у вставленных строк
+            "RETURNING (xmax = 0) AS created"
+        ))
+        created = sum(1 for (is_created,) in result.all() if is_created)
+        await self.session.execute(text("DROP TABLE items_import"))
+        return created, len(data) - created
+
+    async def get_detail_version(self, item_id: int) -> tuple[datetime, int] | None:
+        """
+        Версия карточки товара: последнее изменение товара, его категории,
+        бренда и характеристик, и число характеристик (удаление характеристики
+        не двигает updated_at). None - товара нет
+        """
+        item_specifications = SpecificationModel.item_id == self.model.id
+        query = (
+            select(
+                self.model.updated_at,
+                CategoryModel.updated_at,
+                BrandModel.updated_at,
+                select(func.max(SpecificationModel.updated_at))
+                .where(item_specifications)
+                .scalar_subquery(),
+                select(func.count(SpecificationModel.id))
+                .where(item_specifications)
+                .scalar_subquery(),
+            )
+            .join(CategoryModel, CategoryModel.id == self.model.category_id)
+            .join(BrandModel, BrandModel.id == self.model.brand_id)
+            .where(self.model.id == item_id)
+        )
+        row = (await self.session.execute(query)).one_or_none()
+        if row is None:
+            return None
+        *updated, specification_count = row
+        return max(value for value in updated if value is not None), specification_count
+
+    async def get_catalog_version(self) -> tuple:
+        """
+        Версия каталога для списков товаров: последние изменения товаров,
+        категорий, брендов и характеристик и число товаров (удаление товара
+        не двигает updated_at)
+        """
+        query = select(
+            func.max(self.model.updated_at),
+            func.count(self.model.id),
+            select(func.max(CategoryModel.updated_at)).scalar_subquery(),
+            select(func.max(BrandModel.updated_at)).scalar_subquery(),
+            select(func.max(SpecificationModel.updated_at)).scalar_subquery(),
+        )
+        return tuple((await self.session.execute(query)).one())
+
+    async def snapshot_rows(self, updated_since: datetime | None = None) -> list[tuple]:
+        """
+        Строки для снимка каталога: (id, price, discount_price,
+        available_quantity, category_id, brand_id, created_at, average_rating,
+        updated_at).
+        updated_since - только товары, измененные начиная с этого момента
+        """
+        query = select(
+            self.model.id,
+            self.model.price,
+            self.model.discount_price,
+            self.model.available_quantity,
+            self.model.category_id,
+            self.model.brand_id,
+            self.model.created_at,
+            self.model.average_rating,
+            self.model.updated_at,
+        )
+        if updated_since is not None:
+            query = query.where(self.model.updated_at >= updated_since)
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
+
+    async def estimate_count(self) -> int | None:
+        """
+        Оценка количества строк в таблице по статистике планировщика.
+        Доступна только в PostgreSQL и только после ANALYZE
+        """
+        if self.dialect_name != "postgresql":
+            return None
+        query = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)")
+        result = await self.session.execute(query, {"table": self.model.__tablename__})
+        estimate = result.scalar()
+        return estimate if estimate and estimate > 0 else None
+
+    async def get_rating(self, item_id: int) -> tuple[float, int] | None:
+        """Средний рейтинг и количество одобренных отзывов товара"""
+        query = select(self.model.average_rating, self.model.review_count).filter_by(id=item_id)
+        result = await self.session.execute(query)
+        row = result.one_or_none()
+        return (row.average_rating, row.review_count) if row else None
+
+    async def apply_rating_change(self, item_id: int, count_change: int, rating_change: int):
+        """
+        Инкрементально пересчитывает агрегаты рейтинга товара одним UPDATE:
+        count_change - изменение числа одобренных отзывов,
+        rating_change - изменение суммы их оценок.
+        Выражения считаются от текущих значений строки, поэтому
+        параллельные отзывы на один товар не теряют обновлений
+        """
+        new_count = self.model.review_count + count_change
+        new_average = case(
+            (
+                new_count > 0,
+                (self.model.average_rating * self.model.review_count + rating_change)
+                / cast(new_count, Float),
+            ),
+            else_=0.0,
+        )
+        query = (
+            update(self.model)
+            .where(self.model.id == item_id)
+            .values(review_count=new_count, average_rating=new_average)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(query)
+
+    async def reconcile_ratings(self) -> int:
+        """
+        Пересчитывает агрегаты рейтинга по таблице отзывов и исправляет
+        расхождения. Возвращает количество исправленных товаров
+        """
+        approved = and_(ReviewModel.item_id == self.model.id, ReviewModel.status == "approved")
+        actual_count = (
+            select(func.count(ReviewModel.id)).where(approved).scalar_subquery()
+        )
+        actual_average = (
+            select(func.coalesce(cast(func.avg(ReviewModel.rating), Float), 0.0))
+            .where(approved)
+            .scalar_subquery()
+        )
+        query = (
+            update(self.model)
+            .where(
+                or_(
+                    self.model.review_count != actual_count,
+                    func.abs(self.model.average_rating - actual_average) > 1e-9,
+                )
+            )
+            .values(review_count=actual_count, average_rating=actual_average)
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(query)
+        return len(result.all())
 
     async def update_quantity(self, item_id: int, quantity_change: int):
-        query = select(self.model).filter_by(id=item_id)
+        """
+        Изменяет остаток товара одним условным UPDATE: остаток не опускается
+        ниже удержанного в корзинах (reserved_quantity) даже при параллельных
+        изменениях, без чтения строки заранее. Возвращает строку (id,
+        quantity, category_id, brand_id) с новым остатком или None, если
+        товара нет. Не фиксирует транзакцию
+        """
+        new_quantity = self.model.quantity + quantity_change
+        query = (
+            update(self.model)
+            .where(self.model.id == item_id, new_quantity >= self.model.reserved_quantity)
+            .values(quantity=new_quantity)
+            .returning(self.model.id, self.model.quantity, self.model.category_id, self.model.brand_id)
+            .execution_options(synchronize_session=False)
+        )
         result = await self.session.execute(query)
-        item = result.scalars().one_or_none()
-        
-        if item:
-            new_quantity = item.quantity + quantity_change
-            if new_quantity < 0:
-                raise ValueError("Недостаточно товара на складе")
-                
-            item.quantity = new_quantity
-            await self.session.commit()
-            
-        return item
\ No newline at end of file
+        item = result.one_or_none()
+        if item is None and await self.get_existing_ids({item_id}):
+            raise ValueError(
+                "Недостаточно товара на складе: остаток не может быть меньше удержанного в корзинах"
+            )
+        return item
+
+    async def is_stock_below_reserved(self, item_id: int) -> bool:
+        """
+        Меньше ли остаток товара удержанного в корзинах. Вызывается после
+        изменения остатка в той же транзакции: строка уже заблокирована,
+        и удержание не может вырасти до ее фиксации
+        """
+        query = select(self.model.quantity < self.model.reserved_quantity).filter_by(id=item_id)
+        result = await self.session.execute(query)
+        return bool(result.scalar_one_or_none())
+
+    async def reconcile_reserved(self) -> int:
+        """
+        Пересчитывает удержанное количество товаров по таблице удержаний и
+        исправляет расхождения. Возвращает количество исправленных товаров
+        """
+        actual_reserved = (
+            select(func.coalesce(func.sum(StockReservationModel.quantity), 0))
+            .where(StockReservationModel.item_id == self.model.id)
+            .scalar_subquery()
+        )
+        query = (
+            update(self.model)
+            .where(self.model.reserved_quantity != actual_reserved)
+            .values(reserved_quantity=actual_reserved)
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(query)
+        return len(result.all())
+
+    def _lock_query(self, item_ids):
+        """
+        SELECT id ... FOR UPDATE, блокирующий строки товаров по возрастанию
+        id. Транзакции, которые меняют несколько товаров, блокируют строки в
+        одном порядке и не могут заблокировать друг друга (deadlock)
+        """
+        return (
+            select(self.model.id)
+            .where(self.model.id.in_(item_ids))
+            .order_by(self.model.id)
+            .with_for_update()
+        )
+
+    async def lock_rows(self, item_ids) -> set[int]:
+        """
+        Блокирует строки товаров до конца транзакции. Нужна, если
+        транзакция меняет одни и те же товары несколькими запросами.
+        Возвращает id заблокированных (существующих) товаров
+        """
+        if not item_ids:
+            return set()
+        result = await self.session.execute(self._lock_query(item_ids))
+        return set(result.scalars().all())
+
+    async def change_reserved(self, changes: dict[int, int]) -> set[int]:
+        """
+        Изменяет удержанное количество товаров одним условным UPDATE:
+        changes - id товара -> изменение reserved_quantity. Увеличение
+        проходит, только если хватает доступного остатка (quantity -
+        reserved_quantity). Возвращает id измененных товаров
+        """
+        if not changes:
+            return set()
+        change = case(changes, value=self.model.id, else_=0)
+        query = (
+            update(self.model)
+            .where(
+                self.model.id.in_(self._lock_query(list(changes)).scalar_subquery()),
+                or_(change <= 0, self.model.quantity - self.model.reserved_quantity >= change),
+            )
+            .values(reserved_quantity=self.model.reserved_quantity + change)
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(query)
+        return set(result.scalars().all())
+
+    async def restock_orders(self, order_ids: list[int]) -> None:
+        """
+        Возвращает на склад товары заказов одним UPDATE ... FROM: позиции
+        суммируются по товарам в подзапросе к order_items, так что число
+        запросов не зависит ни от числа заказов, ни от числа позиций
+        """
+        if not order_ids:
+            return
+        restock = (
+            select(OrderItemModel.item_id, func.sum(OrderItemModel.quantity).label("quantity"))
+            .where(OrderItemModel.order_id.in_(order_ids))
+            .group_by(OrderItemModel.item_id)
+            .subquery("restock")
+        )
+        item_ids = select(OrderItemModel.item_id).where(OrderItemModel.order_id.in_(order_ids))
+        query = (
+            update(self.model)
+            .where(
+                self.model.id == restock.c.item_id,
+                self.model.id.in_(self._lock_query(item_ids).scalar_subquery()),
+            )
+            .values(quantity=self.model.quantity + restock.c.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(query)
+
+    async def get_available_quantities(self, item_ids) -> dict[int, int]:
+        """Доступные к продаже остатки товаров: id -> available_quantity"""
+        query = select(self.model.id, self.model.available_quantity).where(self.model.id.in_(item_ids))
+        result = await self.session.execute(query)
+        return {item_id: quantity for item_id, quantity in result.all()}
+
+    async def update_quantities(
+        self,
+        changes: dict[int, int],
+        respect_reserved: bool = False,
+    ) -> dict[int, int]:
+        """
+        Изменяет остатки нескольких товаров одним условным UPDATE:
+        changes - id товара -> изменение остатка. Возвращает новые остатки
+        измененных товаров; товаров, которых нет или которых не хватает,
+        в ответе нет. Если изменены не все товары, остальные изменения уже
+        применены - транзакцию нужно откатить.
+        respect_reserved - остаток не может опуститься ниже удержанного
+        другими покупателями (продажа), иначе только ниже нуля
+        """
+        if not changes:
+            return {}
+        new_quantity = self.model.quantity + case(changes, value=self.model.id, else_=0)
+        floor = self.model.reserved_quantity if respect_reserved else 0
+        query = (
+            update(self.model)
+            .where(
+                self.model.id.in_(self._lock_query(list(changes)).scalar_subquery()),
+                new_quantity >= floor,
+            )
+            .values(quantity=new_quantity)
+            .returning(self.model.id, self.model.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(query)
+        return {item_id: quantity for item_id, quantity in result.all()}
\ No newline at end of file
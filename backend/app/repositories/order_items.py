@@ -1,4 +1,4 @@
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from app.models.order_items import OrderItemModel
 from app.repositories.base import BaseRepository
 
@@ -18,6 +18,13 @@ class OrderItemsRepository(BaseRepository):
         
         return await self.add(order_item_data)
 
+    async def add_order_items(self, order_id: int, lines: list[dict]) -> None:
+        """Все позиции заказа одним INSERT: lines - словари item_id, quantity, price_at_purchase"""
+        if lines:
+            await self.session.execute(
+                insert(self.model), [{"order_id": order_id, **line} for line in lines]
+            )
+
     async def get_by_order(self, order_id: int):
         """Получение товаров заказа"""
         query = select(self.model).filter_by(order_id=order_id)
@@ -1,5 +1,5 @@
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import insert, select, func, update
+from sqlalchemy.orm import selectinload, joinedload, noload
 
 from app.models.orders import OrderModel, OrderStatus
 from app.models.order_items import OrderItemModel
@@ -13,23 +13,40 @@ class OrdersRepository(BaseRepository):
     schema = OrderGet
 
     async def add_order(self, user_id: int, total_amount: int, shipping_address: str, 
-                       contact_phone: str, notes: str = None):
-        """Создание нового заказа"""
+                       contact_phone: str, notes: str = None) -> int:
+        """Создание нового заказа, возвращает его id"""
         order_data = {
             "user_id": user_id,
             "total_amount": total_amount,
             "shipping_address": shipping_address,
             "contact_phone": contact_phone,
             "notes": notes,
-            "status": OrderStatus.PENDING.value
+            "status": OrderStatus.PENDING
         }
         
-        return await self.add(order_data)
+        result = await self.session.execute(
+            insert(self.model).values(**order_data).returning(self.model.id)
+        )
+        return result.scalar_one()
 
-    async def get_user_orders(self, user_id: int, limit: int = 10, offset: int = 0):
-        """Получение заказов пользователя"""
+    async def get_user_orders(
+        self,
+        user_id: int,
+        limit: int = 10,
+        offset: int = 0,
+        fields: tuple[str, ...] | None = None,
+    ):
+        """
+        Получение заказов пользователя.
+        fields - загрузить только эти колонки: заказы возвращаются словарями
+        """
+        if fields:
+            query = select(*[getattr(self.model, field) for field in fields])
+        else:
+            # Позиции заказа загружаются только в get_order_with_items
+            query = select(self.model).options(noload(self.model.items))
         query = (
-            select(self.model)
+            query
             .filter_by(user_id=user_id)
             .order_by(self.model.created_at.desc())
             .limit(limit)
@@ -37,6 +54,8 @@ class OrdersRepository(BaseRepository):
         )
         
         result = await self.session.execute(query)
+        if fields:
+            return [dict(row._mapping) for row in result.all()]
         orders = result.scalars().all()
         
         return [self.schema.model_validate(order, from_attributes=True) for order in orders]
@@ -80,7 +99,36 @@ class OrdersRepository(BaseRepository):
 
     async def update_status(self, order_id: int, status: str):
         """Обновление статуса заказа"""
-        await self.edit({"status": status}, id=order_id)
+        await self.session.execute(
+            update(self.model).filter_by(id=order_id).values(status=OrderStatus(status))
+        )
+
+    async def get_status(self, user_id: int, order_id: int) -> OrderStatus | None:
+        """Статус заказа пользователя или None, если заказа нет"""
+        query = select(self.model.status).filter_by(id=order_id, user_id=user_id)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
+
+    async def cancel(self, order_ids: list[int], user_id: int | None = None) -> list[int]:
+        """
+        Отменяет заказы одним условным UPDATE, если они еще не отправлены
+        (pending или processing); user_id - только заказы этого покупателя.
+        Две параллельные отмены не вернут товар на склад дважды: отменит
+        только одна. Возвращает id отмененных заказов
+        """
+        query = (
+            update(self.model)
+            .where(
+                self.model.id.in_(order_ids),
+                self.model.status.in_([OrderStatus.PENDING, OrderStatus.PROCESSING]),
+            )
+            .values(status=OrderStatus.CANCELLED)
+            .returning(self.model.id)
+        )
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        result = await self.session.execute(query)
+        return list(result.scalars().all())
 
     async def has_user_purchased_item(self, user_id: int, item_id: int) -> bool:
         """Проверка, покупал ли пользователь товар"""
@@ -90,7 +138,7 @@ class OrdersRepository(BaseRepository):
             .where(
                 OrderModel.user_id == user_id,
                 OrderItemModel.item_id == item_id,
-                OrderModel.status == OrderStatus.DELIVERED.value
+                OrderModel.status == OrderStatus.DELIVERED
             )
         )
         
@@ -0,0 +1,159 @@
+from datetime import datetime
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models.reservations import StockReservationModel
+from app.repositories.base import BaseRepository
+
+
+class ReservationsRepository(BaseRepository):
+    """
+    Удержания товаров. Методы по покупателю работают с удержаниями его
+    корзины; удержания заявок из очереди оформления - методы *_request*
+    """
+    model = StockReservationModel
+    schema = None  # Используется только через ReservationsService
+
+    def _insert(self):
+        return postgresql_insert if self.dialect_name == "postgresql" else sqlite_insert
+
+    @property
+    def _in_cart(self):
+        """Условие: удержание корзины, а не заявки из очереди (частичный уникальный индекс)"""
+        return self.model.checkout_request_id.is_(None)
+
+    async def get_held(self, user_id: int, item_id: int) -> int:
+        """Сколько штук товара удержано за покупателем"""
+        query = (
+            select(self.model.quantity)
+            .filter_by(user_id=user_id, item_id=item_id)
+            .where(self._in_cart)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none() or 0
+
+    async def lock_held(self, user_id: int, item_id: int, expires_at: datetime) -> int:
+        """
+        Блокирует удержание товара за покупателем до конца транзакции и
+        возвращает удержанное количество. Если удержания нет, создается
+        пустое (0 штук): SELECT ... FOR UPDATE не блокирует отсутствующую
+        строку, и два первых удержания одного товара прочитали бы 0 оба
+        """
+        await self.session.execute(
+            self._insert()(self.model)
+            .values(user_id=user_id, item_id=item_id, quantity=0, expires_at=expires_at)
+            .on_conflict_do_nothing(
+                index_elements=["user_id", "item_id"], index_where=self._in_cart
+            )
+        )
+        # UPDATE без изменений блокирует строку и читает ее последнюю версию
+        query = (
+            update(self.model)
+            .filter_by(user_id=user_id, item_id=item_id)
+            .where(self._in_cart)
+            .values(quantity=self.model.quantity)
+            .returning(self.model.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def get_user_holds(self, user_id: int) -> dict[int, int]:
+        """Удержания покупателя: id товара -> количество"""
+        query = (
+            select(self.model.item_id, self.model.quantity)
+            .filter_by(user_id=user_id)
+            .where(self._in_cart)
+        )
+        result = await self.session.execute(query)
+        return {item_id: quantity for item_id, quantity in result.all()}
+
+    async def upsert(self, user_id: int, item_id: int, quantity: int, expires_at: datetime) -> None:
+        """Создает удержание или заменяет количество и срок существующего"""
+        query = self._insert()(self.model).values(
+            user_id=user_id, item_id=item_id, quantity=quantity, expires_at=expires_at
+        )
+        query = query.on_conflict_do_update(
+            index_elements=["user_id", "item_id"],
+            index_where=self._in_cart,
+            set_={"quantity": quantity, "expires_at": expires_at},
+        )
+        await self.session.execute(query)
+
+    async def extend(self, user_id: int, expires_at: datetime) -> None:
+        """Продлевает удержания покупателя не меньше чем до expires_at"""
+        query = (
+            update(self.model)
+            .filter_by(user_id=user_id)
+            .where(self._in_cart)
+            .values(expires_at=case(
+                (self.model.expires_at < expires_at, expires_at), else_=self.model.expires_at
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(query)
+
+    async def remove(self, user_id: int, item_ids: list[int] | None = None) -> dict[int, int]:
+        """
+        Удаляет удержания покупателя (все или по товарам item_ids).
+        Возвращает снятые количества: id товара -> количество
+        """
+        query = delete(self.model).where(self.model.user_id == user_id, self._in_cart)
+        if item_ids is not None:
+            query = query.where(self.model.item_id.in_(item_ids))
+        result = await self.session.execute(
+            query.returning(self.model.item_id, self.model.quantity)
+        )
+        return {item_id: quantity for item_id, quantity in result.all()}
+
+    async def assign_to_request(self, user_id: int, item_ids: list[int], request_id: int) -> None:
+        """
+        Передает удержания товаров item_ids из корзины покупателя заявке из
+        очереди: новые удержания этих товаров в корзине их уже не заменят
+        """
+        query = (
+            update(self.model)
+            .where(self.model.user_id == user_id, self.model.item_id.in_(item_ids), self._in_cart)
+            .values(checkout_request_id=request_id)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(query)
+
+    async def remove_for_requests(self, request_ids: list[int]) -> dict[int, int]:
+        """
+        Удаляет удержания заявок из очереди. Возвращает снятые количества,
+        сложенные по товарам: id товара -> количество
+        """
+        query = (
+            delete(self.model)
+            .where(self.model.checkout_request_id.in_(request_ids))
+            .returning(self.model.item_id, self.model.quantity)
+        )
+        result = await self.session.execute(query)
+        released = {}
+        for item_id, quantity in result.all():
+            released[item_id] = released.get(item_id, 0) + quantity
+        return released
+
+    async def remove_expired(self, now: datetime, limit: int) -> list[tuple[int, int]]:
+        """
+        Удаляет до limit истекших удержаний корзин. Строки, заблокированные
+        другой транзакцией (покупатель как раз меняет корзину), пропускаются.
+        Возвращает снятые удержания: пары (id товара, количество)
+        """
+        expired = (
+            select(self.model.id)
+            .where(self.model.expires_at <= now, self._in_cart)
+            .order_by(self.model.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        query = (
+            delete(self.model)
+            .where(self.model.id.in_(expired.scalar_subquery()))
+            .returning(self.model.item_id, self.model.quantity)
+        )
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
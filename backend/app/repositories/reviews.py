@@ -1,4 +1,4 @@
-from sqlalchemy import select, func
+from sqlalchemy import delete, insert, select, func, update
 from sqlalchemy.orm import selectinload
 
 from app.models.reviews import ReviewModel
@@ -21,7 +21,9 @@ class ReviewsRepository(BaseRepository):
             "status": "pending"
         }
         
-        return await self.add(review_data)
+        query = insert(self.model).values(**review_data).returning(self.model)
+        result = await self.session.execute(query)
+        return self.schema.model_validate(result.scalars().one(), from_attributes=True)
 
     async def get_item_reviews(self, item_id: int, limit: int = 10, offset: int = 0):
         """Получение отзывов на товар"""
@@ -60,4 +62,33 @@ class ReviewsRepository(BaseRepository):
 
     async def update_status(self, review_id: int, status: str):
         """Обновление статуса отзыва"""
-        await self.edit({"status": status}, id=review_id)
\ No newline at end of file
+        query = update(self.model).filter_by(id=review_id).values(status=status)
+        await self.session.execute(query)
+
+    def _unchanged(self, review: ReviewGet) -> tuple:
+        """Условие: у отзыва те же статус и оценка, что были прочитаны в review"""
+        return (
+            self.model.id == review.id,
+            self.model.status == review.status,
+            self.model.rating == review.rating,
+        )
+
+    async def update_if_unchanged(self, review: ReviewGet, **values) -> bool:
+        """
+        Меняет отзыв, только если его статус и оценка не изменились после
+        чтения review. False - отзыв успели изменить или удалить
+        """
+        query = (
+            update(self.model)
+            .where(*self._unchanged(review))
+            .values(**values)
+            .returning(self.model.id)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none() is not None
+
+    async def delete_if_unchanged(self, review: ReviewGet) -> bool:
+        """Удаляет отзыв, только если его статус и оценка не изменились после чтения review"""
+        query = delete(self.model).where(*self._unchanged(review)).returning(self.model.id)
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none() is not None
\ No newline at end of file
@@ -0,0 +1,120 @@
+from pydantic import BaseModel
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+
+from app.exceptions.base import ObjectAlreadyExistsError
+from app.models.specification_types import SpecificationTypeModel
+from app.models.specifications import SpecificationModel
+from app.repositories.base import BaseRepository
+from app.schemes.specifications import SpecificationGet
+from app.utils.spec_values import parse_numeric_value
+
+
+class SpecificationsRepository(BaseRepository):
+    model = SpecificationModel
+    schema = SpecificationGet
+
+    async def add(self, data: BaseModel):
+        """Добавление характеристики: numeric_value разбирается из value сразу"""
+        values = (await self._with_numeric_values([data.model_dump()]))[0]
+        try:
+            result = await self.session.execute(
+                insert(self.model).values(**values).returning(self.model.id)
+            )
+        except IntegrityError as exc:
+            raise ObjectAlreadyExistsError from exc
+        query = (
+            select(self.model)
+            .options(selectinload(self.model.specification_type))
+            .filter_by(id=result.scalar_one())
+        )
+        model = (await self.session.execute(query)).scalar_one()
+        return self.schema.model_validate(model, from_attributes=True)
+
+    async def add_bulk(self, data: list[BaseModel]) -> None:
+        """Множественное добавление характеристик с разобранными numeric_value"""
+        if not data:
+            return
+        rows = await self._with_numeric_values([item.model_dump() for item in data])
+        await self.session.execute(insert(self.model), rows)
+
+    async def edit(self, data: BaseModel, exclude_unset: bool = False, **filter_by) -> None:
+        """Изменение характеристик: numeric_value измененных строк пересчитывается"""
+        await super().edit(data, exclude_unset=exclude_unset, **filter_by)
+        await self.refresh_numeric_values(**filter_by)
+
+    async def _with_numeric_values(self, rows: list[dict]) -> list[dict]:
+        """Дополняет строки характеристик numeric_value в единицах их типов"""
+        type_ids = {row["specification_type_id"] for row in rows}
+        result = await self.session.execute(
+            select(SpecificationTypeModel.id, SpecificationTypeModel.unit)
+            .where(SpecificationTypeModel.id.in_(type_ids))
+        )
+        units = dict(result.all())
+        return [
+            {**row, "numeric_value": parse_numeric_value(row["value"], units.get(row["specification_type_id"]))}
+            for row in rows
+        ]
+
+    async def get_for_items(self, item_ids: list[int]) -> dict[int, list[dict]]:
+        """Характеристики товаров одним запросом: id товара -> [{name, value, unit, numeric_value}]"""
+        query = (
+            select(
+                self.model.item_id,
+                SpecificationTypeModel.name,
+                self.model.value,
+                SpecificationTypeModel.unit,
+                self.model.numeric_value,
+            )
+            .join(SpecificationTypeModel, SpecificationTypeModel.id == self.model.specification_type_id)
+            .where(self.model.item_id.in_(item_ids))
+            .order_by(self.model.item_id, self.model.id)
+        )
+        result = await self.session.execute(query)
+        specifications = {}
+        for row in result.all():
+            specifications.setdefault(row.item_id, []).append({
+                "name": row.name,
+                "value": row.value,
+                "unit": row.unit,
+                "numeric_value": row.numeric_value,
+            })
+        return specifications
+
+    async def refresh_numeric_values(self, chunk_size: int = 5000, **filter_by) -> int:
+        """
+        Заполняет и пересчитывает numeric_value всех характеристик или
+        только подходящих под filter_by (после загрузки характеристик в
+        обход приложения или изменения единицы типа). Возвращает
+        количество измененных строк
+        """
+        changed = 0
+        last_id = 0
+        while True:
+            query = (
+                select(
+                    self.model.id,
+                    self.model.value,
+                    self.model.numeric_value,
+                    SpecificationTypeModel.unit,
+                )
+                .filter_by(**filter_by)
+                .join(SpecificationTypeModel, self.model.specification_type_id == SpecificationTypeModel.id)
+                .where(self.model.id > last_id)
+                .order_by(self.model.id)
+                .limit(chunk_size)
+            )
+            rows = (await self.session.execute(query)).all()
+            if not rows:
+                return changed
+            updates = []
+            for row in rows:
+                numeric_value = parse_numeric_value(row.value, row.unit)
+                if numeric_value != row.numeric_value:
+                    updates.append({"id": row.id, "numeric_value": numeric_value})
+            if updates:
+                # UPDATE по первичному ключу пачкой (executemany)
+                await self.session.execute(update(self.model), updates)
+                changed += len(updates)
+            last_id = rows[-1].id
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -16,6 +16,8 @@ class CartItemGet(BaseModel):
     item_id: int
     item_name: str
     item_price: int
+    # Цена с учетом скидки, по ней считается total_price
+    item_sale_price: int
     item_image_url: Optional[str]
     quantity: int
     total_price: int
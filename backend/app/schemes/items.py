@@ -1,11 +1,9 @@
-from typing import TYPE_CHECKING, Optional, List
+from typing import Optional, List
 from pydantic import BaseModel, Field
 from datetime import datetime
-
-if TYPE_CHECKING:
-    from app.schemes.categories import CategoryGet
-    from app.schemes.brands import BrandGet
-    from app.schemes.specifications import SpecificationGet
+from app.schemes.categories import CategoryGet
+from app.schemes.brands import BrandGet
+from app.schemes.specifications import SpecificationGet
 
 
 class ItemBase(BaseModel):
@@ -35,6 +33,8 @@ class ItemUpdate(BaseModel):
 
 class ItemGet(ItemBase):
     id: int
+    # Доступно к продаже: остаток за вычетом удержаний в корзинах
+    available_quantity: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     
@@ -48,6 +48,25 @@ class ItemGetWithRelations(ItemGet):
     specifications: List["SpecificationGet"] = []
     average_rating: Optional[float] = None
     review_count: int = 0
+    # Релевантность поисковому запросу, заполняется при sort_by=relevance
+    relevance: Optional[float] = None
+
+
+# Поля товара, которые можно запросить в списке через fields=
+ITEM_LIST_FIELDS = (
+    "id", "name", "sku", "price", "discount_price", "quantity", "available_quantity", "description",
+    "main_image_url", "category_id", "brand_id", "created_at", "updated_at",
+    "average_rating", "review_count", "category", "brand",
+)
+
+# Именованные наборы полей для списков (view=); None - полный ItemGetWithRelations
+ITEM_VIEWS = {
+    "card": (
+        "id", "name", "price", "discount_price", "main_image_url", "average_rating",
+        "quantity", "available_quantity",
+    ),
+    "full": None,
+}
 
 
 class ItemSearchParams(BaseModel):
@@ -57,5 +76,7 @@ class ItemSearchParams(BaseModel):
     min_price: Optional[int] = Field(None, ge=0)
     max_price: Optional[int] = Field(None, ge=0)
     in_stock: Optional[bool] = None
-    sort_by: Optional[str] = Field(None, pattern="^(price|name|created_at|rating)$")
+    # Фильтры по характеристикам вида "RAM>=16"
+    specs: Optional[List[str]] = None
+    sort_by: Optional[str] = Field(None, pattern="^(price|name|created_at|rating|relevance)$")
     sort_order: Optional[str] = Field(None, pattern="^(asc|desc)$")
\ No newline at end of file
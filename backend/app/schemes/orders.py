@@ -24,6 +24,10 @@ class OrderCreate(BaseModel):
     items: List[OrderItemCreate] = Field(..., min_items=1)
 
 
+class OrdersCancel(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
 class OrderUpdate(BaseModel):
     status: Optional[OrderStatus] = None
     shipping_address: Optional[str] = Field(None, min_length=5, max_length=500)
@@ -41,6 +45,19 @@ class OrderItemGet(BaseModel):
         from_attributes = True
 
 
+# Поля заказа, которые можно запросить в списке через fields=
+ORDER_LIST_FIELDS = (
+    "id", "user_id", "total_amount", "status", "shipping_address",
+    "contact_phone", "notes", "created_at", "updated_at",
+)
+
+# Именованные наборы полей для списка заказов (view=); None - полный OrderGet
+ORDER_VIEWS = {
+    "summary": ("id", "status", "total_amount", "created_at"),
+    "full": None,
+}
+
+
 class OrderGet(BaseModel):
     id: int
     user_id: int
@@ -21,7 +21,7 @@ class ReviewUpdate(BaseModel):
 class ReviewGet(ReviewBase):
     id: int
     user_id: int
-    user_name: str
+    user_name: Optional[str] = None
     status: str
     created_at: datetime
     updated_at: datetime
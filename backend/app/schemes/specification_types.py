@@ -0,0 +1,12 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class SpecificationTypeGet(BaseModel):
+    id: int
+    name: str
+    unit: Optional[str] = None
+    category_id: int
+    
+    class Config:
+        from_attributes = True
@@ -1,8 +1,6 @@
-from typing import TYPE_CHECKING
+from typing import Optional
 from pydantic import BaseModel, Field
-
-if TYPE_CHECKING:
-    from app.schemes.specification_types import SpecificationTypeGet
+from app.schemes.specification_types import SpecificationTypeGet
 
 
 class SpecificationBase(BaseModel):
@@ -15,8 +13,14 @@ class SpecificationCreate(SpecificationBase):
     pass
 
 
+class SpecificationUpdate(BaseModel):
+    value: Optional[str] = Field(None, max_length=500)
+    specification_type_id: Optional[int] = None
+
+
 class SpecificationGet(SpecificationBase):
     id: int
+    numeric_value: Optional[float] = None
     specification_type: "SpecificationTypeGet"
     
     class Config:
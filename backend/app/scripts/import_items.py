@@ -0,0 +1,36 @@
+"""
+Массовая загрузка товаров из файла в формате выгрузки /items/export
+(то же, что POST /items/import, без ограничения на размер запроса):
+
+    python -m app.scripts.import_items catalog.csv
+    python -m app.scripts.import_items catalog.ndjson --format ndjson
+"""
+import argparse
+import asyncio
+
+from app.database.database import async_session_maker_null_pool
+from app.database.db_manager import DBManager
+from app.services.items import ItemsService
+from app.utils.catalog_import import IMPORT_FORMATS, detect_format, iter_import_rows
+
+
+async def import_items(path: str, import_format: str) -> dict:
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        async with DBManager(session_factory=async_session_maker_null_pool) as db:
+            return await ItemsService(db).import_items(iter_import_rows(stream, import_format))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Импорт товаров из CSV или NDJSON")
+    parser.add_argument("path", help="Файл с товарами")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="По умолчанию по расширению файла")
+    args = parser.parse_args()
+
+    report = asyncio.run(import_items(args.path, args.format or detect_format(args.path)))
+    print(f"Создано: {report['created']}, обновлено: {report['updated']}, с ошибками: {report['failed']}")
+    for error in report["errors"]:
+        print(f"Строка {error['row']} ({error['sku']}): {'; '.join(error['errors'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Заполнение и пересчет числовых значений характеристик товаров.
+
+Характеристики, записанные через приложение (SpecificationsRepository),
+получают numeric_value (по нему работают фильтры specs) сразу. Команду
+нужно запускать после загрузки характеристик в БД в обход приложения
+(при наполнении каталога), а также после изменения единиц измерения
+типов характеристик или правил разбора значений:
+
+    python -m app.scripts.parse_spec_values
+"""
+import asyncio
+
+from app.database.database import async_session_maker_null_pool
+from app.database.db_manager import DBManager
+
+
+async def parse_spec_values() -> int:
+    async with DBManager(session_factory=async_session_maker_null_pool) as db:
+        changed = await db.specifications.refresh_numeric_values()
+        await db.commit()
+    return changed
+
+
+def main() -> None:
+    changed = asyncio.run(parse_spec_values())
+    print(f"Обновлено характеристик: {changed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Сверка агрегатов рейтинга товаров с таблицей отзывов.
+
+Агрегаты обновляются инкрементально при работе с отзывами; команда
+исправляет расхождения после ручных правок БД или сбоев:
+
+    python -m app.scripts.reconcile_ratings
+"""
+import asyncio
+
+from app.database.database import async_session_maker_null_pool
+from app.database.db_manager import DBManager
+
+
+async def reconcile_ratings() -> int:
+    async with DBManager(session_factory=async_session_maker_null_pool) as db:
+        fixed = await db.items.reconcile_ratings()
+        await db.commit()
+    return fixed
+
+
+def main() -> None:
+    fixed = asyncio.run(reconcile_ratings())
+    print(f"Исправлено товаров: {fixed}")
+
+
+if __name__ == "__main__":
+    main()
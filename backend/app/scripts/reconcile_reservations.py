@@ -0,0 +1,28 @@
+"""
+Сверка удержанного количества товаров с таблицей удержаний.
+
+items.reserved_quantity меняется в одной транзакции с удержаниями;
+команда исправляет расхождения после ручных правок БД или сбоев:
+
+    python -m app.scripts.reconcile_reservations
+"""
+import asyncio
+
+from app.database.database import async_session_maker_null_pool
+from app.database.db_manager import DBManager
+
+
+async def reconcile_reservations() -> int:
+    async with DBManager(session_factory=async_session_maker_null_pool) as db:
+        fixed = await db.items.reconcile_reserved()
+        await db.commit()
+    return fixed
+
+
+def main() -> None:
+    fixed = asyncio.run(reconcile_reservations())
+    print(f"Исправлено товаров: {fixed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,67 @@
+import logging
+from functools import partial
+
+from app.config import settings
+from app.database.database import async_session_maker
+from app.database.db_manager import DBManager
 from app.exceptions.base import ObjectNotFoundError
 from app.schemes.cart import CartGet, CartItemGet
 from app.services.base import BaseService
+from app.services.reservations import ReservationsService
+from app.utils.cart_store import CartChange, WriteBehindCartStore
+
+logger = logging.getLogger(__name__)
+
+# Горячий слой корзин: изменения количества пишутся в БД фоновым сбросом
+# (необязателен, без него корзина читается и пишется прямо в cart_items)
+cart_store = (
+    WriteBehindCartStore(max_carts=settings.CART_STORE_MAX_CARTS)
+    if settings.CART_STORE_ENABLED
+    else None
+)
 
 
 class CartService(BaseService):
     
     async def get_cart(self, user_id: int) -> CartGet:
-        """Получение корзины пользователя"""
-        cart_items = await self.db.cart_items.get_user_cart(user_id)
-        
-        total_items = 0
-        total_amount = 0
-        items_data = []
-        
-        for item in cart_items:
-            total_items += item.quantity
-            item_total = item.quantity * item.item.price
-            total_amount += item_total
-            
-            items_data.append(CartItemGet(
-                id=item.id,
-                item_id=item.item.id,
-                item_name=item.item.name,
-                item_price=item.item.price,
-                item_image_url=item.item.main_image_url,
-                quantity=item.quantity,
-                total_price=item_total
-            ))
+        """Получение корзины пользователя: позиции и итоги считает один SQL-запрос"""
+        await self.flush_pending(user_id)
+        lines = await self.db.cart_items.get_user_cart(user_id)
+        if not lines:
+            return CartGet()
         
         return CartGet(
-            items=items_data,
-            total_items=total_items,
-            total_amount=total_amount
+            items=[CartItemGet.model_validate(line) for line in lines],
+            total_items=lines[0]["total_items"],
+            total_amount=lines[0]["total_amount"]
         )
     
     async def add_item(self, user_id: int, cart_item_data):
-        """Добавление товара в корзину"""
-        # Проверяем существование товара
-        item = await self.db.items.get_one_or_none(id=cart_item_data.item_id)
-        if not item:
-            raise ObjectNotFoundError("Товар не найден")
-        
-        # Проверяем наличие на складе
-        if item.quantity < cart_item_data.quantity:
-            raise ValueError(f"Недостаточно товара на складе. Доступно: {item.quantity}")
-        
-        # Проверяем, есть ли уже товар в корзине
-        existing_item = await self.db.cart_items.get_one_or_none(
-            user_id=user_id, 
-            item_id=cart_item_data.item_id
+        """
+        Добавление товара в корзину: строка корзины создается или
+        увеличивается одним запросом с проверкой наличия на складе
+        """
+        item_id = cart_item_data.item_id
+        await self.flush_pending(user_id)
+        new_quantity = await self.db.cart_items.add_quantity(
+            user_id, item_id, cart_item_data.quantity
         )
-        
-        if existing_item:
-            # Обновляем количество
-            new_quantity = existing_item.quantity + cart_item_data.quantity
-            await self.db.cart_items.update_quantity(
-                user_id=user_id, 
-                item_id=cart_item_data.item_id, 
-                quantity=new_quantity
+        if new_quantity is None:
+            available = await self.db.items.get_available_quantities([item_id])
+            if item_id not in available:
+                raise ObjectNotFoundError("Товар не найден")
+            held = await self.db.reservations.get_held(user_id, item_id)
+            raise ValueError(
+                f"Недостаточно товара на складе. Доступно: {available[item_id] + held}"
             )
-        else:
-            # Добавляем новый товар
-            await self.db.cart_items.add_cart_item(user_id, cart_item_data)
+        
+        # Удерживаем товар за покупателем на новое количество
+        await ReservationsService(self.db).hold(
+            user_id, item_id, new_quantity, settings.RESERVATION_CART_TTL
+        )
         
         await self.db.commit()
+        self.forget_cached(user_id)
     
     async def update_item(self, user_id: int, item_id: int, quantity: int):
         """Обновление количества товара в корзине"""
@@ -71,13 +69,9 @@ class CartService(BaseService):
             await self.remove_item(user_id, item_id)
             return
         
-        # Проверяем наличие товара на складе
-        item = await self.db.items.get_one_or_none(id=item_id)
-        if not item:
-            raise ObjectNotFoundError("Товар не найден")
-        
-        if item.quantity < quantity:
-            raise ValueError(f"Недостаточно товара на складе. Доступно: {item.quantity}")
+        if cart_store is not None:
+            await self._set_cached(user_id, item_id, quantity)
+            return
         
         cart_item = await self.db.cart_items.get_one_or_none(
             user_id=user_id, 
@@ -87,11 +81,20 @@ class CartService(BaseService):
         if not cart_item:
             raise ObjectNotFoundError("Товар не найден в корзине")
         
+        # Меняем удержание вместе с количеством (проверяет наличие на складе)
+        await ReservationsService(self.db).hold(
+            user_id, item_id, quantity, settings.RESERVATION_CART_TTL
+        )
+        
         await self.db.cart_items.update_quantity(user_id, item_id, quantity)
         await self.db.commit()
     
     async def remove_item(self, user_id: int, item_id: int):
         """Удаление товара из корзины"""
+        if cart_store is not None:
+            await self._set_cached(user_id, item_id, 0)
+            return
+        
         cart_item = await self.db.cart_items.get_one_or_none(
             user_id=user_id, 
             item_id=item_id
@@ -101,9 +104,116 @@ class CartService(BaseService):
             raise ObjectNotFoundError("Товар не найден в корзине")
         
         await self.db.cart_items.delete(user_id=user_id, item_id=item_id)
+        await ReservationsService(self.db).release(user_id, [item_id])
         await self.db.commit()
     
     async def clear_cart(self, user_id: int):
         """Очистка корзины"""
+        if cart_store is not None:
+            # Несброшенные изменения не нужны: корзина удаляется целиком.
+            # Идущая запись изменений должна закончиться до удаления
+            await cart_store.wait_flushed(user_id)
+            cart_store.forget(user_id)
         await self.db.cart_items.delete(user_id=user_id)
-        await self.db.commit()
\ No newline at end of file
+        await ReservationsService(self.db).release(user_id)
+        await self.db.commit()
+    
+    async def start_checkout(self, user_id: int) -> int:
+        """
+        Начало оформления заказа: все позиции корзины удерживаются еще на
+        RESERVATION_CHECKOUT_TTL секунд. Возвращает этот срок
+        """
+        await self.flush_pending(user_id)
+        cart_lines = await self.db.cart_items.get_checkout_lines(user_id)
+        if not cart_lines:
+            raise ValueError("Корзина пуста")
+        
+        await ReservationsService(self.db).hold_cart(
+            user_id, cart_lines, settings.RESERVATION_CHECKOUT_TTL
+        )
+        await self.db.commit()
+        return settings.RESERVATION_CHECKOUT_TTL
+    
+    async def flush_pending(self, user_id: int) -> None:
+        """
+        Сбрасывает в cart_items несброшенные изменения корзины покупателя
+        из горячего слоя. Вызывается перед чтением и изменением корзины в БД.
+        Без несброшенных изменений ничего не ждет и к БД не обращается
+        """
+        if cart_store is None:
+            return
+        while cart_store.has_changes(user_id):
+            # Изменения, забранные фоновым сбросом, дописываются им самим
+            await cart_store.wait_flushed(user_id)
+            await write_back(self.db, cart_store.take_changes([user_id]))
+    
+    def forget_cached(self, user_id: int) -> None:
+        """Корзина изменена в БД напрямую: горячий слой перечитает ее"""
+        if cart_store is not None:
+            cart_store.forget(user_id)
+    
+    async def _set_cached(self, user_id: int, item_id: int, quantity: int) -> None:
+        """Изменение позиции в горячем слое, без обращения к БД для загруженной корзины"""
+        cart = await cart_store.get(user_id, partial(self.db.cart_items.get_quantities, user_id))
+        if item_id not in cart:
+            raise ObjectNotFoundError("Товар не найден в корзине")
+        cart_store.set(user_id, item_id, quantity)
+
+
+async def write_back(db: DBManager, changes: list[CartChange]) -> None:
+    """
+    Записывает изменения корзин из горячего слоя в одной транзакции:
+    позиции cart_items и удержания товаров. Наличие на складе проверяется
+    здесь: если товара не хватает, позиция урезается до удержанного
+    количества (или удаляется), в слое тоже. Если запись не удалась,
+    изменения возвращаются в слой
+    """
+    if not changes:
+        return
+    # (user_id, item_id, забранное количество, удержанное)
+    shortages = []
+    try:
+        await db.items.lock_rows({item_id for _, item_id, _ in changes})
+        await db.cart_items.apply_changes(changes)
+        reservations = ReservationsService(db)
+        for user_id, item_id, quantity in changes:
+            if quantity <= 0:
+                await reservations.release(user_id, [item_id])
+                continue
+            held = await reservations.hold_available(
+                user_id, item_id, quantity, settings.RESERVATION_CART_TTL
+            )
+            if held < quantity:
+                shortages.append((user_id, item_id, quantity, held))
+        if shortages:
+            await db.cart_items.apply_changes(
+                [(user_id, item_id, held) for user_id, item_id, _, held in shortages]
+            )
+        await db.commit()
+    except BaseException:
+        cart_store.restore(changes)
+        raise
+    for user_id, item_id, quantity, held in shortages:
+        logger.warning(
+            "Недостаточно товара %s для корзины покупателя %s: позиция урезана с %s до %s",
+            item_id, user_id, quantity, held
+        )
+        cart_store.correct(user_id, item_id, quantity, held)
+    cart_store.mark_flushed(changes)
+
+
+async def flush_cart_store(batch_size: int) -> None:
+    """
+    Сбрасывает все изменения горячего слоя пачками по batch_size позиций
+    (фоновая задача, см. run_periodically, и остановка приложения)
+    """
+    flushed = 0
+    while True:
+        changes = cart_store.take_changes(limit=batch_size)
+        if not changes:
+            break
+        async with DBManager(session_factory=async_session_maker) as db:
+            await write_back(db, changes)
+        flushed += len(changes)
+    if flushed:
+        logger.debug("Сброшено изменений корзин: %s", flushed)
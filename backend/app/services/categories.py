@@ -1,6 +1,7 @@
 from app.exceptions.base import ObjectNotFoundError, ObjectAlreadyExistsError
 from app.schemes.categories import CategoryGetWithChildren
 from app.services.base import BaseService
+from app.services.items import search_cache, suggest_index
 
 
 class CategoriesService(BaseService):
@@ -24,9 +25,11 @@ class CategoriesService(BaseService):
             if not parent_category:
                 raise ObjectNotFoundError("Родительская категория не найдена")
         
-        # Создаем категорию
-        await self.db.categories.add(category_data)
+        # Создаем категорию и ее связи с предками
+        category = await self.db.categories.add(category_data)
+        await self.db.categories.add_to_closure(category.id, category_data.parent_id)
         await self.db.commit()
+        suggest_index.add("categories", category.id, category.name)
     
     async def get_category_with_children(self, category_id: int) -> CategoryGetWithChildren:
         """Получение категории с дочерними категориями"""
@@ -41,6 +44,19 @@ class CategoriesService(BaseService):
         """Получение дерева категорий"""
         return await self.db.categories.get_tree()
     
+    async def get_tree_version(self) -> tuple:
+        """Версия дерева категорий для условных запросов"""
+        return await self.db.categories.get_version()
+    
+    async def get_breadcrumbs(self, category_id: int):
+        """Путь от корневой категории до указанной"""
+        breadcrumbs = await self.db.categories.get_breadcrumbs(category_id)
+        
+        if not breadcrumbs:
+            raise ObjectNotFoundError("Категория не найдена")
+        
+        return breadcrumbs
+    
     async def update_category(self, category_id: int, category_data):
         """Обновление категории"""
         category = await self.db.categories.get_one_or_none(id=category_id)
@@ -60,6 +76,22 @@ class CategoriesService(BaseService):
             
             if not parent_category:
                 raise ObjectNotFoundError("Родительская категория не найдена")
+            
+            # Перенос в собственную подкатегорию создал бы цикл
+            if await self.db.categories.is_in_subtree(category_data.parent_id, category_id):
+                raise ValueError("Категорию нельзя перенести в её подкатегорию")
+        
+        parent_changed = (
+            "parent_id" in category_data.model_fields_set
+            and category_data.parent_id != category.parent_id
+        )
+        await self.db.categories.edit(category_data, exclude_unset=True, id=category_id)
+        if parent_changed:
+            await self.db.categories.move_subtree(category_id, category_data.parent_id)
+        await self.db.commit()
         
-        await self.db.categories.edit(category_data, id=category_id)
-        await self.db.commit()
\ No newline at end of file
+        if category_data.name is not None:
+            suggest_index.add("categories", category_id, category_data.name)
+        # Выдача поиска содержит категории товаров, а поиск по категории
+        # включает подкатегории: закэшированные результаты могли устареть
+        search_cache.clear()
\ No newline at end of file
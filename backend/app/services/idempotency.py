@@ -0,0 +1,95 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+import orjson
+
+from app.config import settings
+from app.database.database import async_session_maker
+from app.database.db_manager import DBManager
+from app.exceptions.idempotency import IdempotencyKeyInProgressError, IdempotencyKeyReusedError
+from app.services.base import BaseService
+from app.utils.clock import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+def request_hash(payload: Any) -> str:
+    """Хэш тела запроса, не зависящий от порядка ключей"""
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class IdempotencyService(BaseService):
+    """
+    Ключи идемпотентности (заголовок Idempotency-Key): запрос с ключом
+    выполняется один раз, повторы с тем же ключом получают сохраненный
+    ответ. Ключ занимается отдельной транзакцией до выполнения запроса на
+    короткую аренду IDEMPOTENCY_LEASE_TTL, ответ сохраняется в одной
+    транзакции с изменениями запроса и хранится IDEMPOTENCY_KEY_TTL. Если
+    процесс упал, не сохранив ответ, повторы получают "еще выполняется"
+    до истечения аренды, затем ключ занимается заново
+    """
+
+    async def begin(self, user_id: int, key: str, scope: str, payload: Any) -> datetime | tuple[int, Any]:
+        """
+        Занимает ключ под запрос scope с телом payload. Возвращает срок
+        аренды, если запрос нужно выполнить, или сохраненный ответ повтора
+        (код, тело)
+        """
+        payload_hash = request_hash(payload)
+        now = utcnow()
+        lease = now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_TTL)
+        claimed = await self.db.idempotency_keys.claim(
+            user_id, key, scope, payload_hash, expires_at=lease, now=now,
+        )
+        await self.db.commit()
+        if claimed:
+            return lease
+        
+        record = await self.db.idempotency_keys.get(user_id, key)
+        if record is None or record.status_code is None:
+            # Первый запрос еще выполняется (или как раз отказался от ключа)
+            raise IdempotencyKeyInProgressError
+        if record.scope != scope or record.request_hash != payload_hash:
+            raise IdempotencyKeyReusedError
+        return record.status_code, record.response
+
+    async def lock(self, user_id: int, key: str, lease: datetime) -> None:
+        """
+        Блокирует занятый ключ в транзакции запроса (без коммита): пока она
+        не завершена, ключ не займет повтор, даже если аренда истечет
+        """
+        if not await self.db.idempotency_keys.lock_claim(user_id, key, lease):
+            raise IdempotencyKeyInProgressError
+
+    async def complete(self, user_id: int, key: str, lease: datetime, status_code: int, response: Any) -> None:
+        """Сохраняет ответ на запрос с ключом, если аренда lease еще действует"""
+        await self.db.idempotency_keys.save_response(
+            user_id, key, lease, status_code, response,
+            expires_at=utcnow() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+        )
+        await self.db.commit()
+
+    async def abandon(self, user_id: int, key: str, lease: datetime) -> None:
+        """Освобождает ключ: запрос завершился сбоем, повтор выполнит его заново"""
+        await self.db.idempotency_keys.remove(user_id, key, lease)
+        await self.db.commit()
+
+    async def prune_expired(self, batch_size: int) -> int:
+        """Удаляет истекшие ключи пачками по batch_size, каждая в своей транзакции"""
+        total = 0
+        while True:
+            removed = await self.db.idempotency_keys.remove_expired(utcnow(), batch_size)
+            await self.db.commit()
+            total += removed
+            if removed < batch_size:
+                return total
+
+
+async def prune_expired_idempotency_keys(batch_size: int) -> None:
+    """Удаляет истекшие ключи идемпотентности (фоновая задача, см. run_periodically)"""
+    async with DBManager(session_factory=async_session_maker) as db:
+        removed = await IdempotencyService(db).prune_expired(batch_size)
+    if removed:
+        logger.info("Удалено истекших ключей идемпотентности: %s", removed)
@@ -1,6 +1,54 @@
-from app.exceptions.base import ObjectNotFoundError
-from app.schemes.items import ItemCreate, ItemUpdate, ItemSearchParams
+import csv
+from datetime import datetime
+from typing import Iterable
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.database.database import async_session_maker
+from app.database.db_manager import DBManager
+from app.database.fulltext import search_tokens
+from app.exceptions.base import ObjectAlreadyExistsError, ObjectNotFoundError
+from app.exceptions.items import InvalidImportFileError, InvalidItemIdsError
+from app.schemes.items import ITEM_LIST_FIELDS, ITEM_VIEWS, ItemCreate, ItemUpdate, ItemSearchParams
 from app.services.base import BaseService
+from app.utils.cache import ResultCache
+from app.utils.catalog_import import batched
+from app.utils.catalog_snapshot import CatalogSnapshot
+from app.utils.export import csv_chunk, ndjson_chunk
+from app.utils.fields import resolve_fields
+from app.utils.filters import filters_key, normalize_filters
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.spec_values import parse_spec_filters
+from app.utils.suggest import SuggestIndex
+
+# Кэш результатов поиска и фасетов, общий для запросов процесса
+search_cache = ResultCache(
+    max_bytes=settings.SEARCH_CACHE_MAX_BYTES,
+    ttl=settings.SEARCH_CACHE_TTL,
+)
+
+# Колоночный снимок каталога для поиска без поисковой строки (необязателен)
+catalog_snapshot = (
+    CatalogSnapshot(
+        full_reload_interval=settings.CATALOG_SNAPSHOT_FULL_RELOAD_INTERVAL,
+        overlap=settings.CATALOG_SNAPSHOT_OVERLAP,
+    )
+    if settings.CATALOG_SNAPSHOT_ENABLED
+    else None
+)
+
+# Поле товара со значением сортировки (нужно курсору)
+SORT_FIELDS = {
+    "price": "price",
+    "name": "name",
+    "created_at": "created_at",
+    "rating": "average_rating",
+    "relevance": "relevance",
+}
+
+# Индекс подсказок строки поиска по товарам, брендам и категориям
+suggest_index = SuggestIndex()
 
 
 class ItemsService(BaseService):
@@ -23,6 +71,8 @@ class ItemsService(BaseService):
             
         new_item = await self.db.items.add(item_data)
         await self.db.commit()
+        await self._invalidate_cache(new_item)
+        suggest_index.add("items", new_item.id, new_item.name)
         return new_item
 
     async def get_item(self, item_id: int):
@@ -32,14 +82,147 @@ class ItemsService(BaseService):
             raise ObjectNotFoundError("Товар не найден")
         return item
 
+    async def get_item_version(self, item_id: int) -> tuple[datetime, int]:
+        """
+        Версия карточки товара для условных запросов:
+        (последнее изменение, число характеристик)
+        """
+        version = await self.db.items.get_detail_version(item_id)
+        if version is None:
+            raise ObjectNotFoundError("Товар не найден")
+        return version
+
+    async def get_catalog_version(self) -> tuple:
+        """
+        Версия каталога для условных запросов к спискам товаров. Читается
+        из БД при каждом запросе (один агрегатный запрос): ее меняют и
+        другие процессы, и списание остатков при оформлении заказов
+        """
+        return await self.db.items.get_catalog_version()
+
+    async def get_items_batch(self, ids: str) -> dict:
+        """
+        Товары с детальной информацией по списку id через запятую - за
+        постоянное число запросов, в порядке запроса (повторы убираются).
+        Ненайденные id возвращаются в missing
+        """
+        try:
+            item_ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+        except ValueError as ex:
+            raise InvalidItemIdsError from ex
+        if not item_ids or len(item_ids) > settings.BATCH_MAX_ITEMS:
+            raise InvalidItemIdsError
+        
+        items = await self.db.items.get_many_with_relations(item_ids, with_specifications=True)
+        found_ids = {item.id for item in items}
+        return {
+            "items": items,
+            "missing": [item_id for item_id in item_ids if item_id not in found_ids],
+        }
+
+    async def export_items(self, export_format: str, after_id: int | None = None):
+        """
+        Выгрузка всего каталога с категориями, брендами и характеристиками
+        кусками ответа (bytes) в формате ndjson или csv, по пачке на кусок.
+        Товары идут по возрастанию id: после обрыва соединения выгрузку
+        продолжают с after_id = id последнего полученного товара
+        """
+        if export_format == "csv":
+            yield csv_chunk([], header=True)
+        async for items in self.db.items.iter_export_chunks(after_id, settings.EXPORT_CHUNK_SIZE):
+            specifications = await self.db.specifications.get_for_items([item["id"] for item in items])
+            for item in items:
+                item["specifications"] = specifications.get(item["id"], [])
+            yield csv_chunk(items) if export_format == "csv" else ndjson_chunk(items)
+
+    async def import_items(self, rows: Iterable[tuple[int, dict | None]]) -> dict:
+        """
+        Массовая загрузка товаров: строки (номер строки, данные), см.
+        app/utils/catalog_import.py. Товар с новым артикулом создается, с
+        существующим - обновляется. Строки проверяются и записываются пачками
+        по IMPORT_CHUNK_SIZE: категории и бренды пачки проверяются одним
+        запросом, каждая пачка фиксируется отдельно. Ошибочные строки
+        пропускаются и попадают в errors (не больше IMPORT_MAX_ERRORS)
+        """
+        report = {"created": 0, "updated": 0, "failed": 0, "errors": []}
+        known_categories, known_brands = set(), set()
+        # Артикул -> строка файла, в которой он встретился первым
+        seen_skus = {}
+
+        def fail(row_number: int, data: dict | None, errors: list[str]) -> None:
+            report["failed"] += 1
+            if len(report["errors"]) < settings.IMPORT_MAX_ERRORS:
+                sku = data.get("sku") if isinstance(data, dict) else None
+                report["errors"].append({"row": row_number, "sku": sku, "errors": errors})
+
+        try:
+            for batch in batched(rows, settings.IMPORT_CHUNK_SIZE):
+                parsed = []
+                for row_number, data in batch:
+                    if data is None:
+                        fail(row_number, data, ["Строку не удалось разобрать"])
+                        continue
+                    try:
+                        item = ItemCreate.model_validate(data)
+                    except ValidationError as ex:
+                        fail(row_number, data, [
+                            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                            for error in ex.errors()
+                        ])
+                        continue
+                    if item.sku in seen_skus:
+                        fail(row_number, data, [f"Артикул уже встречался в строке {seen_skus[item.sku]}"])
+                        continue
+                    seen_skus[item.sku] = row_number
+                    parsed.append((row_number, data, item))
+
+                known_categories |= await self.db.categories.get_existing_ids(
+                    {item.category_id for _, _, item in parsed} - known_categories
+                )
+                known_brands |= await self.db.brands.get_existing_ids(
+                    {item.brand_id for _, _, item in parsed} - known_brands
+                )
+                valid = []
+                for row_number, data, item in parsed:
+                    errors = []
+                    if item.category_id not in known_categories:
+                        errors.append("Категория не найдена")
+                    if item.brand_id not in known_brands:
+                        errors.append("Бренд не найден")
+                    if errors:
+                        fail(row_number, data, errors)
+                    else:
+                        valid.append(item)
+
+                created, updated = await self.db.items.upsert_by_sku(valid)
+                await self.db.commit()
+                report["created"] += created
+                report["updated"] += updated
+        except (UnicodeDecodeError, csv.Error) as ex:
+            raise InvalidImportFileError from ex
+        finally:
+            if report["created"] or report["updated"]:
+                search_cache.clear()
+                if catalog_snapshot is not None:
+                    catalog_snapshot.mark_stale()
+        if report["created"] or report["updated"]:
+            await suggest_index.reload(self.db)
+        report["errors"].sort(key=lambda error: error["row"])
+        return report
+
     async def update_item(self, item_id: int, item_data: ItemUpdate):
         """Обновление товара"""
         item = await self.db.items.get_one_or_none(id=item_id)
         if not item:
             raise ObjectNotFoundError("Товар не найден")
             
-        await self.db.items.edit(item_data, id=item_id)
+        await self.db.items.edit(item_data, exclude_unset=True, id=item_id)
+        if item_data.quantity is not None and await self.db.items.is_stock_below_reserved(item_id):
+            raise ValueError("Остаток не может быть меньше удержанного в корзинах покупателей")
         await self.db.commit()
+        await self._invalidate_cache(item)
+        if item_data.name is not None:
+            suggest_index.add("items", item_id, item_data.name)
 
     async def delete_item(self, item_id: int):
         """Удаление товара"""
@@ -49,14 +232,133 @@ class ItemsService(BaseService):
             
         await self.db.items.delete(id=item_id)
         await self.db.commit()
+        await self._invalidate_cache(item)
+        if catalog_snapshot is not None:
+            catalog_snapshot.remove([item_id])
+        suggest_index.remove("items", item_id)
 
-    async def search_items(self, search_params: ItemSearchParams, page: int = 1, per_page: int = 20):
-        """Поиск и фильтрация товаров"""
-        offset = (page - 1) * per_page
+    async def suggest(self, query: str, limit: int) -> dict:
+        """
+        Подсказки для строки поиска: товары, бренды и категории, в названии
+        которых есть слово, начинающееся с query. Ответ строится по индексу
+        в памяти, без обращения к БД: индекс перечитывает фоновая задача
+        (reload_suggest_index)
+        """
+        return suggest_index.suggest(query, limit)
+
+    async def search_items(
+        self,
+        search_params: ItemSearchParams,
+        page: int = 1,
+        per_page: int = 20,
+        cursor: str | None = None,
+        approximate_total: bool = False,
+        fields: str | None = None,
+        view: str | None = None,
+    ):
+        """
+        Поиск и фильтрация товаров.
+        Без cursor работает постраничный режим page/per_page, с cursor -
+        keyset-режим: стоимость страницы не зависит от её глубины,
+        общее количество не считается.
+        approximate_total - не считать общее количество точно: для запроса
+        без фильтров берется оценка СУБД, иначе подсчет ограничивается
+        SEARCH_COUNT_CAP.
+        fields (поля через запятую) или view (ITEM_VIEWS) - загрузить только
+        эти поля: товары возвращаются словарями, id и поле сортировки
+        добавляются всегда.
+        Результаты кэшируются в search_cache по нормализованным фильтрам,
+        сортировке и пагинации
+        """
         filters = search_params.model_dump(exclude_none=True)
+        if filters.get("specs"):
+            filters["specs"] = parse_spec_filters(filters["specs"])
+        if filters.get("sort_by") == "relevance" and not search_tokens(filters.get("name", "")):
+            # Без поисковой строки ранжировать нечего
+            filters["sort_by"] = "created_at"
+        filters.setdefault("sort_by", "created_at")
+        filters.setdefault("sort_order", "desc")
+        sort_field = SORT_FIELDS[filters["sort_by"]]
+        projection = resolve_fields(
+            fields,
+            view,
+            ITEM_VIEWS,
+            ITEM_LIST_FIELDS,
+            required=("id",) if sort_field == "relevance" else ("id", sort_field),
+        )
+        if projection is not None:
+            filters["fields"] = projection
+        
+        cache_key = "search:" + filters_key({
+            **normalize_filters(filters),
+            "sort_by": filters["sort_by"],
+            "sort_order": filters["sort_order"],
+            "fields": projection,
+            "page": page,
+            "per_page": per_page,
+            "cursor": cursor,
+            "approximate_total": approximate_total,
+        })
+        result = search_cache.get(cache_key)
+        if result is None:
+            epoch = search_cache.epoch
+            result = await self._search_items(filters, page, per_page, cursor, approximate_total)
+            tags = [("search", filters.get("category_id"), filters.get("brand_id"))]
+            search_cache.set(cache_key, result, tags, epoch)
+        return result
+
+    async def _search_items(
+        self,
+        filters: dict,
+        page: int,
+        per_page: int,
+        cursor: str | None,
+        approximate_total: bool,
+    ) -> dict:
+        sort_by = filters["sort_by"]
+        sort_order = filters["sort_order"]
+        
+        if (
+            catalog_snapshot is not None
+            and catalog_snapshot.is_current
+            and catalog_snapshot.supports(filters)
+        ):
+            return await self._search_snapshot(filters, page, per_page, cursor)
         
-        items = await self.db.items.search_items(filters, limit=per_page, offset=offset)
-        total_count = await self._count_items(filters)
+        if cursor is not None:
+            after = decode_cursor(cursor, sort_by, sort_order)
+            # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+            items, _ = await self.db.items.search_items(filters, limit=per_page + 1, after=after)
+            has_next = len(items) > per_page
+            items = items[:per_page]
+            
+            return {
+                "items": items,
+                "pagination": {
+                    "per_page": per_page,
+                    "next_cursor": self._next_cursor(items, sort_by, sort_order) if has_next else None,
+                }
+            }
+        
+        offset = (page - 1) * per_page
+        if approximate_total:
+            items, _ = await self.db.items.search_items(filters, limit=per_page, offset=offset)
+            total_count, is_approximate = await self._approximate_count(filters)
+        else:
+            # Страница и общее количество приходят одним запросом
+            items, total_count = await self.db.items.search_items(
+                filters, limit=per_page, offset=offset, with_total=True
+            )
+            is_approximate = False
+            if total_count is None:
+                # Пустая страница: окно не вернуло строк, за пределами первой
+                # страницы количество приходится считать отдельно
+                total_count = await self.db.items.count_items(filters) if offset else 0
+        
+        if is_approximate:
+            has_next = len(items) == per_page
+        else:
+            has_next = offset + len(items) < total_count
         
         return {
             "items": items,
@@ -64,18 +366,141 @@ class ItemsService(BaseService):
                 "page": page,
                 "per_page": per_page,
                 "total": total_count,
-                "total_pages": (total_count + per_page - 1) // per_page
+                "total_pages": (total_count + per_page - 1) // per_page,
+                "total_is_approximate": is_approximate,
+                "next_cursor": self._next_cursor(items, sort_by, sort_order) if has_next else None,
             }
         }
 
+    async def _search_snapshot(
+        self,
+        filters: dict,
+        page: int,
+        per_page: int,
+        cursor: str | None,
+    ) -> dict:
+        """
+        Поиск по снимку каталога: отбор, сортировка и подсчет выполняются
+        в памяти, из БД загружаются только товары страницы
+        """
+        if filters.get("category_id"):
+            # Фильтр по категории включает ее подкатегории
+            subtree_ids = await self.db.categories.get_subtree_ids(filters["category_id"])
+            filters = {**filters, "category_ids": subtree_ids}
+        sort_by = filters["sort_by"]
+        sort_order = filters["sort_order"]
+        
+        if cursor is not None:
+            after = decode_cursor(cursor, sort_by, sort_order)
+            ids, keys, _ = catalog_snapshot.search(filters, limit=per_page + 1, after=after)
+            has_next = len(ids) > per_page
+            ids, keys = ids[:per_page], keys[:per_page]
+        else:
+            offset = (page - 1) * per_page
+            ids, keys, total_count = catalog_snapshot.search(filters, limit=per_page, offset=offset)
+            has_next = offset + len(ids) < total_count
+        
+        if filters.get("fields"):
+            items = await self.db.items.get_many_projected(ids, filters["fields"])
+        else:
+            items = await self.db.items.get_many_with_relations(ids)
+        next_cursor = encode_cursor(sort_by, sort_order, keys[-1], ids[-1]) if has_next else None
+        
+        if cursor is not None:
+            pagination = {"per_page": per_page, "next_cursor": next_cursor}
+        else:
+            pagination = {
+                "page": page,
+                "per_page": per_page,
+                "total": total_count,
+                "total_pages": (total_count + per_page - 1) // per_page,
+                "total_is_approximate": False,
+                "next_cursor": next_cursor,
+            }
+        return {"items": items, "pagination": pagination}
+
+    async def get_facets(self, search_params: ItemSearchParams) -> dict:
+        """
+        Счетчики фасетов для боковой панели каталога при текущих фильтрах.
+        Результат зависит только от нормализованного набора фильтров
+        """
+        filters = search_params.model_dump()
+        if filters.get("specs"):
+            filters["specs"] = parse_spec_filters(filters["specs"])
+        filters = normalize_filters(filters)
+        cache_key = "facets:" + filters_key(filters)
+        result = search_cache.get(cache_key)
+        if result is None:
+            epoch = search_cache.epoch
+            result = await self.db.items.facet_counts(filters, settings.FACET_PRICE_BOUNDS)
+            search_cache.set(cache_key, result, [("facets",)], epoch)
+        return result
+
+    async def _invalidate_cache(self, item) -> None:
+        """
+        Сбрасывает закэшированные результаты, в которые мог попасть товар:
+        поиски без фильтра или с фильтром по его категории (или любому ее
+        предку) и/или бренду,
+        а также все фасеты (фасет не учитывает собственный фильтр).
+        Снимок каталога не используется, пока фоновая задача не догрузит изменения
+        """
+        category_ids = await self.db.categories.get_ancestor_ids(item.category_id)
+        tags = {("facets",)}
+        for category_id in (None, item.category_id, *category_ids):
+            for brand_id in (None, item.brand_id):
+                tags.add(("search", category_id, brand_id))
+        search_cache.invalidate(tags)
+        if catalog_snapshot is not None:
+            catalog_snapshot.mark_stale()
+
+    @staticmethod
+    def _next_cursor(items: list, sort_by: str, sort_order: str) -> str | None:
+        """Курсор на страницу, следующую за последним товаром из items"""
+        if not items:
+            return None
+        last_item = items[-1]
+        field = SORT_FIELDS[sort_by]
+        if isinstance(last_item, dict):
+            # Товар из проекции по полям
+            return encode_cursor(sort_by, sort_order, last_item[field], last_item["id"])
+        return encode_cursor(sort_by, sort_order, getattr(last_item, field), last_item.id)
+
     async def update_stock(self, item_id: int, quantity_change: int):
         """Обновление остатков товара (продавец может управлять остатками)"""
-        try:
-            item = await self.db.items.update_quantity(item_id, quantity_change)
-            if not item:
-                raise ObjectNotFoundError("Товар не найден")
-            return item
-        except ValueError as e:
-            raise ValueError(str(e))
-
-    async def
\ No newline at end of file
+        item = await self.db.items.update_quantity(item_id, quantity_change)
+        if not item:
+            raise ObjectNotFoundError("Товар не найден")
+        await self.db.commit()
+        await self._invalidate_cache(item)
+        return item
+
+    async def _approximate_count(self, filters: dict) -> tuple[int, bool]:
+        """
+        Приблизительное количество товаров по фильтрам.
+        Возвращает (количество, является ли оно приблизительным)
+        """
+        has_filters = any(
+            value for key, value in filters.items() if key not in ("sort_by", "sort_order", "fields")
+        )
+        if not has_filters:
+            estimate = await self.db.items.estimate_count()
+            if estimate is not None:
+                return estimate, True
+        
+        cap = settings.SEARCH_COUNT_CAP
+        total_count = await self.db.items.count_items(filters, limit=cap + 1)
+        if total_count > cap:
+            return cap, True
+        return total_count, False
+
+
+async def refresh_catalog_snapshot() -> None:
+    """Догружает изменения каталога в снимок (фоновая задача, см. run_periodically)"""
+    async with DBManager(session_factory=async_session_maker) as db:
+        await catalog_snapshot.refresh(db.items)
+
+
+async def reload_suggest_index() -> None:
+    """Перечитывает индекс подсказок из БД (фоновая задача, см. run_periodically)"""
+    async with DBManager(session_factory=async_session_maker) as db:
+        await suggest_index.reload(db)
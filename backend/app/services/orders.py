@@ -1,73 +1,217 @@
+import asyncio
+import logging
+from functools import partial
 from typing import List
 from sqlalchemy import select
 
+from app.config import settings
+from app.database.database import async_session_maker
+from app.database.db_manager import DBManager
+from app.database.retry import run_with_retry
 from app.exceptions.base import ObjectNotFoundError
-from app.schemes.orders import OrderCreate, OrderGet, OrderItemGet
+from app.schemes.orders import ORDER_LIST_FIELDS, ORDER_VIEWS, OrderCreate, OrderGet, OrderItemGet
 from app.services.base import BaseService
+from app.services.cart import CartService
+from app.services.reservations import ReservationsService
+from app.utils.fields import resolve_fields
+
+logger = logging.getLogger(__name__)
+
+# Будит обработчиков очереди оформления, когда в нее поставлена заявка
+checkout_queue_wakeup = asyncio.Event()
 
 
 class OrdersService(BaseService):
     
     async def create_order(self, user_id: int, order_data: OrderCreate) -> int:
-        """Создание нового заказа из корзины"""
+        """
+        Создание нового заказа из корзины в одной транзакции и за
+        постоянное число запросов независимо от размера корзины: чтение
+        корзины, списание остатков, заказ, его позиции, очистка корзины.
+        Транзакция, прерванная конфликтом блокировок, повторяется
+        """
+        cart = CartService(self.db)
+        await cart.flush_pending(user_id)
+        order_id = await self._with_retry(partial(self._create_order, user_id, order_data))
+        cart.forget_cached(user_id)
+        return order_id
+    
+    async def _create_order(self, user_id: int, order_data: OrderCreate) -> int:
         # Получаем корзину пользователя
-        cart_items = await self.db.cart_items.get_user_cart(user_id)
+        cart_lines = await self.db.cart_items.get_checkout_lines(user_id)
         
-        if not cart_items:
+        if not cart_lines:
             raise ValueError("Корзина пуста")
         
-        # Проверяем наличие товаров и их количество
-        for cart_item in cart_items:
-            if cart_item.item.quantity < cart_item.quantity:
-                raise ValueError(
-                    f"Недостаточно товара '{cart_item.item.name}' на складе. "
-                    f"Доступно: {cart_item.item.quantity}, запрошено: {cart_item.quantity}"
-                )
+        # Строки всех затронутых товаров блокируются заранее по возрастанию
+        # id: снятие удержаний и списание - разные запросы
+        holds = await self.db.reservations.get_user_holds(user_id)
+        await self.db.items.lock_rows({line["item_id"] for line in cart_lines} | holds.keys())
+        
+        # Снимаем удержания покупателя и списываем остатки одним условным
+        # UPDATE, не трогая удержанное другими: если хотя бы одного товара
+        # не хватает, заказ не создается (транзакция откатывается)
+        await ReservationsService(self.db).release(user_id)
+        await self._take_stock(cart_lines)
+        
+        order_id = await self._add_order(user_id, order_data, cart_lines)
+        
+        # Очищаем корзину
+        await self.db.cart_items.delete(user_id=user_id)
+        
+        await self.db.commit()
+        return order_id
+    
+    async def enqueue_order(self, user_id: int, order_data: OrderCreate) -> int:
+        """
+        Постановка заказа из корзины в очередь (режим CHECKOUT_QUEUE_ENABLED):
+        позиции и цены фиксируются, наличие проверяется без списания, корзина
+        очищается. Удержания товаров переходят от корзины к заявке и
+        остаются до ее обработки: новая корзина покупателя их не заменит.
+        Возвращает id заявки, ее статус - get_checkout_request
+        """
+        cart = CartService(self.db)
+        await cart.flush_pending(user_id)
+        cart_lines = await self.db.cart_items.get_checkout_lines(user_id)
+        
+        if not cart_lines:
+            raise ValueError("Корзина пуста")
         
-        # Рассчитываем общую сумму
-        total_amount = sum(
-            cart_item.item.price * cart_item.quantity 
-            for cart_item in cart_items
+        # Предварительная проверка: доступно другим плюс удержанное покупателем
+        available = await self.db.items.get_available_quantities(
+            [line["item_id"] for line in cart_lines]
         )
+        holds = await self.db.reservations.get_user_holds(user_id)
+        for line in cart_lines:
+            in_stock = available.get(line["item_id"], 0) + holds.get(line["item_id"], 0)
+            if in_stock < line["quantity"]:
+                raise ValueError(self._short_stock_message(line, in_stock))
         
-        # Создаем заказ
-        order = await self.db.orders.add_order(
+        request_id = await self.db.checkout_requests.add_request(user_id, order_data, cart_lines)
+        await self.db.reservations.assign_to_request(
+            user_id, [line["item_id"] for line in cart_lines], request_id
+        )
+        await self.db.cart_items.delete(user_id=user_id)
+        await self.db.commit()
+        cart.forget_cached(user_id)
+        checkout_queue_wakeup.set()
+        return request_id
+    
+    async def get_checkout_request(self, user_id: int, request_id: int) -> dict:
+        """Статус заявки из очереди: queued, done (с order_id) или failed (с error)"""
+        request = await self.db.checkout_requests.get_one_or_none(id=request_id, user_id=user_id)
+        if not request:
+            raise ObjectNotFoundError("Заявка не найдена")
+        return {
+            "id": request.id,
+            "status": request.status,
+            "order_id": request.order_id,
+            "error": request.error,
+        }
+    
+    async def process_checkout_batch(self, batch_size: int) -> int:
+        """
+        Обрабатывает до batch_size заявок из очереди в одной транзакции.
+        Остатки всех заявок пачки списываются одним UPDATE, сгруппированным
+        по товарам, - так каждая строка товара блокируется один раз на пачку.
+        Если какого-то товара на всю пачку не хватает, заявки обрабатываются
+        по одной, не прошедшие получают статус failed, их удержания снимаются.
+        Возвращает число обработанных заявок
+        """
+        requests = await self.db.checkout_requests.claim_batch(batch_size)
+        if not requests:
+            return 0
+        try:
+            async with self.db.session.begin_nested():
+                await self._fulfil_requests(requests)
+        except ValueError:
+            for request in requests:
+                try:
+                    async with self.db.session.begin_nested():
+                        await self._fulfil_requests([request])
+                except ValueError as e:
+                    await ReservationsService(self.db).release_requests([request.id])
+                    await self.db.checkout_requests.mark_failed(request.id, str(e))
+        await self.db.commit()
+        return len(requests)
+    
+    async def _fulfil_requests(self, requests: list) -> None:
+        """Списывает остатки сразу под все заявки и создает по ним заказы"""
+        await self.db.items.lock_rows(
+            {line["item_id"] for request in requests for line in request.lines}
+        )
+        await ReservationsService(self.db).release_requests([request.id for request in requests])
+        changes = {}
+        for request in requests:
+            for line in request.lines:
+                changes[line["item_id"]] = changes.get(line["item_id"], 0) + line["quantity"]
+        lines = [line for request in requests for line in request.lines]
+        await self._take_stock(lines, totals=changes)
+        for request in requests:
+            order_id = await self._add_order(request.user_id, request, request.lines)
+            await self.db.checkout_requests.mark_done(request.id, order_id)
+    
+    async def _take_stock(self, lines: list[dict], totals: dict[int, int] | None = None) -> None:
+        """
+        Списывает остатки под позиции одним условным UPDATE, не трогая
+        удержанное другими покупателями. totals - количество по товарам,
+        если позиции одного товара повторяются. Если какого-то товара не
+        хватает, поднимает ValueError - транзакцию нужно откатить
+        """
+        if totals is None:
+            totals = {line["item_id"]: line["quantity"] for line in lines}
+        changes = {item_id: -quantity for item_id, quantity in totals.items()}
+        updated = await self.db.items.update_quantities(changes, respect_reserved=True)
+        if len(updated) < len(changes):
+            available = await self.db.items.get_available_quantities(
+                [item_id for item_id in changes if item_id not in updated]
+            )
+            short = next(line for line in lines if line["item_id"] not in updated)
+            raise ValueError(self._short_stock_message(short, available.get(short["item_id"], 0)))
+    
+    @staticmethod
+    def _short_stock_message(line: dict, available: int) -> str:
+        return (
+            f"Недостаточно товара '{line['name']}' на складе. "
+            f"Доступно: {available}, запрошено: {line['quantity']}"
+        )
+    
+    async def _add_order(self, user_id: int, order_data, lines: list[dict]) -> int:
+        """Заказ и его позиции; order_data - адрес, телефон и комментарий"""
+        total_amount = sum(line["price"] * line["quantity"] for line in lines)
+        order_id = await self.db.orders.add_order(
             user_id=user_id,
             total_amount=total_amount,
             shipping_address=order_data.shipping_address,
             contact_phone=order_data.contact_phone,
             notes=order_data.notes
         )
-        
-        # Создаем позиции заказа
-        for cart_item in cart_items:
-            await self.db.order_items.add_order_item(
-                order_id=order.id,
-                item_id=cart_item.item_id,
-                quantity=cart_item.quantity,
-                price_at_purchase=cart_item.item.price
-            )
-            
-            # Уменьшаем остаток товара
-            await self.db.items.update_quantity(
-                cart_item.item_id, 
-                -cart_item.quantity
-            )
-        
-        # Очищаем корзину
-        await self.db.cart_items.delete(user_id=user_id)
-        
-        await self.db.commit()
-        return order.id
+        await self.db.order_items.add_order_items(order_id, [
+            {"item_id": line["item_id"], "quantity": line["quantity"], "price_at_purchase": line["price"]}
+            for line in lines
+        ])
+        return order_id
     
-    async def get_user_orders(self, user_id: int, page: int = 1, per_page: int = 10):
-        """Получение заказов пользователя с пагинацией"""
+    async def get_user_orders(
+        self,
+        user_id: int,
+        page: int = 1,
+        per_page: int = 10,
+        fields: str | None = None,
+        view: str | None = None,
+    ):
+        """
+        Получение заказов пользователя с пагинацией.
+        fields (поля через запятую) или view (ORDER_VIEWS) - только эти поля
+        """
         offset = (page - 1) * per_page
+        projection = resolve_fields(fields, view, ORDER_VIEWS, ORDER_LIST_FIELDS)
         
         orders = await self.db.orders.get_user_orders(
             user_id=user_id,
             limit=per_page,
-            offset=offset
+            offset=offset,
+            fields=projection,
         )
         
         total = await self.db.orders.count_user_orders(user_id)
@@ -88,23 +232,68 @@ class OrdersService(BaseService):
         return order
     
     async def cancel_order(self, user_id: int, order_id: int):
-        """Отмена заказа"""
-        order = await self.db.orders.get_one_or_none(id=order_id, user_id=user_id)
-        
-        if not order:
-            raise ObjectNotFoundError("Заказ не найден")
-        
-        if order.status not in ["pending", "processing"]:
+        """
+        Отмена заказа покупателем: смена статуса и возврат товаров на склад,
+        два запроса при любом числе позиций. Транзакция, прерванная
+        конфликтом блокировок, повторяется
+        """
+        await self._with_retry(partial(self._cancel_order, user_id, order_id))
+    
+    async def _cancel_order(self, user_id: int, order_id: int):
+        if not await self.db.orders.cancel([order_id], user_id=user_id):
+            if await self.db.orders.get_status(user_id, order_id) is None:
+                raise ObjectNotFoundError("Заказ не найден")
             raise ValueError("Невозможно отменить заказ в текущем статусе")
         
         # Возвращаем товары на склад
-        order_items = await self.db.order_items.get_by_order(order_id)
-        for order_item in order_items:
-            await self.db.items.update_quantity(
-                order_item.item_id,
-                order_item.quantity
-            )
-        
-        # Обновляем статус заказа
-        await self.db.orders.update_status(order_id, "cancelled")
-        await self.db.commit()
\ No newline at end of file
+        await self.db.items.restock_orders([order_id])
+        await self.db.commit()
+    
+    async def cancel_orders(self, order_ids: list[int]) -> dict[str, list[int]]:
+        """
+        Массовая отмена заказов администратором в одной транзакции и за
+        два запроса при любом числе заказов. Заказы, которых нет или которые
+        уже нельзя отменить, пропускаются
+        """
+        cancelled = await self._with_retry(partial(self._cancel_orders, order_ids))
+        return {
+            "cancelled": sorted(cancelled),
+            "skipped": sorted(set(order_ids) - set(cancelled)),
+        }
+    
+    async def _cancel_orders(self, order_ids: list[int]) -> list[int]:
+        cancelled = await self.db.orders.cancel(order_ids)
+        await self.db.items.restock_orders(cancelled)
+        await self.db.commit()
+        return cancelled
+    
+    async def _with_retry(self, operation):
+        return await run_with_retry(
+            self.db,
+            operation,
+            attempts=settings.ORDER_RETRY_ATTEMPTS,
+            base_delay=settings.ORDER_RETRY_BASE_DELAY,
+            max_delay=settings.ORDER_RETRY_MAX_DELAY,
+        )
+
+
+async def checkout_worker(batch_size: int, poll_interval: float) -> None:
+    """
+    Обработчик очереди оформления (фоновая задача, запускается в lifespan
+    CHECKOUT_WORKERS раз). Разбирает очередь пачками, пока она не опустеет,
+    затем ждет новой заявки этого процесса или poll_interval секунд
+    """
+    while True:
+        processed = 0
+        try:
+            async with DBManager(session_factory=async_session_maker) as db:
+                processed = await OrdersService(db).process_checkout_batch(batch_size)
+        except Exception:
+            logger.exception("Ошибка обработки очереди оформления")
+        if processed:
+            continue
+        try:
+            await asyncio.wait_for(checkout_queue_wakeup.wait(), poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        checkout_queue_wakeup.clear()
@@ -0,0 +1,113 @@
+import logging
+from datetime import timedelta
+
+from app.database.database import async_session_maker
+from app.database.db_manager import DBManager
+from app.exceptions.base import ObjectNotFoundError
+from app.services.base import BaseService
+from app.utils.clock import utcnow
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationsService(BaseService):
+    """
+    Временные удержания товара за покупателем. Удержание создается, когда
+    товар попадает в корзину, и продлевается в начале оформления заказа;
+    пока оно действует, товар не может купить или удержать другой
+    покупатель. Методы не фиксируют транзакцию - это делает вызывающий
+    сервис вместе со своими изменениями
+    """
+
+    async def hold(self, user_id: int, item_id: int, quantity: int, ttl: int) -> None:
+        """
+        Удерживает quantity штук товара за покупателем на ttl секунд (вместо
+        прежнего удержания). Строки товара и удержания блокируются в этом
+        порядке, как и при оформлении заказа: параллельные изменения
+        удержания одного товара выполняются по очереди, и каждое меняет
+        reserved_quantity на разницу с удержанием, которое оно заменяет
+        """
+        expires_at = utcnow() + timedelta(seconds=ttl)
+        if not await self.db.items.lock_rows([item_id]):
+            raise ObjectNotFoundError("Товар не найден")
+        held = await self.db.reservations.lock_held(user_id, item_id, expires_at)
+        if quantity != held and not await self.db.items.change_reserved({item_id: quantity - held}):
+            if not held:
+                # Пустое удержание создано lock_held, удерживать нечего
+                await self.db.reservations.remove(user_id, [item_id])
+            available = await self.db.items.get_available_quantities([item_id])
+            raise ValueError(
+                f"Недостаточно товара на складе. Доступно: {available[item_id] + held}"
+            )
+        await self.db.reservations.upsert(user_id, item_id, quantity, expires_at)
+
+    async def hold_available(self, user_id: int, item_id: int, quantity: int, ttl: int) -> int:
+        """
+        Как hold, но при нехватке товара удерживает столько, сколько есть
+        (не больше quantity). Возвращает удержанное количество; 0 - товар
+        не удержан
+        """
+        try:
+            await self.hold(user_id, item_id, quantity, ttl)
+            return quantity
+        except ValueError:
+            pass
+        available = await self.db.items.get_available_quantities([item_id])
+        held = await self.db.reservations.get_held(user_id, item_id)
+        quantity = min(quantity, available.get(item_id, 0) + held)
+        if quantity > 0:
+            await self.hold(user_id, item_id, quantity, ttl)
+        return quantity
+
+    async def release(self, user_id: int, item_ids: list[int] | None = None) -> dict[int, int]:
+        """Снимает удержания покупателя (все или по товарам), возвращает снятые количества"""
+        released = await self.db.reservations.remove(user_id, item_ids)
+        await self.db.items.change_reserved(
+            {item_id: -quantity for item_id, quantity in released.items()}
+        )
+        return released
+
+    async def release_requests(self, request_ids: list[int]) -> dict[int, int]:
+        """Снимает удержания заявок из очереди оформления, возвращает снятые количества"""
+        released = await self.db.reservations.remove_for_requests(request_ids)
+        await self.db.items.change_reserved(
+            {item_id: -quantity for item_id, quantity in released.items()}
+        )
+        return released
+
+    async def hold_cart(self, user_id: int, cart_lines: list, ttl: int) -> None:
+        """
+        Начало оформления: удерживает все позиции корзины (словари с item_id
+        и quantity) не меньше чем на ttl секунд. Позиции, удержание которых
+        уже покрывает корзину, только продлеваются
+        """
+        holds = await self.db.reservations.get_user_holds(user_id)
+        for line in cart_lines:
+            if holds.get(line["item_id"], 0) < line["quantity"]:
+                await self.hold(user_id, line["item_id"], line["quantity"], ttl)
+        await self.db.reservations.extend(user_id, utcnow() + timedelta(seconds=ttl))
+
+    async def release_expired(self, batch_size: int) -> int:
+        """
+        Снимает истекшие удержания пачками по batch_size, каждая пачка в
+        своей транзакции. Возвращает число снятых удержаний
+        """
+        total = 0
+        while True:
+            rows = await self.db.reservations.remove_expired(utcnow(), batch_size)
+            released = {}
+            for item_id, quantity in rows:
+                released[item_id] = released.get(item_id, 0) - quantity
+            await self.db.items.change_reserved(released)
+            await self.db.commit()
+            total += len(rows)
+            if len(rows) < batch_size:
+                return total
+
+
+async def sweep_expired_reservations(batch_size: int) -> None:
+    """Снимает истекшие удержания (фоновая задача, см. run_periodically)"""
+    async with DBManager(session_factory=async_session_maker) as db:
+        released = await ReservationsService(db).release_expired(batch_size)
+    if released:
+        logger.info("Снято истекших удержаний: %s", released)
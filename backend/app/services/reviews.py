@@ -4,8 +4,37 @@ from app.schemes.reviews import ReviewGet
 from app.services.base import BaseService
 
 
+def _rating_contribution(status: str, rating: int) -> tuple[int, int]:
+    """Вклад отзыва в агрегаты товара: (число отзывов, сумма оценок)"""
+    if status == "approved":
+        return 1, rating
+    return 0, 0
+
+
 class ReviewsService(BaseService):
     
+    async def _update_item_rating(self, item_id: int, before: tuple[int, int], after: tuple[int, int]):
+        """Переносит изменение вклада отзыва в агрегаты товара"""
+        count_change = after[0] - before[0]
+        rating_change = after[1] - before[1]
+        if count_change or rating_change:
+            await self.db.items.apply_rating_change(item_id, count_change, rating_change)
+    
+    async def _change_review(self, write, **filter_by) -> ReviewGet:
+        """
+        Читает отзыв и выполняет write(review) - условную запись, которая
+        срабатывает, только если статус и оценка отзыва остались такими же,
+        как при чтении. Если отзыв успели изменить параллельно, он
+        перечитывается: вклад в агрегаты товара всегда считается от тех
+        значений, которые запись действительно заменила
+        """
+        while True:
+            review = await self.db.reviews.get_one_or_none(**filter_by)
+            if not review:
+                raise ObjectNotFoundError("Отзыв не найден")
+            if await write(review):
+                return review
+    
     async def create_review(self, user_id: int, review_data):
         """Создание отзыва о товаре"""
         # Проверяем существование товара
@@ -35,6 +64,9 @@ class ReviewsService(BaseService):
             rating=review_data.rating,
             description=review_data.description
         )
+        await self._update_item_rating(
+            review.item_id, (0, 0), _rating_contribution(review.status, review.rating)
+        )
         
         await self.db.commit()
         return review
@@ -49,10 +81,8 @@ class ReviewsService(BaseService):
             offset=offset
         )
         
-        total = await self.db.reviews.count_item_reviews(item_id)
-        
-        # Получаем средний рейтинг
-        avg_rating = await self.db.reviews.get_average_rating(item_id)
+        # Средний рейтинг и количество одобренных отзывов хранятся в товаре
+        avg_rating, total = await self.db.items.get_rating(item_id) or (0.0, 0)
         
         return {
             "reviews": reviews,
@@ -68,41 +98,46 @@ class ReviewsService(BaseService):
     
     async def update_review(self, user_id: int, review_id: int, review_data):
         """Обновление отзыва"""
-        review = await self.db.reviews.get_one_or_none(
+        values = review_data.model_dump(exclude_unset=True)
+        if not values:
+            # Менять нечего, только проверяем, что отзыв есть
+            if not await self.db.reviews.get_one_or_none(id=review_id, user_id=user_id):
+                raise ObjectNotFoundError("Отзыв не найден")
+            return
+        
+        review = await self._change_review(
+            lambda review: self.db.reviews.update_if_unchanged(review, **values),
             id=review_id,
-            user_id=user_id
+            user_id=user_id,
         )
-        
-        if not review:
-            raise ObjectNotFoundError("Отзыв не найден")
-        
-        await self.db.reviews.edit(
-            review_data,
-            id=review_id,
-            user_id=user_id
+        new_rating = review_data.rating if review_data.rating is not None else review.rating
+        await self._update_item_rating(
+            review.item_id,
+            _rating_contribution(review.status, review.rating),
+            _rating_contribution(review.status, new_rating),
         )
         
         await self.db.commit()
     
     async def delete_review(self, user_id: int, review_id: int):
         """Удаление отзыва"""
-        review = await self.db.reviews.get_one_or_none(
-            id=review_id,
-            user_id=user_id
+        review = await self._change_review(
+            self.db.reviews.delete_if_unchanged, id=review_id, user_id=user_id
+        )
+        await self._update_item_rating(
+            review.item_id, _rating_contribution(review.status, review.rating), (0, 0)
         )
-        
-        if not review:
-            raise ObjectNotFoundError("Отзыв не найден")
-        
-        await self.db.reviews.delete(id=review_id, user_id=user_id)
         await self.db.commit()
     
     async def moderate_review(self, review_id: int, status: str):
         """Модерация отзыва (для администраторов)"""
-        review = await self.db.reviews.get_one_or_none(id=review_id)
-        
-        if not review:
-            raise ObjectNotFoundError("Отзыв не найден")
-        
-        await self.db.reviews.update_status(review_id, status)
+        review = await self._change_review(
+            lambda review: self.db.reviews.update_if_unchanged(review, status=status),
+            id=review_id,
+        )
+        await self._update_item_rating(
+            review.item_id,
+            _rating_contribution(review.status, review.rating),
+            _rating_contribution(status, review.rating),
+        )
         await self.db.commit()
\ No newline at end of file
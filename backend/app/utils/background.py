@@ -0,0 +1,26 @@
+"""Периодические фоновые задачи процесса (запускаются в lifespan приложения)"""
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(
+    job: Callable[[], Awaitable],
+    interval: float,
+    name: str,
+    initial_delay: float = 0,
+) -> None:
+    """
+    Выполняет job раз в interval секунд, пока задачу не отменят; первый
+    запуск - через initial_delay секунд. Ошибка одного запуска пишется в
+    лог и не останавливает задачу
+    """
+    await asyncio.sleep(initial_delay)
+    while True:
+        try:
+            await job()
+        except Exception:
+            logger.exception("Ошибка фоновой задачи %s", name)
+        await asyncio.sleep(interval)
@@ -0,0 +1,116 @@
+"""
+Кэш результатов поиска в памяти процесса.
+
+Записи живут не дольше ttl секунд. Объем кэша ограничен суммарным
+примерным размером записей (по умолчанию - длина их JSON): страница поиска
+весит на порядки больше версии каталога, так что число записей память не
+ограничивает. При превышении max_bytes вытесняются давно не использованные
+записи (LRU). Каждая запись помечается тегами, invalidate(tags) удаляет все
+записи с любым из тегов.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable
+
+from app.utils.serialization import dump_json
+
+
+def serialized_size(value: Any) -> int:
+    """Примерный размер значения - длина его JSON"""
+    return len(dump_json(value))
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        sizeof: Callable[[Any], int] = serialized_size,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._clock = clock
+        # ключ -> (момент истечения, теги, размер, значение), порядок - от давно использованных
+        self._entries: OrderedDict[str, tuple[float, tuple, int, Any]] = OrderedDict()
+        self.bytes = 0
+        self._keys_by_tag: dict[Hashable, set[str]] = {}
+        # Счетчик инвалидаций: результат, посчитанный до инвалидации, не сохраняется
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any | None:
+        """Значение по ключу или None, если его нет или оно устарело"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self._clock():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+        if entry is not None:
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, tags: Iterable[Hashable], epoch: int | None = None) -> None:
+        """
+        Сохраняет значение. epoch - значение self.epoch до вычисления value:
+        если с тех пор была инвалидация, значение могло устареть и отбрасывается.
+        Значение больше max_bytes не сохраняется
+        """
+        if epoch is not None and epoch != self.epoch:
+            return
+        if key in self._entries:
+            self._remove(key)
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        tags = tuple(tags)
+        self._entries[key] = (self._clock() + self.ttl, tags, size, value)
+        self.bytes += size
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, tags: Iterable[Hashable]) -> int:
+        """Удаляет записи с любым из тегов, возвращает их количество"""
+        self.epoch += 1
+        keys = set()
+        for tag in tags:
+            keys |= self._keys_by_tag.get(tag, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+        }
+
+    def _remove(self, key: str) -> None:
+        _, tags, size, _ = self._entries.pop(key)
+        self.bytes -= size
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
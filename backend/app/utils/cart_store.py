@@ -0,0 +1,145 @@
+"""
+Горячий слой корзин в памяти процесса (write-behind).
+
+Количество товаров в активных корзинах хранится в памяти: изменение
+позиции не обращается к БД, а только помечает ее измененной. Фоновая
+задача периодически сбрасывает изменения в cart_items пачками, так что
+частые +1/-1 одной позиции превращаются в одну запись. Корзины, которых
+нет в памяти, загружаются из БД при первом обращении (read-through).
+
+При остановке процесса изменения сбрасываются целиком; при аварийном
+завершении теряются изменения не старше интервала сброса. Слой видит
+только свой процесс: запросы одного покупателя должны попадать в один
+процесс (sticky-сессии) или процесс должен быть один.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable
+
+# Изменение позиции: (user_id, item_id, количество); 0 - позиция удалена
+CartChange = tuple[int, int, int]
+
+
+class WriteBehindCartStore:
+    def __init__(self, max_carts: int):
+        """
+        max_carts - сколько корзин держать в памяти; сверх этого вытесняются
+        давно не использованные корзины без несброшенных изменений (LRU)
+        """
+        self.max_carts = max_carts
+        # user_id -> {item_id: количество}, порядок - от давно использованных
+        self._carts: OrderedDict[int, dict[int, int]] = OrderedDict()
+        # user_id -> id товаров, измененных после последнего сброса
+        self._dirty: dict[int, set[int]] = {}
+        # user_id -> событие окончания записи: изменения корзины забраны и
+        # пишутся в БД. Пока запись идет, новые изменения этой корзины не
+        # забираются: позиция не может быть записана устаревшим значением
+        # после более нового. Сбросы разных корзин друг друга не ждут
+        self._flushing: dict[int, asyncio.Event] = {}
+
+    def __len__(self) -> int:
+        return len(self._carts)
+
+    @property
+    def pending(self) -> int:
+        """Сколько позиций ждут сброса в БД"""
+        return sum(len(item_ids) for item_ids in self._dirty.values())
+
+    def has_changes(self, user_id: int) -> bool:
+        """Есть ли у корзины изменения, еще не записанные в БД (в том числе записываемые)"""
+        return user_id in self._dirty or user_id in self._flushing
+
+    async def wait_flushed(self, user_id: int) -> None:
+        """Ждет окончания идущей записи изменений корзины"""
+        while user_id in self._flushing:
+            await self._flushing[user_id].wait()
+
+    async def get(self, user_id: int, load: Callable[[], Awaitable[dict[int, int]]]) -> dict[int, int]:
+        """Корзина покупателя {item_id: количество}; load загружает ее из БД"""
+        cart = self._carts.get(user_id)
+        if cart is None:
+            loaded = await load()
+            # Пока корзина грузилась, ее могли загрузить и изменить
+            cart = self._carts.setdefault(user_id, loaded)
+        self._carts.move_to_end(user_id)
+        self._evict()
+        return dict(cart)
+
+    def set(self, user_id: int, item_id: int, quantity: int) -> None:
+        """Меняет количество товара в загруженной корзине; 0 удаляет позицию"""
+        cart = self._carts[user_id]
+        if quantity > 0:
+            cart[item_id] = quantity
+        else:
+            cart.pop(item_id, None)
+        self._dirty.setdefault(user_id, set()).add(item_id)
+
+    def take_changes(self, user_ids: Iterable[int] | None = None, limit: int | None = None) -> list[CartChange]:
+        """
+        Забирает несброшенные изменения всех корзин или только user_ids с
+        текущими количествами. limit - примерный размер пачки: корзина
+        попадает в пачку целиком. Корзины, запись которых еще идет,
+        пропускаются. После записи в БД нужно вызвать mark_flushed, если
+        запись не удалась - вернуть изменения через restore
+        """
+        users = [
+            user_id for user_id in (self._dirty if user_ids is None else user_ids)
+            if user_id in self._dirty and user_id not in self._flushing
+        ]
+        changes = []
+        for user_id in users:
+            if limit is not None and len(changes) >= limit:
+                break
+            cart = self._carts[user_id]
+            item_ids = self._dirty.pop(user_id)
+            self._flushing[user_id] = asyncio.Event()
+            changes.extend((user_id, item_id, cart.get(item_id, 0)) for item_id in sorted(item_ids))
+        return changes
+
+    def mark_flushed(self, changes: list[CartChange]) -> None:
+        """Запись изменений закончена: корзины снова можно сбрасывать"""
+        for user_id in {user_id for user_id, _, _ in changes}:
+            event = self._flushing.pop(user_id, None)
+            if event is not None:
+                event.set()
+
+    def correct(self, user_id: int, item_id: int, taken: int, written: int) -> None:
+        """
+        Позиция записана в БД с другим количеством, чем было забрано
+        (товара не хватило). Если после забора ее не меняли, в памяти
+        ставится записанное количество; иначе новое изменение запишется
+        следующим сбросом. Вызывается до mark_flushed
+        """
+        cart = self._carts.get(user_id)
+        if cart is None or item_id in self._dirty.get(user_id, ()) or cart.get(item_id, 0) != taken:
+            return
+        if written > 0:
+            cart[item_id] = written
+        else:
+            cart.pop(item_id, None)
+
+    def restore(self, changes: list[CartChange]) -> None:
+        """Снова помечает позиции измененными (запись в БД не удалась)"""
+        for user_id, item_id, _ in changes:
+            if user_id in self._carts:
+                self._dirty.setdefault(user_id, set()).add(item_id)
+        self.mark_flushed(changes)
+
+    def forget(self, user_id: int) -> None:
+        """
+        Убирает корзину из памяти вместе с несброшенными изменениями:
+        корзина изменена в БД напрямую, следующее обращение перечитает ее
+        """
+        self._carts.pop(user_id, None)
+        self._dirty.pop(user_id, None)
+
+    def _evict(self) -> None:
+        excess = len(self._carts) - self.max_carts
+        if excess <= 0:
+            return
+        for user_id in list(self._carts)[:-1]:
+            if excess <= 0:
+                break
+            if user_id not in self._dirty and user_id not in self._flushing:
+                del self._carts[user_id]
+                excess -= 1
@@ -0,0 +1,48 @@
+"""
+Чтение файла импорта каталога.
+
+Формат совпадает с выгрузкой /items/export: NDJSON - объект на строку,
+CSV - с заголовком. Нужны поля ItemCreate, лишние колонки (id, названия
+категории и бренда, рейтинг) игнорируются, так что выгрузку можно
+загрузить обратно. Пустые ячейки CSV считаются отсутствующими значениями.
+"""
+import csv
+from itertools import islice
+from typing import Iterable, Iterator, TextIO
+
+import orjson
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+def detect_format(filename: str | None) -> str:
+    """Формат по расширению файла, по умолчанию ndjson"""
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+
+def iter_import_rows(stream: TextIO, import_format: str) -> Iterator[tuple[int, dict | None]]:
+    """
+    Строки файла по одной: (номер строки в файле, данные). Данные None -
+    строку не удалось разобрать
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value != ""}
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            data = None
+        yield line_number, data if isinstance(data, dict) else None
+
+
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,258 @@
+"""
+Колоночный снимок каталога в памяти процесса.
+
+Для каждого товара хранятся только поля, по которым фильтруется и
+сортируется поиск, и цена со скидкой, в виде массивов NumPy,
+упорядоченных по id. Фильтрация,
+сортировка и пагинация выполняются векторно, из БД догружается только
+видимая страница. Снимок обновляется фоновой задачей инкрементально по
+updated_at: новые массивы строятся рядом и подменяют прежние целиком,
+запросы только читают текущие.
+
+Поиск по строке, фильтры по характеристикам и сортировка по
+названию/релевантности снимком не поддерживаются и выполняются SQL-запросом.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from app.database.fulltext import search_tokens
+
+try:
+    import numpy as np
+except ImportError:  # numpy - необязательная зависимость (extra "snapshot")
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+
+# discount_price товара без скидки (в массиве NumPy нет None)
+NO_DISCOUNT = -1
+
+# Сортировки, которые умеет снимок
+SNAPSHOT_SORTS = ("price", "created_at", "rating")
+
+# Порядок полей в строках ItemsRepository.snapshot_rows
+ROW_FIELDS = (
+    "id", "price", "discount_price", "available_quantity", "category_id", "brand_id", "created_at", "rating",
+)
+DTYPES = {
+    "id": "int64",
+    "price": "int64",
+    "discount_price": "int64",  # NO_DISCOUNT, если скидки нет
+    "available_quantity": "int32",  # остаток за вычетом удержанного
+    "category_id": "int32",
+    "brand_id": "int32",
+    "created_at": "int64",  # микросекунды от EPOCH
+    "rating": "float64",
+}
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+class CatalogSnapshot:
+    def __init__(
+        self,
+        full_reload_interval: float,
+        overlap: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        full_reload_interval - как часто снимок перечитывается целиком
+        (так из него пропадают товары, удаленные другими процессами);
+        overlap - на сколько секунд назад от последнего updated_at
+        перечитываются строки: транзакция могла зафиксироваться позже
+        своего updated_at
+        """
+        if np is None:
+            raise RuntimeError("Для снимка каталога нужен numpy: pip install voltmarket[snapshot]")
+        self.full_reload_interval = full_reload_interval
+        self.overlap = overlap
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self._columns = self._build_columns([])
+        self.watermark: datetime | None = None
+        self.loaded_at: float | None = None
+        # Номер изменения каталога в процессе и номер, учтенный снимком
+        self._version = 0
+        self._refreshed_version = -1
+        # Товары, удаленные во время обновления: None - обновление не идет
+        self._removed: list[int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._columns["id"])
+
+    @staticmethod
+    def supports(filters: dict) -> bool:
+        """Можно ли выполнить поиск с такими фильтрами по снимку"""
+        if filters.get("sort_by") not in SNAPSHOT_SORTS or filters.get("specs"):
+            return False
+        return not search_tokens(filters.get("name") or "")
+
+    @property
+    def is_current(self) -> bool:
+        """
+        Загружен ли снимок и учтены ли в нем изменения каталога этим
+        процессом. Пока нет, поиск выполняется SQL-запросом
+        """
+        return self.loaded_at is not None and self._version == self._refreshed_version
+
+    def mark_stale(self) -> None:
+        """Каталог изменен этим процессом: до следующего обновления снимок не используется"""
+        self._version += 1
+
+    def remove(self, item_ids: list[int]) -> None:
+        """Убирает удаленные товары из снимка"""
+        self._columns = self._without(self._columns, item_ids)
+        if self._removed is not None:
+            self._removed.extend(item_ids)
+
+    async def refresh(self, repository) -> None:
+        """
+        Догружает изменения из БД (фоновая задача), раз в full_reload_interval
+        перечитывает снимок целиком. Новые массивы подменяют прежние одним
+        присваиванием
+        """
+        async with self._lock:
+            version = self._version
+            now = self._clock()
+            self._removed = []
+            try:
+                if self.loaded_at is None or now - self.loaded_at >= self.full_reload_interval:
+                    rows = await repository.snapshot_rows()
+                    columns = self._build_columns(rows)
+                    watermark = None
+                    self.loaded_at = now
+                else:
+                    since = None
+                    if self.watermark is not None:
+                        since = self.watermark - timedelta(seconds=self.overlap)
+                    rows = await repository.snapshot_rows(updated_since=since)
+                    columns = self._upserted(self._columns, rows)
+                    watermark = self.watermark
+                # Удаленные, пока читалась БД, могли попасть в прочитанные строки
+                self._columns = self._without(columns, self._removed)
+            finally:
+                self._removed = None
+            if rows:
+                newest = max(row[-1] for row in rows)
+                watermark = newest if watermark is None else max(watermark, newest)
+            self.watermark = watermark
+            self._refreshed_version = version
+
+    @staticmethod
+    def _build_columns(rows: list[tuple]) -> dict:
+        """Строки (поля ROW_FIELDS, updated_at) -> массивы, упорядоченные по id"""
+        values = list(zip(*rows)) if rows else [()] * len(ROW_FIELDS)
+        columns = {}
+        for name, column in zip(ROW_FIELDS, values):
+            if name == "created_at":
+                column = [_to_micros(value) for value in column]
+            elif name == "discount_price":
+                column = [NO_DISCOUNT if value is None else value for value in column]
+            columns[name] = np.array(column, dtype=DTYPES[name])
+        order = np.argsort(columns["id"], kind="stable")
+        return {name: column[order] for name, column in columns.items()}
+
+    @staticmethod
+    def _without(columns: dict, item_ids: list[int]) -> dict:
+        if not item_ids:
+            return columns
+        keep = ~np.isin(columns["id"], item_ids)
+        return {name: column[keep] for name, column in columns.items()}
+
+    @classmethod
+    def _upserted(cls, columns: dict, rows: list[tuple]) -> dict:
+        """Новые массивы: измененные товары обновлены, новые добавлены"""
+        if not rows:
+            return columns
+        changed = cls._build_columns(rows)
+        ids = columns["id"]
+        positions = np.searchsorted(ids, changed["id"])
+        exists = positions < len(ids)
+        exists[exists] = ids[positions[exists]] == changed["id"][exists]
+        columns = {name: column.copy() for name, column in columns.items()}
+        for name, column in columns.items():
+            column[positions[exists]] = changed[name][exists]
+        if exists.all():
+            return columns
+        merged = {
+            name: np.concatenate([column, changed[name][~exists]])
+            for name, column in columns.items()
+        }
+        order = np.argsort(merged["id"], kind="stable")
+        return {name: column[order] for name, column in merged.items()}
+
+    def search(
+        self,
+        filters: dict,
+        limit: int,
+        offset: int = 0,
+        after: tuple | None = None,
+    ) -> tuple[list[int], list[Any], int]:
+        """
+        Отбор, сортировка и пагинация по снимку.
+        Возвращает (id товаров страницы, их ключи сортировки, количество
+        товаров по фильтрам без учета пагинации). after - ключ keyset-пагинации
+        (значение сортировки, id), как в ItemsRepository.search_items.
+        category_ids - id категории вместе с подкатегориями, заменяет category_id
+        """
+        columns = self._columns
+        ids = columns["id"]
+        mask = np.ones(len(ids), dtype=bool)
+        if filters.get("category_ids") is not None:
+            mask &= np.isin(columns["category_id"], filters["category_ids"])
+        elif filters.get("category_id"):
+            mask &= columns["category_id"] == filters["category_id"]
+        if filters.get("brand_id"):
+            mask &= columns["brand_id"] == filters["brand_id"]
+        if filters.get("min_price"):
+            mask &= columns["price"] >= filters["min_price"]
+        if filters.get("max_price"):
+            mask &= columns["price"] <= filters["max_price"]
+        if filters.get("in_stock"):
+            mask &= columns["available_quantity"] > 0
+        total = int(np.count_nonzero(mask))
+
+        sort_by = filters.get("sort_by", "created_at")
+        descending = filters.get("sort_order", "desc") == "desc"
+        keys = columns[sort_by]
+
+        if after is not None:
+            after_key, after_id = after
+            if sort_by == "created_at":
+                after_key = _to_micros(after_key)
+            if descending:
+                mask &= (keys < after_key) | ((keys == after_key) & (ids < after_id))
+            else:
+                mask &= (keys > after_key) | ((keys == after_key) & (ids > after_id))
+            offset = 0
+
+        positions = np.flatnonzero(mask)
+        # Приводим сортировку к возрастающей по (ключ, id)
+        sort_keys = keys[positions]
+        sort_ids = ids[positions]
+        if descending:
+            sort_keys = -sort_keys
+            sort_ids = -sort_ids
+
+        needed = offset + limit
+        if needed < len(positions):
+            # Полная сортировка не нужна: оставляем строки не дальше needed-й
+            threshold = np.partition(sort_keys, needed - 1)[needed - 1]
+            candidates = sort_keys <= threshold
+            positions = positions[candidates]
+            sort_keys = sort_keys[candidates]
+            sort_ids = sort_ids[candidates]
+
+        page = positions[np.lexsort((sort_ids, sort_keys))[offset:needed]]
+        page_keys = keys[page].tolist()
+        if sort_by == "created_at":
+            page_keys = [_from_micros(value) for value in page_keys]
+        return ids[page].tolist(), page_keys, total
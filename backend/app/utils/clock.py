@@ -0,0 +1,6 @@
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    """Текущее время в UTC без часового пояса - так хранятся сроки в БД"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
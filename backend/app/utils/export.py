@@ -0,0 +1,43 @@
+"""
+Форматы выгрузки каталога.
+
+Каждая пачка товаров превращается в готовый кусок ответа: NDJSON - по
+объекту JSON на строку, CSV - строки с характеристиками в одной колонке
+(объект JSON "название": "значение").
+"""
+import csv
+import io
+from datetime import datetime
+
+import orjson
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CSV_COLUMNS = (
+    "id", "name", "sku", "price", "discount_price", "quantity", "description",
+    "main_image_url", "category_id", "category_name", "brand_id", "brand_name",
+    "average_rating", "review_count", "created_at", "updated_at", "specifications",
+)
+
+
+def ndjson_chunk(items: list[dict]) -> bytes:
+    return b"".join(orjson.dumps(item) + b"\n" for item in items)
+
+
+def csv_chunk(items: list[dict], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    for item in items:
+        row = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in item.items()
+        }
+        specifications = {spec["name"]: spec["value"] for spec in item.get("specifications", [])}
+        row["specifications"] = orjson.dumps(specifications).decode() if specifications else ""
+        writer.writerow(row)
+    return buffer.getvalue().encode()
@@ -0,0 +1,28 @@
+from app.exceptions.base import InvalidFieldsError
+
+
+def resolve_fields(
+    fields: str | None,
+    view: str | None,
+    views: dict[str, tuple[str, ...] | None],
+    allowed: tuple[str, ...],
+    required: tuple[str, ...] = ("id",),
+) -> tuple[str, ...] | None:
+    """
+    Поля, которые нужно загрузить для списка: из явного fields="id,name,price"
+    или из именованного представления view. None - все поля (полный ответ).
+    required добавляются всегда; fields важнее view
+    """
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        if not requested or any(field not in allowed for field in requested):
+            raise InvalidFieldsError
+    elif view:
+        if view not in views:
+            raise InvalidFieldsError
+        requested = views[view]
+        if requested is None:
+            return None
+    else:
+        return None
+    return tuple(dict.fromkeys([*required, *requested]))
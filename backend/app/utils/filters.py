@@ -0,0 +1,31 @@
+import json
+
+from app.database.fulltext import search_tokens
+
+# Параметры ItemSearchParams, которые сужают выборку (в отличие от сортировки)
+FILTER_KEYS = ("name", "category_id", "brand_id", "min_price", "max_price", "in_stock", "specs")
+
+
+def normalize_filters(filters: dict) -> dict:
+    """
+    Канонический вид фильтров поиска: наборы, которые отбирают одни и те же
+    товары, приводятся к одному словарю. Пустые значения отбрасываются так же,
+    как их игнорирует ItemsRepository._apply_filters, поисковая строка
+    сводится к словам, по которым ищет полнотекстовый поиск, разобранные
+    фильтры по характеристикам упорядочиваются
+    """
+    normalized = {}
+    for key in FILTER_KEYS:
+        value = filters.get(key)
+        if key == "name" and value:
+            value = " ".join(search_tokens(value))
+        elif key == "specs" and value:
+            value = sorted(set(value))
+        if value:
+            normalized[key] = value
+    return normalized
+
+
+def filters_key(filters: dict) -> str:
+    """Строковый ключ нормализованного набора фильтров (для кэша)"""
+    return json.dumps(filters, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
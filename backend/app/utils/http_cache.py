@@ -0,0 +1,84 @@
+"""
+Условные GET-запросы (ETag / Last-Modified).
+
+Валидаторы ответа вычисляются из версии ресурса (updated_at и т.п.) до
+загрузки и сериализации данных: если клиент прислал совпадающий
+If-None-Match или не более старый If-Modified-Since, отвечаем 304 без тела.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Слабый ETag из частей версии ресурса"""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # updated_at хранится без часового пояса, в UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Слабое сравнение ETag со списком из If-None-Match"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque for candidate in header.split(",")
+    )
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    """
+    Не изменился ли ресурс с версии клиента. If-None-Match важнее
+    If-Modified-Since: если он есть, дата не проверяется
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified) <= since
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: datetime | None = None) -> None:
+    """
+    Заголовки валидаторов. no-cache: клиент хранит ответ, но перед
+    использованием каждый раз проверяет его условным запросом
+    """
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    response.headers.setdefault("Cache-Control", "no-cache")
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: datetime | None = None,
+) -> Response | None:
+    """
+    Выставляет валидаторы на response. Если у клиента актуальная версия,
+    возвращает готовый ответ 304, иначе None
+    """
+    set_validators(response, etag, last_modified)
+    if not is_not_modified(request, etag, last_modified):
+        return None
+    not_modified = Response(status_code=304)
+    set_validators(not_modified, etag, last_modified)
+    return not_modified
@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from app.exceptions.items import InvalidCursorError
+
+# Как восстановить ключ сортировки из курсора для каждого sort_by
+CURSOR_KEY_PARSERS = {
+    "price": int,
+    "name": str,
+    "created_at": datetime.fromisoformat,
+    "rating": float,
+    "relevance": float,
+}
+
+
+def encode_cursor(sort_by: str, sort_order: str, key: Any, item_id: int) -> str:
+    """Кодирует ключ сортировки и id последней строки в непрозрачный курсор"""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    payload = json.dumps(
+        {"s": sort_by, "o": sort_order, "k": key, "i": item_id},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> tuple[Any, int]:
+    """
+    Декодирует курсор в пару (ключ сортировки, id).
+    Курсор, выданный для другой сортировки, считается неверным.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort_by or payload["o"] != sort_order:
+            raise InvalidCursorError
+        key = CURSOR_KEY_PARSERS[sort_by](payload["k"])
+        item_id = int(payload["i"])
+    except (ValueError, KeyError, TypeError) as ex:
+        raise InvalidCursorError from ex
+    return key, item_id
@@ -0,0 +1,56 @@
+"""
+Быстрая сериализация ответов.
+
+FastAPI по умолчанию прогоняет результат эндпоинта через response_model
+(повторная валидация уже провалидированных схем), переводит его в
+jsonable-структуру и только потом кодирует в JSON. Эндпоинты с большими
+ответами возвращают json_response(...): схемы Pydantic выгружаются
+model_dump, а JSON кодируется orjson, без повторной валидации.
+"""
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def type_adapter(annotation) -> TypeAdapter:
+    """
+    TypeAdapter для типа, создается один раз на процесс (построение схемы
+    валидации дороже самой валидации)
+    """
+    return TypeAdapter(annotation)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dump_json(content: Any) -> bytes:
+    """JSON через orjson: схемы Pydantic, ключи-не строки и массивы NumPy"""
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+
+class FastJSONResponse(ORJSONResponse):
+    """JSON-ответ через orjson; схемы Pydantic сериализуются без повторной валидации"""
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def json_response(content: Any, response: Response | None = None) -> FastJSONResponse:
+    """
+    Готовый JSON-ответ в обход response_model. response - объект Response
+    из параметров эндпоинта: выставленные на нем заголовки переносятся
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
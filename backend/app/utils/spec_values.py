@@ -0,0 +1,85 @@
+import operator
+import re
+
+from app.exceptions.items import InvalidSpecFilterError
+
+# Множители единиц измерения внутри семейства (семейство, множитель)
+UNIT_SCALES = {
+    # Объем памяти
+    "б": ("bytes", 1), "b": ("bytes", 1),
+    "кб": ("bytes", 1024), "kb": ("bytes", 1024),
+    "мб": ("bytes", 1024 ** 2), "mb": ("bytes", 1024 ** 2),
+    "гб": ("bytes", 1024 ** 3), "gb": ("bytes", 1024 ** 3),
+    "тб": ("bytes", 1024 ** 4), "tb": ("bytes", 1024 ** 4),
+    # Частота
+    "гц": ("hz", 1), "hz": ("hz", 1),
+    "кгц": ("hz", 10 ** 3), "khz": ("hz", 10 ** 3),
+    "мгц": ("hz", 10 ** 6), "mhz": ("hz", 10 ** 6),
+    "ггц": ("hz", 10 ** 9), "ghz": ("hz", 10 ** 9),
+    # Масса
+    "г": ("g", 1), "g": ("g", 1),
+    "кг": ("g", 1000), "kg": ("g", 1000),
+    # Длина
+    "мм": ("mm", 1), "mm": ("mm", 1),
+    "см": ("mm", 10), "cm": ("mm", 10),
+    "м": ("mm", 1000), "m": ("mm", 1000),
+    # Мощность
+    "вт": ("w", 1), "w": ("w", 1),
+    "квт": ("w", 1000), "kw": ("w", 1000),
+    # Емкость аккумулятора
+    "мач": ("mah", 1), "mah": ("mah", 1),
+    "ач": ("mah", 1000), "ah": ("mah", 1000),
+}
+
+# Число в начале значения и необязательная единица сразу после него
+VALUE_PATTERN = re.compile(r"^\s*(-?\d+(?:[.,]\d+)?)\s*([^\W\d_]+)?", re.UNICODE)
+
+SPEC_OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "=": operator.eq,
+}
+
+# <тип характеристики><оператор><число>, например "RAM>=16"
+SPEC_FILTER_PATTERN = re.compile(r"^(?P<type>[^<>=]+?)\s*(?P<op>>=|<=|>|<|=)\s*(?P<value>-?\d+(?:[.,]\d+)?)$")
+
+
+def _unit_scale(unit: str | None):
+    if not unit:
+        return None
+    return UNIT_SCALES.get(unit.strip().lower().rstrip("."))
+
+
+def parse_numeric_value(value: str, unit: str | None = None) -> float | None:
+    """
+    Числовое значение характеристики в единицах ее типа.
+    "16 ГБ" при unit="ГБ" -> 16.0, "1 ТБ" при unit="ГБ" -> 1024.0,
+    "3200 МГц" при unit="ГГц" -> 3.2. Значения, которые не начинаются
+    с числа ("Intel Core i7"), числового значения не имеют
+    """
+    match = VALUE_PATTERN.match(value)
+    if match is None:
+        return None
+    number = float(match.group(1).replace(",", "."))
+    value_scale = _unit_scale(match.group(2))
+    type_scale = _unit_scale(unit)
+    if value_scale and type_scale and value_scale[0] == type_scale[0]:
+        number = number * value_scale[1] / type_scale[1]
+    return number
+
+
+def parse_spec_filters(expressions: list[str]) -> list[tuple[str, str, float]]:
+    """
+    Разбирает фильтры вида "RAM>=16" в (тип, оператор, число).
+    Тип - название или id типа характеристики, число - в единицах типа
+    """
+    filters = []
+    for expression in expressions:
+        match = SPEC_FILTER_PATTERN.match(expression.strip())
+        if match is None:
+            raise InvalidSpecFilterError
+        number = float(match.group("value").replace(",", "."))
+        filters.append((match.group("type").strip(), match.group("op"), number))
+    return filters
@@ -0,0 +1,147 @@
+"""
+Индекс подсказок для строки поиска в памяти процесса.
+
+Для каждого вида подсказок (товары, бренды, категории) хранится
+отсортированный список ключей: нормализованное название, начиная с каждого
+из первых слов ("apple iphone 15", "iphone 15", "15"). Подсказки по префиксу
+находятся бинарным поиском и берутся из непрерывного диапазона списка, так
+что ответ не обращается к БД и почти не зависит от размера каталога.
+
+Изменения товаров и категорий этого процесса попадают в индекс сразу,
+изменения других процессов - при периодической перезагрузке фоновой
+задачей; запросы подсказок читают только память.
+"""
+import asyncio
+import re
+from bisect import bisect_left
+
+SUGGEST_KINDS = ("items", "brands", "categories")
+
+# Ключи строятся от стольких первых слов названия
+MAX_KEY_WORDS = 6
+# Длина ключа; более длинные запросы дополнительно сверяются с названием
+MAX_KEY_LENGTH = 48
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Слова в нижнем регистре через пробел, ё -> е"""
+    return " ".join(WORD_PATTERN.findall(text.lower().replace("ё", "е")))
+
+
+def _name_keys(name: str) -> list[str]:
+    words = normalize(name).split()
+    keys = {" ".join(words[start:])[:MAX_KEY_LENGTH] for start in range(min(len(words), MAX_KEY_WORDS))}
+    return sorted(keys)
+
+
+class _PrefixIndex:
+    """Отсортированные ключи одного вида подсказок и id их объектов"""
+
+    def __init__(self, rows: list[tuple[int, str]]):
+        self.names = dict(rows)
+        pairs = sorted((key, object_id) for object_id, name in rows for key in _name_keys(name))
+        self.keys = [key for key, _ in pairs]
+        self.ids = [object_id for _, object_id in pairs]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, object_id: int, name: str) -> None:
+        self.remove(object_id)
+        self.names[object_id] = name
+        for key in _name_keys(name):
+            position = bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+            self.ids.insert(position, object_id)
+
+    def remove(self, object_id: int) -> None:
+        name = self.names.pop(object_id, None)
+        if name is None:
+            return
+        for key in _name_keys(name):
+            position = bisect_left(self.keys, key)
+            while position < len(self.keys) and self.keys[position] == key:
+                if self.ids[position] == object_id:
+                    del self.keys[position]
+                    del self.ids[position]
+                    break
+                position += 1
+
+    def search(self, prefix: str, limit: int) -> list[dict]:
+        """Первые limit объектов, название которых содержит слово с префиксом prefix"""
+        key_prefix = prefix[:MAX_KEY_LENGTH]
+        found = {}
+        position = bisect_left(self.keys, key_prefix)
+        while position < len(self.keys) and len(found) < limit:
+            if not self.keys[position].startswith(key_prefix):
+                break
+            object_id = self.ids[position]
+            position += 1
+            if object_id in found:
+                continue
+            name = self.names[object_id]
+            if len(prefix) > MAX_KEY_LENGTH and f" {prefix}" not in f" {normalize(name)}":
+                continue
+            found[object_id] = name
+        return [{"id": object_id, "name": name} for object_id, name in found.items()]
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._indexes = {kind: _PrefixIndex([]) for kind in SUGGEST_KINDS}
+        # Изменения объектов, сделанные во время перезагрузки: (вид, id,
+        # название или None для удаленного). None - перезагрузка не идет
+        self._changes: list[tuple[str, int, str | None]] | None = None
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self._indexes.values())
+
+    def load(self, rows: dict[str, list[tuple[int, str]]]) -> None:
+        """Строит индекс заново из пар (id, название) каждого вида"""
+        self._indexes = {kind: _PrefixIndex(rows.get(kind, [])) for kind in SUGGEST_KINDS}
+
+    async def reload(self, db) -> None:
+        """
+        Перечитывает индекс из БД и подменяет прежний целиком. Изменения,
+        сделанные этим процессом, пока читалась БД, переносятся в новый индекс
+        """
+        async with self._lock:
+            self._changes = []
+            try:
+                rows = {
+                    "items": await db.items.get_names(),
+                    "brands": await db.brands.get_names(),
+                    "categories": await db.categories.get_names(),
+                }
+                self.load(rows)
+                for kind, object_id, name in self._changes:
+                    if name is None:
+                        self._indexes[kind].remove(object_id)
+                    else:
+                        self._indexes[kind].add(object_id, name)
+            finally:
+                self._changes = None
+
+    def add(self, kind: str, object_id: int, name: str) -> None:
+        """Добавляет объект или обновляет его название"""
+        self._indexes[kind].add(object_id, name)
+        if self._changes is not None:
+            self._changes.append((kind, object_id, name))
+
+    def remove(self, kind: str, object_id: int) -> None:
+        self._indexes[kind].remove(object_id)
+        if self._changes is not None:
+            self._changes.append((kind, object_id, None))
+
+    def suggest(self, query: str, limit: int) -> dict[str, list[dict]]:
+        """
+        Подсказки по началу слова: для каждого вида до limit объектов
+        {"id", "name"}, в алфавитном порядке совпавшей части названия
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return {kind: [] for kind in SUGGEST_KINDS}
+        return {kind: index.search(prefix, limit) for kind, index in self._indexes.items()}
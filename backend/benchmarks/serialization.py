@@ -0,0 +1,119 @@
+"""
+Время сериализации страницы из 100 товаров: ответ FastAPI по умолчанию
+(проверка по response_model, jsonable_encoder, json.dumps) против
+json_response (model_dump + orjson), а также валидация страницы из ORM-
+объектов по одному товару против одного вызова TypeAdapter.
+
+Запросы идут прямо в ASGI-приложение, без сети и БД:
+
+    python -m benchmarks.serialization --page-size 100 --repeat 300
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.schemes.items import ItemGetWithRelations
+from app.utils.serialization import json_response, type_adapter
+
+
+def make_page(size: int) -> dict:
+    now = datetime(2025, 1, 1, 12, 0, 0, 123456)
+    category = {"id": 1, "name": "Смартфоны", "description": None, "parent_id": None,
+                "created_at": now, "updated_at": now}
+    brand = {"id": 2, "name": "VoltPhone", "logo_url": None, "description": None,
+             "created_at": now, "updated_at": now}
+    items = [
+        SimpleNamespace(
+            id=item_id, name=f"Смартфон {item_id}", sku=f"SKU-{item_id}", price=29990 + item_id,
+            discount_price=None, quantity=5, description="Описание товара " * 10,
+            main_image_url=f"/images/{item_id}.png", category_id=1, brand_id=2,
+            created_at=now, updated_at=now, category=SimpleNamespace(**category),
+            brand=SimpleNamespace(**brand), specifications=[], average_rating=4.5,
+            review_count=12, relevance=None,
+        )
+        for item_id in range(1, size + 1)
+    ]
+    return {
+        "items": items,
+        "pagination": {"page": 1, "per_page": size, "total": 10000, "next_cursor": None},
+    }
+
+
+def build_app(page: dict) -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+    
+    @app.get("/default")
+    async def default() -> dict:
+        return page
+    
+    @app.get("/fast")
+    async def fast() -> dict:
+        return json_response(page)
+    
+    return app
+
+
+async def call(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "headers": [], "http_version": "1.1", "scheme": "http",
+        "server": ("bench", 80), "client": ("bench", 1), "root_path": "",
+    }
+    body = []
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+    
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+def median_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+    
+    rows = make_page(args.page_size)
+    adapter = type_adapter(list[ItemGetWithRelations])
+    validate_each = lambda: [
+        ItemGetWithRelations.model_validate(row, from_attributes=True) for row in rows["items"]
+    ]
+    validate_page = lambda: adapter.validate_python(rows["items"], from_attributes=True)
+    print(f"валидация, по одному товару: {median_ms(validate_each, args.repeat):.3f} мс")
+    print(f"валидация, TypeAdapter:      {median_ms(validate_page, args.repeat):.3f} мс")
+    
+    page = {**rows, "items": validate_page()}
+    app = build_app(page)
+    loop = asyncio.new_event_loop()
+    assert json.loads(loop.run_until_complete(call(app, "/default"))) == json.loads(
+        loop.run_until_complete(call(app, "/fast"))
+    )
+    for path in ("/default", "/fast"):
+        elapsed = median_ms(lambda: loop.run_until_complete(call(app, path)), args.repeat)
+        print(f"ответ {path:<8} {args.page_size} товаров: {elapsed:.3f} мс")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
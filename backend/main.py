@@ -1,3 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,11 +15,73 @@ from app.api.cart import router as cart_router
 from app.api.orders import router as orders_router
 from app.api.comparisons import router as comparisons_router
 from app.api.reviews import router as reviews_router
+from app.config import settings
+from app.services.items import catalog_snapshot, refresh_catalog_snapshot, reload_suggest_index
+from app.services.cart import cart_store, flush_cart_store
+from app.services.idempotency import prune_expired_idempotency_keys
+from app.services.orders import checkout_worker
+from app.services.reservations import sweep_expired_reservations
+from app.utils.background import run_periodically
+from app.utils.serialization import FastJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Индекс подсказок строится при старте, а не на первом запросе
+    await reload_suggest_index()
+    # Перезагрузка индекса подсказок, снятие истекших удержаний товара и
+    # удаление истекших ключей идемпотентности
+    background_tasks = [
+        asyncio.create_task(run_periodically(
+            reload_suggest_index,
+            settings.SUGGEST_RELOAD_INTERVAL,
+            "suggest index reload",
+            initial_delay=settings.SUGGEST_RELOAD_INTERVAL,
+        )),
+        asyncio.create_task(run_periodically(
+            partial(sweep_expired_reservations, settings.RESERVATION_SWEEP_BATCH),
+            settings.RESERVATION_SWEEP_INTERVAL,
+            "stock reservations sweep",
+        )),
+        asyncio.create_task(run_periodically(
+            partial(prune_expired_idempotency_keys, settings.IDEMPOTENCY_PRUNE_BATCH),
+            settings.IDEMPOTENCY_PRUNE_INTERVAL,
+            "idempotency keys prune",
+        )),
+    ]
+    if settings.CHECKOUT_QUEUE_ENABLED:
+        background_tasks += [
+            asyncio.create_task(checkout_worker(settings.CHECKOUT_BATCH_SIZE, settings.CHECKOUT_POLL_INTERVAL))
+            for _ in range(settings.CHECKOUT_WORKERS)
+        ]
+    if catalog_snapshot is not None:
+        # Снимок каталога загружается и обновляется только этой задачей
+        background_tasks.append(asyncio.create_task(run_periodically(
+            refresh_catalog_snapshot,
+            settings.CATALOG_SNAPSHOT_REFRESH_INTERVAL,
+            "catalog snapshot refresh",
+        )))
+    if cart_store is not None:
+        background_tasks.append(asyncio.create_task(run_periodically(
+            partial(flush_cart_store, settings.CART_STORE_FLUSH_BATCH),
+            settings.CART_STORE_FLUSH_INTERVAL,
+            "cart store flush",
+        )))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    # Несброшенные изменения корзин записываются до остановки процесса
+    if cart_store is not None:
+        await flush_cart_store(settings.CART_STORE_FLUSH_BATCH)
+
 
 app = FastAPI(
     title="VoltMarket - Интернет-магазин электроники",
     version="1.0.0",
     description="API для интернет-магазина электроники VoltMarket",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Настройка CORS
@@ -13,7 +13,7 @@ from app.config import settings
 from app.models.users import UserModel
 from app.models.roles import RoleModel
 from app.models.items import ItemModel
-from app.models.categories import CategoryModel
+from app.models.categories import CategoryModel, CategoryClosureModel
 from app.models.brands import BrandModel
 from app.models.specifications import SpecificationModel
 from app.models.specification_types import SpecificationTypeModel
@@ -22,6 +22,9 @@ from app.models.orders import OrderModel
 from app.models.order_items import OrderItemModel
 from app.models.comparisons import ComparisonModel, ComparisonItemModel
 from app.models.cart import CartItemModel
+from app.models.reservations import StockReservationModel
+from app.models.idempotency_keys import IdempotencyKeyModel
+from app.models.checkout_requests import CheckoutRequestModel
 
 sqlalchemy_url = settings.get_db_url
 config = context.config
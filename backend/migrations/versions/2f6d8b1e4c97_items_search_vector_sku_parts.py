@@ -0,0 +1,35 @@
+"""items search vector: index sku parts
+
+Revision ID: 2f6d8b1e4c97
+Revises: b7e4c2a9d1f5
+Create Date: 2026-10-19 10:12:44.207311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.database.fulltext import ITEMS_SEARCH_VECTOR_FUNCTION
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6d8b1e4c97'
+down_revision: Union[str, Sequence[str], None] = 'b7e4c2a9d1f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        # FTS5 в SQLite и так разбивает артикул на части
+        return
+    op.execute(ITEMS_SEARCH_VECTOR_FUNCTION)
+    # Пересчитываем вектор существующих товаров через триггер
+    op.execute("UPDATE items SET brand_id = brand_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Вектор с артикулом по частям подходит и прежней схеме: откатывать нечего
+    pass
@@ -0,0 +1,69 @@
+"""items full-text search
+
+Revision ID: 5b8e2c4f7a10
+Revises: 3c1f5a7d9e21
+Create Date: 2026-10-18 13:40:02.518334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.database.fulltext import POSTGRESQL_DDL, SQLITE_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2c4f7a10'
+down_revision: Union[str, Sequence[str], None] = '3c1f5a7d9e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    op.add_column(
+        'items',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR().with_variant(sa.Text(), 'sqlite'),
+            nullable=True,
+        ),
+    )
+    if dialect == 'postgresql':
+        op.create_index(
+            'ix_items_search_vector', 'items', ['search_vector'],
+            unique=False, postgresql_using='gin',
+        )
+        for statement in POSTGRESQL_DDL:
+            op.execute(statement)
+        # Заполняем вектор для существующих товаров через триггер
+        op.execute("UPDATE items SET brand_id = brand_id")
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        op.execute(
+            """
+            INSERT INTO items_fts (rowid, name, sku, brand, description)
+            SELECT items.id, items.name, items.sku, brands.name, items.description
+            FROM items JOIN brands ON brands.id = items.brand_id
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS brands_search_vector_trigger ON brands")
+        op.execute("DROP TRIGGER IF EXISTS items_search_vector_trigger ON items")
+        op.execute("DROP FUNCTION IF EXISTS brands_search_vector_update()")
+        op.execute("DROP FUNCTION IF EXISTS items_search_vector_update()")
+        op.drop_index('ix_items_search_vector', table_name='items')
+    elif dialect == 'sqlite':
+        for trigger in ('items_fts_insert', 'items_fts_update', 'items_fts_delete', 'brands_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS items_fts")
+    op.drop_column('items', 'search_vector')
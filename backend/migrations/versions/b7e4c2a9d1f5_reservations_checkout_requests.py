@@ -0,0 +1,57 @@
+"""reservations held by checkout requests
+
+Revision ID: b7e4c2a9d1f5
+Revises: d5b9e3a7c1f2
+Create Date: 2026-10-19 10:12:44.307519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c2a9d1f5'
+down_revision: Union[str, Sequence[str], None] = 'd5b9e3a7c1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stock_reservations', sa.Column('checkout_request_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_stock_reservations_checkout_request_id', 'stock_reservations', 'checkout_requests',
+        ['checkout_request_id'], ['id'],
+    )
+    op.create_index('ix_stock_reservations_checkout_request_id', 'stock_reservations', ['checkout_request_id'], unique=False)
+    # Уникально только удержание товара в корзине: у заявок из очереди свои удержания
+    op.drop_constraint('uq_stock_reservations_user_item', 'stock_reservations', type_='unique')
+    op.create_index(
+        'uq_stock_reservations_user_item', 'stock_reservations', ['user_id', 'item_id'], unique=True,
+        postgresql_where=sa.text('checkout_request_id IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Удержания заявок снимаются: иначе они нарушат уникальность по (user_id, item_id)
+    op.execute(
+        """
+        UPDATE items SET reserved_quantity = items.reserved_quantity - held.quantity
+        FROM (
+            SELECT item_id, sum(quantity) AS quantity
+            FROM stock_reservations
+            WHERE checkout_request_id IS NOT NULL
+            GROUP BY item_id
+        ) AS held
+        WHERE items.id = held.item_id
+        """
+    )
+    op.execute("DELETE FROM stock_reservations WHERE checkout_request_id IS NOT NULL")
+    op.drop_index('uq_stock_reservations_user_item', table_name='stock_reservations')
+    op.create_unique_constraint('uq_stock_reservations_user_item', 'stock_reservations', ['user_id', 'item_id'])
+    op.drop_index('ix_stock_reservations_checkout_request_id', table_name='stock_reservations')
+    op.drop_constraint('fk_stock_reservations_checkout_request_id', 'stock_reservations', type_='foreignkey')
+    op.drop_column('stock_reservations', 'checkout_request_id')
@@ -0,0 +1,47 @@
+"""cart items unique user item
+
+Revision ID: d5b9e3a7c1f2
+Revises: a8e5c1d7f046
+Create Date: 2026-10-18 23:41:09.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b9e3a7c1f2'
+down_revision: Union[str, Sequence[str], None] = 'a8e5c1d7f046'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Повторные строки одного товара в корзине сливаются в самую раннюю
+    op.execute(
+        """
+        UPDATE cart_items SET quantity = merged.quantity
+        FROM (
+            SELECT min(id) AS id, sum(quantity) AS quantity
+            FROM cart_items
+            GROUP BY user_id, item_id
+            HAVING count(*) > 1
+        ) AS merged
+        WHERE cart_items.id = merged.id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM cart_items
+        WHERE id NOT IN (SELECT min(id) FROM cart_items GROUP BY user_id, item_id)
+        """
+    )
+    op.create_unique_constraint('uq_cart_items_user_item', 'cart_items', ['user_id', 'item_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_cart_items_user_item', 'cart_items', type_='unique')
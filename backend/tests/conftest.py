@@ -0,0 +1,79 @@
+"""
+Общие фикстуры тестов.
+
+Сервисные тесты работают с настоящей схемой в файле SQLite во временном
+каталоге: таблицы создаются по моделям (create_all), без миграций.
+Асинхронные тесты помечаются @pytest.mark.asyncio (pytest-asyncio).
+"""
+import importlib
+import os
+import pkgutil
+
+import pytest_asyncio
+
+# Настройки читаются при импорте app.config: для тестов хватает заглушек,
+# к PostgreSQL из настроек тесты не подключаются
+for name, value in {
+    "MODE": "TEST",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_USER": "test",
+    "DB_PASS": "test",
+    "DB_NAME": "test",
+    "SECRET_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+from sqlalchemy import NullPool, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models
+from app.database.database import Base
+from app.models.brands import BrandModel
+from app.models.categories import CategoryClosureModel, CategoryModel
+from app.models.items import ItemModel
+from app.models.roles import RoleModel
+from app.models.users import UserModel
+
+# Все модели должны быть загружены до create_all
+for module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f"app.models.{module.name}")
+
+USERS = 3
+ITEMS = 3
+ITEM_PRICE = 1000
+ITEM_QUANTITY = 10
+
+
+async def _create_catalog(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(RoleModel), [{"name": "customer"}])
+        await conn.execute(insert(UserModel), [
+            {"name": f"Покупатель {i}", "email": f"user{i}@example.com",
+             "hashed_password": "x", "role_id": 1}
+            for i in range(1, USERS + 1)
+        ])
+        await conn.execute(insert(CategoryModel), [{"name": "Категория"}])
+        await conn.execute(
+            insert(CategoryClosureModel), [{"ancestor_id": 1, "descendant_id": 1, "depth": 0}]
+        )
+        await conn.execute(insert(BrandModel), [{"name": "Бренд"}])
+        await conn.execute(insert(ItemModel), [
+            {"name": f"Товар {i}", "sku": f"SKU-{i}", "price": ITEM_PRICE,
+             "quantity": ITEM_QUANTITY, "category_id": 1, "brand_id": 1}
+            for i in range(1, ITEMS + 1)
+        ])
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """
+    Фабрика сессий к пустой БД с USERS покупателями и ITEMS товарами
+    (цена ITEM_PRICE, остаток ITEM_QUANTITY). Соединения не переиспользуются
+    (NullPool): одновременные сессии теста получают свои соединения
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+    await _create_catalog(engine)
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    await engine.dispose()
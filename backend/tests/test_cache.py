@@ -0,0 +1,84 @@
+from app.utils.cache import ResultCache, serialized_size
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_entry_expires_after_ttl():
+    """Запись перестает выдаваться по истечении ttl"""
+    clock = FakeClock()
+    cache = ResultCache(max_bytes=1000, ttl=30, clock=clock)
+    cache.set("a", 1, tags=[])
+    
+    clock.now = 29
+    assert cache.get("a") == 1
+    clock.now = 31
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    """При переполнении вытесняется давно не использованная запись"""
+    cache = ResultCache(max_bytes=2, ttl=30)
+    cache.set("a", 1, tags=[])
+    cache.set("b", 2, tags=[])
+    cache.get("a")
+    cache.set("c", 3, tags=[])
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_removes_only_tagged_entries():
+    """Инвалидация затрагивает только записи с указанными тегами"""
+    cache = ResultCache(max_bytes=1000, ttl=30)
+    cache.set("phones", 1, tags=[("search", 1, None)])
+    cache.set("laptops", 2, tags=[("search", 2, None)])
+    
+    assert cache.invalidate([("search", 1, None), ("search", 1, 5)]) == 1
+    assert cache.get("phones") is None
+    assert cache.get("laptops") == 2
+
+
+def test_result_computed_before_invalidation_is_not_stored():
+    """Результат, посчитанный до инвалидации, не попадает в кэш"""
+    cache = ResultCache(max_bytes=1000, ttl=30)
+    epoch = cache.epoch
+    cache.invalidate([("search", None, None)])
+    cache.set("a", 1, tags=[("search", None, None)], epoch=epoch)
+    
+    assert cache.get("a") is None
+
+
+def test_size_is_bounded_by_serialized_length():
+    """Объем кэша считается по длине JSON записей: крупная запись вытесняет несколько мелких"""
+    cache = ResultCache(max_bytes=100, ttl=30)
+    for key in "abcde":
+        cache.set(key, {"id": 1}, tags=[("search", None, None)])
+    assert cache.stats()["bytes"] == 5 * len('{"id":1}')
+    
+    page = ["x" * 10] * 6
+    cache.set("page", page, tags=[])
+    assert [cache.get(key) for key in "abcde"] == [None, None, None, {"id": 1}, {"id": 1}]
+    assert cache.stats()["bytes"] <= 100
+    
+    cache.invalidate([("search", None, None)])
+    assert cache.stats()["bytes"] == serialized_size(page)
+
+
+def test_entry_larger_than_cache_is_not_stored():
+    cache = ResultCache(max_bytes=10, ttl=30)
+    cache.set("a", 1, tags=[])
+    cache.set("big", "x" * 20, tags=[])
+    
+    assert cache.get("big") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 0
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.database.db_manager import DBManager
+from app.exceptions.base import ObjectNotFoundError
+from app.models.cart import CartItemModel
+from app.models.items import ItemModel
+from app.models.reservations import StockReservationModel
+from app.schemes.cart import CartItemAdd
+from app.schemes.orders import OrderCreate
+from app.services.cart import CartService
+from app.services.orders import OrdersService
+
+
+async def add_to_cart(session_factory, user_id: int, item_id: int, quantity: int) -> None:
+    async with DBManager(session_factory=session_factory) as db:
+        await CartService(db).add_item(user_id, CartItemAdd(item_id=item_id, quantity=quantity))
+
+
+async def get_cart(session_factory, user_id: int):
+    async with DBManager(session_factory=session_factory) as db:
+        return await CartService(db).get_cart(user_id)
+
+
+async def cart_lines(session_factory) -> dict[tuple[int, int], int]:
+    """Позиции всех корзин: (покупатель, товар) -> количество"""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(CartItemModel.user_id, CartItemModel.item_id, CartItemModel.quantity)
+        )
+        return {(user_id, item_id): quantity for user_id, item_id, quantity in result.all()}
+
+
+@pytest.mark.asyncio
+async def test_add_item_creates_and_increments_line(session_factory):
+    """Повторное добавление товара увеличивает количество в той же строке корзины"""
+    await add_to_cart(session_factory, 1, 1, 2)
+    await add_to_cart(session_factory, 1, 1, 3)
+    await add_to_cart(session_factory, 1, 2, 1)
+    assert await cart_lines(session_factory) == {(1, 1): 5, (1, 2): 1}
+
+
+@pytest.mark.asyncio
+async def test_add_item_is_limited_by_available_stock(session_factory):
+    """В корзину нельзя положить больше остатка за вычетом удержанного другими"""
+    await add_to_cart(session_factory, 2, 1, 4)
+    await add_to_cart(session_factory, 1, 1, 5)
+
+    with pytest.raises(ValueError, match="Доступно: 6"):
+        await add_to_cart(session_factory, 1, 1, 2)
+    with pytest.raises(ValueError, match="Доступно: 1"):
+        await add_to_cart(session_factory, 3, 1, 2)
+    await add_to_cart(session_factory, 1, 1, 1)
+    assert await cart_lines(session_factory) == {(1, 1): 6, (2, 1): 4}
+
+    with pytest.raises(ObjectNotFoundError):
+        await add_to_cart(session_factory, 1, 42, 1)
+
+
+@pytest.mark.asyncio
+async def test_add_item_ignores_queued_checkout_holds(session_factory):
+    """Удержание заявки из очереди оформления не считается удержанием корзины"""
+    await add_to_cart(session_factory, 1, 1, 3)
+    async with DBManager(session_factory=session_factory) as db:
+        await OrdersService(db).enqueue_order(1, OrderCreate(
+            shipping_address="ул. Тестовая, 1",
+            contact_phone="+79990000000",
+            items=[{"item_id": 1, "quantity": 3}],
+        ))
+    await add_to_cart(session_factory, 1, 1, 2)
+
+    # Доступно 10 - 3 (заявка) = 7, из них 2 уже в корзине
+    with pytest.raises(ValueError, match="Доступно: 7"):
+        await add_to_cart(session_factory, 1, 1, 6)
+    await add_to_cart(session_factory, 1, 1, 5)
+    assert await cart_lines(session_factory) == {(1, 1): 7}
+    async with session_factory() as session:
+        holds = (await session.execute(
+            select(StockReservationModel.checkout_request_id.is_(None), StockReservationModel.quantity)
+        )).all()
+        reserved = (await session.execute(
+            select(ItemModel.reserved_quantity).filter_by(id=1)
+        )).scalar_one()
+    assert sorted(tuple(hold) for hold in holds) == [(False, 3), (True, 7)]
+    assert reserved == 10
+
+
+@pytest.mark.asyncio
+async def test_cart_totals_use_sale_price(session_factory):
+    """Суммы строк и итоги корзины считаются в SQL по цене со скидкой"""
+    empty = await get_cart(session_factory, 1)
+    assert (empty.items, empty.total_items, empty.total_amount) == ([], 0, 0)
+
+    async with session_factory() as session:
+        await session.execute(update(ItemModel).filter_by(id=2).values(discount_price=750))
+        # Скидка не ниже цены не применяется
+        await session.execute(update(ItemModel).filter_by(id=3).values(discount_price=1200))
+        await session.commit()
+    await add_to_cart(session_factory, 1, 1, 2)
+    await add_to_cart(session_factory, 1, 2, 3)
+    await add_to_cart(session_factory, 1, 3, 1)
+    await add_to_cart(session_factory, 2, 1, 1)
+
+    cart = await get_cart(session_factory, 1)
+    assert [
+        (line.item_id, line.item_price, line.item_sale_price, line.quantity, line.total_price)
+        for line in cart.items
+    ] == [(1, 1000, 1000, 2, 2000), (2, 1000, 750, 3, 2250), (3, 1000, 1000, 1, 1000)]
+    assert (cart.total_items, cart.total_amount) == (6, 5250)
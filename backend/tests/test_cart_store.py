@@ -0,0 +1,210 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import select
+
+from app.database.db_manager import DBManager
+from app.models.cart import CartItemModel
+from app.models.items import ItemModel
+from app.models.reservations import StockReservationModel
+from app.schemes.cart import CartItemAdd
+from app.services import cart as cart_service
+from app.services.cart import CartService
+from app.utils.cart_store import WriteBehindCartStore
+
+
+class FakeLoader:
+    """Корзины в "БД" и счетчик обращений к ней"""
+    
+    def __init__(self, carts: dict[int, dict[int, int]]):
+        self.carts = carts
+        self.calls = 0
+    
+    def for_user(self, user_id: int):
+        async def load():
+            self.calls += 1
+            return dict(self.carts.get(user_id, {}))
+        return load
+
+
+async def get(store, loader, user_id):
+    return await store.get(user_id, loader.for_user(user_id))
+
+
+@pytest.mark.asyncio
+async def test_cart_is_loaded_once():
+    """Корзина читается из БД при первом обращении, дальше - из памяти"""
+    store = WriteBehindCartStore(max_carts=10)
+    loader = FakeLoader({1: {5: 2}})
+    
+    assert await get(store, loader, 1) == {5: 2}
+    store.set(1, 5, 3)
+    assert await get(store, loader, 1) == {5: 3}
+    assert loader.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_changes_are_coalesced():
+    """Несколько изменений позиции между сбросами дают одну запись с последним значением"""
+    store = WriteBehindCartStore(max_carts=10)
+    loader = FakeLoader({1: {5: 1, 6: 1}})
+    await get(store, loader, 1)
+    
+    for quantity in (2, 3, 4, 3):
+        store.set(1, 5, quantity)
+    store.set(1, 6, 0)
+    
+    assert store.pending == 2
+    assert store.take_changes() == [(1, 5, 3), (1, 6, 0)]
+    assert store.pending == 0
+    assert store.take_changes() == []
+
+
+@pytest.mark.asyncio
+async def test_take_changes_by_user_and_limit():
+    store = WriteBehindCartStore(max_carts=10)
+    loader = FakeLoader({})
+    for user_id in (1, 2, 3):
+        await get(store, loader, user_id)
+        store.set(user_id, 7, user_id)
+        store.set(user_id, 8, user_id)
+    
+    assert store.take_changes([2]) == [(2, 7, 2), (2, 8, 2)]
+    # Корзина попадает в пачку целиком
+    assert store.take_changes(limit=1) == [(1, 7, 1), (1, 8, 1)]
+    assert store.take_changes(limit=1) == [(3, 7, 3), (3, 8, 3)]
+
+
+@pytest.mark.asyncio
+async def test_restore_after_failed_flush_keeps_latest_value():
+    """Не записанные изменения возвращаются, при повторе пишется текущее значение"""
+    store = WriteBehindCartStore(max_carts=10)
+    await get(store, FakeLoader({}), 1)
+    store.set(1, 5, 2)
+    
+    changes = store.take_changes()
+    store.set(1, 5, 4)
+    store.restore(changes)
+    
+    assert store.take_changes() == [(1, 5, 4)]
+
+
+@pytest.mark.asyncio
+async def test_only_clean_carts_are_evicted():
+    """Сверх max_carts вытесняются давно не использованные корзины без несброшенных изменений"""
+    store = WriteBehindCartStore(max_carts=2)
+    loader = FakeLoader({})
+    await get(store, loader, 1)
+    store.set(1, 5, 1)
+    await get(store, loader, 2)
+    await get(store, loader, 3)
+    
+    assert len(store) == 2
+    assert store.take_changes() == [(1, 5, 1)]
+    await get(store, loader, 1)
+    assert loader.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_forget_drops_pending_changes():
+    store = WriteBehindCartStore(max_carts=10)
+    loader = FakeLoader({1: {5: 1}})
+    await get(store, loader, 1)
+    store.set(1, 5, 2)
+    
+    store.forget(1)
+    
+    assert store.take_changes() == []
+    assert await get(store, loader, 1) == {5: 1}
+    assert loader.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cart_in_flight_is_not_taken():
+    """Пока изменения корзины пишутся в БД, новые изменения этой корзины не забираются"""
+    store = WriteBehindCartStore(max_carts=10)
+    loader = FakeLoader({})
+    await get(store, loader, 1)
+    await get(store, loader, 2)
+    store.set(1, 5, 2)
+    
+    changes = store.take_changes()
+    store.set(1, 5, 3)
+    store.set(2, 5, 1)
+    assert store.take_changes() == [(2, 5, 1)]
+    assert store.has_changes(1)
+    
+    store.mark_flushed(changes)
+    assert store.take_changes([1]) == [(1, 5, 3)]
+
+
+@pytest.mark.asyncio
+async def test_wait_flushed():
+    store = WriteBehindCartStore(max_carts=10)
+    loader = FakeLoader({})
+    await store.get(1, loader.for_user(1))
+    assert not store.has_changes(1)
+    await store.wait_flushed(1)
+    
+    store.set(1, 5, 2)
+    changes = store.take_changes()
+    waiter = asyncio.create_task(store.wait_flushed(1))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    store.mark_flushed(changes)
+    await waiter
+    assert not store.has_changes(1)
+
+
+@pytest.mark.asyncio
+async def test_correct_keeps_newer_changes():
+    """Урезанная при записи позиция меняется в памяти, только если ее не меняли во время записи"""
+    store = WriteBehindCartStore(max_carts=10)
+    loader = FakeLoader({1: {5: 4, 6: 1}})
+    await get(store, loader, 1)
+    store.set(1, 5, 9)
+    store.set(1, 6, 3)
+    changes = store.take_changes()
+    store.set(1, 6, 2)
+    
+    store.correct(1, 5, 9, 4)
+    store.correct(1, 6, 3, 1)
+    store.mark_flushed(changes)
+    assert await get(store, loader, 1) == {5: 4, 6: 2}
+    assert store.take_changes() == [(1, 6, 2)]
+
+
+@pytest.mark.asyncio
+async def test_write_back_clamps_lines_without_stock(session_factory, monkeypatch, caplog):
+    """Позиция, под которую не хватает товара, урезается до удержанного - в БД и в памяти"""
+    store = WriteBehindCartStore(max_carts=10)
+    monkeypatch.setattr(cart_service, "cart_store", store)
+    async with DBManager(session_factory=session_factory) as db:
+        service = CartService(db)
+        await service.add_item(1, CartItemAdd(item_id=1, quantity=2))
+        await service.add_item(2, CartItemAdd(item_id=1, quantity=5))
+        # Позиция, удержание которой истекло и снято, а товар разобрали
+        await db.cart_items.apply_changes([(1, 3, 1)])
+        await db.commit()
+        await service.add_item(2, CartItemAdd(item_id=3, quantity=10))
+        
+        await service.update_item(1, 1, 9)
+        await service.update_item(1, 3, 2)
+        with caplog.at_level(logging.WARNING, logger="app.services.cart"):
+            await cart_service.write_back(db, store.take_changes())
+        
+        assert await db.cart_items.get_quantities(1) == {1: 5}
+        assert await get(store, FakeLoader({}), 1) == {1: 5}
+        assert not store.has_changes(1)
+    assert len(caplog.records) == 2
+    
+    async with session_factory() as session:
+        holds = await session.execute(
+            select(StockReservationModel.user_id, StockReservationModel.item_id, StockReservationModel.quantity)
+        )
+        assert sorted(holds.all()) == [(1, 1, 5), (2, 1, 5), (2, 3, 10)]
+        reserved = await session.execute(select(ItemModel.id, ItemModel.reserved_quantity))
+        assert dict(reserved.all()) == {1: 10, 2: 0, 3: 10}
+        lines = await session.execute(select(CartItemModel.user_id, CartItemModel.item_id))
+        assert sorted(lines.all()) == [(1, 1), (2, 1), (2, 3)]
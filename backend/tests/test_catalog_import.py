@@ -0,0 +1,44 @@
+import io
+
+from app.schemes.items import ItemCreate
+from app.utils.catalog_import import batched, detect_format, iter_import_rows
+from app.utils.export import csv_chunk, ndjson_chunk
+
+ITEM = {
+    "id": 7,
+    "name": 'Ноутбук 15", серый',
+    "sku": "NB-15",
+    "price": 59990,
+    "discount_price": None,
+    "quantity": 3,
+    "category_id": 2,
+    "brand_id": 5,
+    "category_name": "Ноутбуки",
+    "specifications": [],
+}
+
+
+def test_export_can_be_imported_back():
+    """Выгрузка читается импортом; лишние колонки и пустые ячейки не мешают"""
+    ndjson = io.StringIO(ndjson_chunk([ITEM]).decode())
+    csv_body = io.StringIO((csv_chunk([], header=True) + csv_chunk([ITEM])).decode(), newline="")
+    
+    for stream, import_format in ((ndjson, "ndjson"), (csv_body, "csv")):
+        (row_number, data), = iter_import_rows(stream, import_format)
+        item = ItemCreate.model_validate(data)
+        
+        assert row_number == (1 if import_format == "ndjson" else 2)
+        assert (item.sku, item.price, item.discount_price) == ("NB-15", 59990, None)
+
+
+def test_broken_lines_are_reported_with_line_numbers():
+    """Неразобранная строка возвращается как None, пустые строки пропускаются"""
+    stream = io.StringIO('{"sku": "A"}\n\nnot json\n[1, 2]\n')
+    
+    assert list(iter_import_rows(stream, "ndjson")) == [(1, {"sku": "A"}), (3, None), (4, None)]
+
+
+def test_batched_and_detect_format():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert detect_format("Catalog.CSV") == "csv"
+    assert detect_format("catalog.ndjson") == detect_format(None) == "ndjson"
@@ -0,0 +1,188 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from sqlalchemy import update
+
+import app.services.items as items_service
+from app.database.db_manager import DBManager
+from app.models.items import ItemModel
+from app.schemes.items import ItemSearchParams
+from app.services.items import ItemsService, search_cache
+from app.utils.catalog_snapshot import NO_DISCOUNT, CatalogSnapshot
+
+
+def make_rows(count: int) -> list[tuple]:
+    """Строки в формате ItemsRepository.snapshot_rows с повторами ключей"""
+    rng = random.Random(7)
+    base = datetime(2025, 1, 1)
+    return [
+        (
+            item_id,
+            rng.choice([100, 200, 300]),
+            rng.choice([None, 90]),
+            rng.choice([0, 3]),
+            rng.randint(1, 3),
+            rng.randint(1, 3),
+            base + timedelta(minutes=rng.randint(0, 20)),
+            rng.choice([0.0, 3.5, 4.25, 5.0]),
+            base,
+        )
+        for item_id in rng.sample(range(1, 1000), count)
+    ]
+
+
+def make_snapshot(rows: list[tuple]) -> CatalogSnapshot:
+    snapshot = CatalogSnapshot(full_reload_interval=600, overlap=60)
+    snapshot._columns = snapshot._build_columns(rows)
+    return snapshot
+
+
+def reference(rows, filters):
+    """Ожидаемый результат: фильтрация и сортировка в Python"""
+    column = {"price": 1, "created_at": 6, "rating": 7}[filters["sort_by"]]
+    matched = [
+        row for row in rows
+        if (not filters.get("category_id") or row[4] == filters["category_id"])
+        and (not filters.get("min_price") or row[1] >= filters["min_price"])
+        and (not filters.get("in_stock") or row[3] > 0)
+    ]
+    matched.sort(key=lambda row: (row[column], row[0]), reverse=filters["sort_order"] == "desc")
+    return [row[0] for row in matched]
+
+
+@pytest.mark.parametrize("sort_by", ["price", "created_at", "rating"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_pages_match_reference(sort_by, sort_order):
+    """Страницы по offset и по keyset совпадают с сортировкой в Python"""
+    rows = make_rows(200)
+    snapshot = make_snapshot(rows)
+    filters = {"sort_by": sort_by, "sort_order": sort_order, "min_price": 150, "in_stock": True}
+    expected = reference(rows, filters)
+    
+    ids, _, total = snapshot.search(filters, limit=7, offset=14)
+    assert ids == expected[14:21]
+    assert total == len(expected)
+    
+    collected, after = [], None
+    while True:
+        ids, keys, _ = snapshot.search(filters, limit=9, after=after)
+        if not ids:
+            break
+        collected += ids
+        after = (keys[-1], ids[-1])
+    assert collected == expected
+
+
+def test_category_subtree_filter():
+    """category_ids отбирает товары всех перечисленных категорий"""
+    rows = make_rows(100)
+    snapshot = make_snapshot(rows)
+    filters = {"sort_by": "price", "sort_order": "asc", "category_id": 1, "category_ids": [1, 3]}
+    
+    ids, _, total = snapshot.search(filters, limit=100)
+    
+    assert sorted(ids) == sorted(row[0] for row in rows if row[4] in (1, 3))
+    assert total == len(ids)
+
+
+def test_upsert_and_remove():
+    """Измененные строки обновляются, новые добавляются, удаленные исчезают"""
+    rows = make_rows(50)
+    snapshot = make_snapshot(rows)
+    changed = (rows[0][0], 999, *rows[0][2:])
+    added = (5000, 150, None, 1, 1, 1, datetime(2025, 2, 1), 0.0, datetime(2025, 2, 1))
+    snapshot._columns = snapshot._upserted(snapshot._columns, [changed, added])
+    snapshot.remove([rows[1][0]])
+    filters = {"sort_by": "price", "sort_order": "desc"}
+    
+    ids, keys, total = snapshot.search(filters, limit=1)
+    assert (ids, keys) == ([rows[0][0]], [999])
+    assert total == 50
+    assert 5000 in snapshot.search(filters, limit=100)[0]
+    assert rows[1][0] not in snapshot.search(filters, limit=100)[0]
+    discounts = dict(zip(snapshot._columns["id"].tolist(), snapshot._columns["discount_price"].tolist()))
+    assert discounts[5000] == NO_DISCOUNT
+    assert discounts[rows[0][0]] == (rows[0][2] or NO_DISCOUNT)
+
+
+def test_text_search_is_not_supported():
+    """Поиск по строке и сортировка по названию выполняются SQL-запросом"""
+    assert CatalogSnapshot.supports({"sort_by": "price"})
+    assert CatalogSnapshot.supports({"sort_by": "price", "name": " ,, "})
+    assert not CatalogSnapshot.supports({"sort_by": "price", "name": "ноутбук"})
+    assert not CatalogSnapshot.supports({"sort_by": "name"})
+
+
+class FakeRepository:
+    """snapshot_rows по updated_at; чтение ждет события blocked, если оно задано"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.blocked: asyncio.Event | None = None
+    
+    async def snapshot_rows(self, updated_since=None):
+        if self.blocked is not None:
+            await self.blocked.wait()
+        return [row for row in self.rows if updated_since is None or row[-1] >= updated_since]
+
+
+@pytest.mark.asyncio
+async def test_refresh_swaps_columns():
+    """Обновление подменяет массивы целиком, удаленные во время обновления товары не возвращаются"""
+    rows = make_rows(30)
+    repository = FakeRepository(rows)
+    snapshot = CatalogSnapshot(full_reload_interval=600, overlap=60)
+    filters = {"sort_by": "price", "sort_order": "asc"}
+    assert not snapshot.is_current
+    await snapshot.refresh(repository)
+    assert snapshot.is_current
+    assert snapshot.search(filters, limit=100)[2] == 30
+    
+    repository.rows = rows + [(5000, 150, None, 1, 1, 1, datetime(2025, 2, 1), 0.0, datetime(2025, 2, 1))]
+    repository.blocked = asyncio.Event()
+    refresh = asyncio.create_task(snapshot.refresh(repository))
+    await asyncio.sleep(0)
+    snapshot.remove([rows[0][0]])
+    snapshot.mark_stale()
+    # Пока идет обновление, поиск читает прежние массивы
+    assert snapshot.search(filters, limit=100)[2] == 29
+    repository.blocked.set()
+    await refresh
+    
+    ids, _, total = snapshot.search(filters, limit=100)
+    assert total == 30
+    assert 5000 in ids and rows[0][0] not in ids
+    # Изменение во время обновления учтет только следующее обновление
+    assert not snapshot.is_current
+    repository.blocked = None
+    await snapshot.refresh(repository)
+    assert snapshot.is_current
+
+
+@pytest.mark.asyncio
+async def test_snapshot_page_matches_sql(session_factory, monkeypatch):
+    """Страница по снимку совпадает со страницей SQL-запроса, включая цены со скидкой"""
+    async with session_factory() as session:
+        await session.execute(update(ItemModel).filter_by(id=2).values(discount_price=800))
+        await session.commit()
+    params = ItemSearchParams(sort_by="price", sort_order="asc")
+    
+    pages = []
+    for snapshot in (None, CatalogSnapshot(full_reload_interval=600, overlap=60)):
+        monkeypatch.setattr(items_service, "catalog_snapshot", snapshot)
+        search_cache.clear()
+        async with DBManager(session_factory=session_factory) as db:
+            if snapshot is not None:
+                await snapshot.refresh(db.items)
+                assert list(snapshot._columns["discount_price"]) == [NO_DISCOUNT, 800, NO_DISCOUNT]
+            pages.append(await ItemsService(db).search_items(params, per_page=2))
+    
+    sql_page, snapshot_page = pages
+    assert snapshot_page == sql_page
+    assert [item.discount_price for item in sql_page["items"]] == [None, 800]
+
@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import select
+
+from app.database.db_manager import DBManager
+from app.models.checkout_requests import CheckoutRequestModel
+from app.models.items import ItemModel
+from app.models.orders import OrderModel
+from app.models.reservations import StockReservationModel
+from app.schemes.cart import CartItemAdd
+from app.schemes.orders import OrderCreate
+from app.services.cart import CartService
+from app.services.orders import OrdersService
+
+ORDER = OrderCreate(
+    shipping_address="ул. Тестовая, 1",
+    contact_phone="+79990000000",
+    items=[{"item_id": 1, "quantity": 1}],
+)
+
+
+async def add_to_cart(session_factory, user_id: int, item_id: int, quantity: int) -> None:
+    async with DBManager(session_factory=session_factory) as db:
+        await CartService(db).add_item(user_id, CartItemAdd(item_id=item_id, quantity=quantity))
+
+
+async def enqueue(session_factory, user_id: int) -> int:
+    async with DBManager(session_factory=session_factory) as db:
+        return await OrdersService(db).enqueue_order(user_id, ORDER)
+
+
+async def process(session_factory) -> int:
+    async with DBManager(session_factory=session_factory) as db:
+        return await OrdersService(db).process_checkout_batch(batch_size=10)
+
+
+async def state(session_factory):
+    """(остаток, удержано) товаров, удержания (покупатель, товар, заявка) и статусы заявок"""
+    async with session_factory() as session:
+        stock = (await session.execute(
+            select(ItemModel.id, ItemModel.quantity, ItemModel.reserved_quantity).order_by(ItemModel.id)
+        )).all()
+        holds = (await session.execute(select(
+            StockReservationModel.user_id, StockReservationModel.item_id,
+            StockReservationModel.checkout_request_id, StockReservationModel.quantity,
+        ))).all()
+        requests = (await session.execute(
+            select(CheckoutRequestModel.id, CheckoutRequestModel.status).order_by(CheckoutRequestModel.id)
+        )).all()
+    return (
+        {item_id: (quantity, reserved) for item_id, quantity, reserved in stock},
+        {(user_id, item_id, request_id): quantity for user_id, item_id, request_id, quantity in holds},
+        [tuple(row) for row in requests],
+    )
+
+
+@pytest.mark.asyncio
+async def test_queued_request_is_fulfilled(session_factory):
+    await add_to_cart(session_factory, 1, 1, 3)
+    await add_to_cart(session_factory, 1, 2, 2)
+    request_id = await enqueue(session_factory, 1)
+    stock, holds, requests = await state(session_factory)
+    assert holds == {(1, 1, request_id): 3, (1, 2, request_id): 2}
+    assert stock[1] == (10, 3)
+
+    assert await process(session_factory) == 1
+    stock, holds, requests = await state(session_factory)
+    assert stock == {1: (7, 0), 2: (8, 0), 3: (10, 0)}
+    assert holds == {}
+    assert requests == [(request_id, "done")]
+
+
+@pytest.mark.asyncio
+async def test_new_cart_keeps_queued_holds(session_factory):
+    """Товар из заявки, добавленный в новую корзину, удерживается отдельно от заявки"""
+    await add_to_cart(session_factory, 1, 1, 3)
+    request_id = await enqueue(session_factory, 1)
+    await add_to_cart(session_factory, 1, 1, 2)
+    stock, holds, _ = await state(session_factory)
+    assert holds == {(1, 1, request_id): 3, (1, 1, None): 2}
+    assert stock[1] == (10, 5)
+
+    await process(session_factory)
+    stock, holds, requests = await state(session_factory)
+    assert stock[1] == (7, 2)
+    assert holds == {(1, 1, None): 2}
+    assert requests == [(request_id, "done")]
+
+
+@pytest.mark.asyncio
+async def test_request_fails_without_stock(session_factory):
+    """Заявка, которой не хватило товара, получает статус failed, ее удержания снимаются"""
+    await add_to_cart(session_factory, 1, 1, 6)
+    await add_to_cart(session_factory, 2, 1, 4)
+    await add_to_cart(session_factory, 2, 2, 1)
+    first = await enqueue(session_factory, 1)
+    second = await enqueue(session_factory, 2)
+    # Продавец списал часть остатка мимо удержаний: на обе заявки не хватает,
+    # первой заявке доступно только не удержанное второй
+    async with session_factory() as session:
+        item = await session.get(ItemModel, 1)
+        item.quantity = 6
+        await session.commit()
+
+    assert await process(session_factory) == 2
+    stock, holds, requests = await state(session_factory)
+    assert requests == [(first, "failed"), (second, "done")]
+    assert stock == {1: (2, 0), 2: (9, 0), 3: (10, 0)}
+    assert holds == {}
+    async with session_factory() as session:
+        orders = (await session.execute(select(OrderModel.user_id))).scalars().all()
+    assert orders == [2]
@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.database import retry
+from app.database.retry import backoff_delay, is_retryable, run_with_retry
+
+
+class FakeDriverError(Exception):
+    def __init__(self, message: str, sqlstate: str | None = None):
+        super().__init__(message)
+        self.sqlstate = sqlstate
+
+
+def db_error(message: str, sqlstate: str | None = None) -> DBAPIError:
+    return DBAPIError("UPDATE items ...", {}, FakeDriverError(message, sqlstate))
+
+
+class FakeDB:
+    def __init__(self):
+        self.rollbacks = 0
+    
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+class FlakyOperation:
+    """Падает переданными ошибками, затем возвращает результат"""
+    
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    async def sleep(delay):
+        pass
+    monkeypatch.setattr(retry.asyncio, "sleep", sleep)
+
+
+def test_is_retryable():
+    assert is_retryable(db_error("deadlock detected", "40P01"))
+    assert is_retryable(db_error("could not serialize access", "40001"))
+    assert is_retryable(db_error("database is locked"))
+    assert not is_retryable(db_error("duplicate key value", "23505"))
+
+
+def test_backoff_delay_is_bounded():
+    for attempt in range(1, 10):
+        delay = backoff_delay(attempt, base_delay=0.01, max_delay=0.1)
+        assert 0 <= delay <= min(0.1, 0.01 * 2 ** (attempt - 1))
+
+
+@pytest.mark.asyncio
+async def test_conflicts_are_retried_after_rollback():
+    db = FakeDB()
+    operation = FlakyOperation(db_error("deadlock detected", "40P01"), db_error("serialize", "40001"))
+    
+    assert await run_with_retry(db, operation, attempts=5, base_delay=0.01, max_delay=0.1) == "ok"
+    assert operation.calls == 3
+    assert db.rollbacks == 2
+
+
+@pytest.mark.asyncio
+async def test_attempts_are_bounded():
+    db = FakeDB()
+    operation = FlakyOperation(*[db_error("deadlock detected", "40P01")] * 3)
+    
+    with pytest.raises(DBAPIError):
+        await run_with_retry(db, operation, attempts=3, base_delay=0.01, max_delay=0.1)
+    assert operation.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_other_errors_are_not_retried():
+    db = FakeDB()
+    operation = FlakyOperation(db_error("duplicate key value", "23505"))
+    
+    with pytest.raises(DBAPIError):
+        await run_with_retry(db, operation, attempts=5, base_delay=0.01, max_delay=0.1)
+    assert operation.calls == 1
+    assert db.rollbacks == 1
+    
+    operation = FlakyOperation(ValueError("Корзина пуста"))
+    with pytest.raises(ValueError):
+        await run_with_retry(db, operation, attempts=5, base_delay=0.01, max_delay=0.1)
+    assert operation.calls == 1
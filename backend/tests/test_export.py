@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database.db_manager import DBManager
+from app.models.specification_types import SpecificationTypeModel
+from app.models.specifications import SpecificationModel
+from app.services.items import ItemsService
+from app.utils.export import CSV_COLUMNS, csv_chunk, ndjson_chunk
+
+ITEM = {
+    "id": 7,
+    "name": 'Ноутбук 15", серый',
+    "price": 59990,
+    "created_at": datetime(2025, 1, 2, 3, 4, 5),
+    "category_name": "Ноутбуки",
+    "specifications": [
+        {"name": "RAM", "value": "16 ГБ", "unit": "ГБ", "numeric_value": 16.0},
+        {"name": "Цвет", "value": "серый", "unit": None, "numeric_value": None},
+    ],
+}
+
+
+def test_ndjson_has_one_object_per_line():
+    """Каждый товар - отдельная строка JSON"""
+    lines = ndjson_chunk([ITEM, {**ITEM, "id": 8}]).decode().splitlines()
+    
+    assert [json.loads(line)["id"] for line in lines] == [7, 8]
+    assert json.loads(lines[0])["specifications"][0]["numeric_value"] == 16.0
+    assert json.loads(lines[0])["created_at"] == "2025-01-02T03:04:05"
+
+
+def test_csv_quotes_values_and_packs_specifications():
+    """Запятые и кавычки экранируются, характеристики - объект JSON в одной колонке"""
+    body = csv_chunk([], header=True) + csv_chunk([ITEM])
+    
+    rows = list(csv.DictReader(io.StringIO(body.decode())))
+    
+    assert list(rows[0].keys()) == list(CSV_COLUMNS)
+    assert rows[0]["name"] == 'Ноутбук 15", серый'
+    assert rows[0]["created_at"] == "2025-01-02T03:04:05"
+    assert json.loads(rows[0]["specifications"]) == {"RAM": "16 ГБ", "Цвет": "серый"}
+    assert rows[0]["discount_price"] == ""
+
+
+async def export(session_factory, export_format: str, after_id: int | None = None) -> list[bytes]:
+    async with DBManager(session_factory=session_factory) as db:
+        return [chunk async for chunk in ItemsService(db).export_items(export_format, after_id)]
+
+
+@pytest.mark.asyncio
+async def test_export_streams_chunks_and_resumes(session_factory, monkeypatch):
+    """Каталог выгружается пачками по EXPORT_CHUNK_SIZE и продолжается после after_id"""
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 2)
+    async with session_factory() as session:
+        await session.execute(
+            insert(SpecificationTypeModel).values(id=1, name="RAM", unit="ГБ", category_id=1)
+        )
+        await session.execute(insert(SpecificationModel), [
+            {"item_id": 3, "specification_type_id": 1, "value": "16 ГБ", "numeric_value": 16},
+        ])
+        await session.commit()
+
+    chunks = await export(session_factory, "ndjson")
+    assert [len(chunk.decode().splitlines()) for chunk in chunks] == [2, 1]
+    items = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert [(item["id"], item["category_name"], item["brand_name"]) for item in items] == [
+        (1, "Категория", "Бренд"), (2, "Категория", "Бренд"), (3, "Категория", "Бренд"),
+    ]
+    assert items[0]["specifications"] == []
+    assert items[2]["specifications"] == [
+        {"name": "RAM", "value": "16 ГБ", "unit": "ГБ", "numeric_value": 16.0},
+    ]
+    assert "search_vector" not in items[0]
+
+    # Продолжение после обрыва: товары после последнего полученного id
+    resumed = await export(session_factory, "ndjson", after_id=2)
+    assert [json.loads(line)["id"] for chunk in resumed for line in chunk.decode().splitlines()] == [3]
+    assert await export(session_factory, "ndjson", after_id=3) == []
+
+    chunks = await export(session_factory, "csv", after_id=1)
+    assert len(chunks) == 2
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["id"] for row in rows] == ["2", "3"]
+    assert json.loads(rows[1]["specifications"]) == {"RAM": "16 ГБ"}
+
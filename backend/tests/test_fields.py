@@ -0,0 +1,34 @@
+import pytest
+
+from app.exceptions.base import InvalidFieldsError
+from app.utils.fields import resolve_fields
+
+VIEWS = {"card": ("name", "price"), "full": None}
+ALLOWED = ("id", "name", "price", "created_at", "description")
+
+
+def test_no_fields_and_no_view_means_full_response():
+    """Без fields и view, как и с view=full, отдается полный ответ"""
+    assert resolve_fields(None, None, VIEWS, ALLOWED) is None
+    assert resolve_fields(None, "full", VIEWS, ALLOWED) is None
+
+
+def test_view_adds_required_fields_first():
+    """Обязательные поля добавляются в начало, повторы убираются"""
+    assert resolve_fields(None, "card", VIEWS, ALLOWED) == ("id", "name", "price")
+    assert resolve_fields(None, "card", VIEWS, ALLOWED, required=("id", "price")) == ("id", "price", "name")
+
+
+def test_explicit_fields_take_precedence_over_view():
+    """Явный список полей важнее представления"""
+    assert resolve_fields(" name , description", "card", VIEWS, ALLOWED) == ("id", "name", "description")
+
+
+@pytest.mark.parametrize(
+    "fields, view",
+    [("name,password", None), (" , ", None), (None, "tiny")],
+)
+def test_unknown_field_or_view_is_rejected(fields, view):
+    """Неизвестные поля, пустой список и неизвестное представление - ошибка"""
+    with pytest.raises(InvalidFieldsError):
+        resolve_fields(fields, view, VIEWS, ALLOWED)
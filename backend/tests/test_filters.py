@@ -0,0 +1,31 @@
+from app.utils.filters import filters_key, normalize_filters
+
+
+def test_equivalent_filters_share_key():
+    """Наборы фильтров, отбирающие одни и те же товары, дают один ключ"""
+    first = normalize_filters({
+        "name": "  Ноутбук, APPLE! ",
+        "brand_id": 2,
+        "min_price": 0,
+        "in_stock": False,
+        "sort_by": "price",
+    })
+    second = normalize_filters({"brand_id": 2, "name": "ноутбук apple", "max_price": None})
+    
+    assert first == {"name": "ноутбук apple", "brand_id": 2}
+    assert filters_key(first) == filters_key(second)
+
+
+def test_spec_filter_order_does_not_matter():
+    """Порядок и повторы фильтров по характеристикам не влияют на ключ"""
+    first = normalize_filters({"specs": [("RAM", ">=", 16.0), ("SSD", ">=", 512.0)]})
+    second = normalize_filters({"specs": [("SSD", ">=", 512.0), ("RAM", ">=", 16.0), ("RAM", ">=", 16.0)]})
+    
+    assert filters_key(first) == filters_key(second)
+
+
+def test_different_filters_have_different_keys():
+    """Значимые фильтры попадают в ключ"""
+    assert filters_key(normalize_filters({"category_id": 1})) != filters_key(
+        normalize_filters({"category_id": 1, "in_stock": True})
+    )
@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import delete, insert, update
+
+from app.database.db_manager import DBManager
+from app.models.brands import BrandModel
+from app.models.items import ItemModel
+
+ITEMS = [
+    # id, название, описание
+    (4, "Ноутбук Lenovo IdeaPad", "Тонкий и легкий"),
+    (5, "Игровой ноутбук ASUS", "Ноутбук для игр, ноутбук с подсветкой"),
+    (6, "Сумка для ноутбука", "Подходит для ноутбуков до 15 дюймов"),
+    (7, "Монитор Dell", "Подойдет к любому ноутбуку"),
+]
+
+
+async def add_items(session_factory) -> None:
+    async with session_factory() as session:
+        await session.execute(insert(ItemModel), [
+            {"id": item_id, "name": name, "description": description, "sku": f"FT-{item_id}",
+             "price": 1000, "quantity": 1, "category_id": 1, "brand_id": 1}
+            for item_id, name, description in ITEMS
+        ])
+        await session.commit()
+
+
+async def search(session_factory, text: str, sort_by: str = "price") -> list[int]:
+    """id найденных товаров: по релевансу - лучшие первыми, иначе по возрастанию id"""
+    async with DBManager(session_factory=session_factory) as db:
+        items, _ = await db.items.search_items(
+            {"name": text, "sort_by": sort_by, "sort_order": "desc" if sort_by == "relevance" else "asc"},
+            limit=50,
+        )
+    return [item.id for item in items]
+
+
+@pytest.mark.asyncio
+async def test_words_are_matched_as_prefixes(session_factory):
+    """Каждое слово строки ищется как префикс, все слова должны найтись"""
+    await add_items(session_factory)
+
+    assert await search(session_factory, "ноут") == [4, 5, 6, 7]
+    assert await search(session_factory, "Lenovo idea") == [4]
+    assert await search(session_factory, "ноутбук asus") == [5]
+    assert await search(session_factory, "lenovo asus") == []
+    # Артикул, бренд и описание тоже участвуют в поиске
+    assert await search(session_factory, "ft-6") == [6]
+    assert await search(session_factory, "бренд подсвет") == [5]
+    # Знаки препинания отбрасываются, а не ломают запрос
+    assert await search(session_factory, '"dell"*: (') == [7]
+
+
+@pytest.mark.asyncio
+async def test_name_matches_rank_above_description(session_factory):
+    """Совпадение в названии весит больше, чем в описании"""
+    await add_items(session_factory)
+
+    ranked = await search(session_factory, "ноутбук", sort_by="relevance")
+    assert sorted(ranked) == [4, 5, 6, 7]
+    assert set(ranked[:3]) == {4, 5, 6}
+    assert ranked[-1] == 7
+
+
+@pytest.mark.asyncio
+async def test_index_follows_item_changes(session_factory):
+    """Триггеры поддерживают поисковый индекс при вставке, изменении и удалении товаров"""
+    await add_items(session_factory)
+    async with session_factory() as session:
+        await session.execute(
+            update(ItemModel).filter_by(id=4).values(name="Планшет Lenovo Tab", description="Экран 11 дюймов")
+        )
+        await session.commit()
+    assert await search(session_factory, "idea") == []
+    assert await search(session_factory, "планшет") == [4]
+    assert await search(session_factory, "экран") == [4]
+
+    async with session_factory() as session:
+        await session.execute(delete(ItemModel).filter_by(id=5))
+        await session.commit()
+    assert await search(session_factory, "asus") == []
+    assert await search(session_factory, "ноутбук") == [6, 7]
+
+
+@pytest.mark.asyncio
+async def test_brand_rename_updates_index(session_factory):
+    """Переименование бренда меняет поиск по всем его товарам"""
+    await add_items(session_factory)
+    async with session_factory() as session:
+        await session.execute(insert(BrandModel).values(id=2, name="Apple"))
+        await session.execute(update(ItemModel).filter_by(id=7).values(brand_id=2))
+        await session.commit()
+    assert await search(session_factory, "apple") == [7]
+
+    async with session_factory() as session:
+        await session.execute(update(BrandModel).filter_by(id=1).values(name="Samsung"))
+        await session.commit()
+    assert await search(session_factory, "бренд") == []
+    assert await search(session_factory, "samsung") == [1, 2, 3, 4, 5, 6]
+    assert await search(session_factory, "samsung монитор") == []
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+import pytest
+from fastapi import Request, Response
+from sqlalchemy import update
+
+from app.database.db_manager import DBManager
+from app.models.items import ItemModel
+from app.schemes.cart import CartItemAdd
+from app.schemes.orders import OrderCreate
+from app.services.cart import CartService
+from app.services.items import ItemsService
+from app.services.orders import OrdersService
+from app.utils.http_cache import conditional_response, is_not_modified, make_etag
+
+UPDATED_AT = datetime(2025, 3, 1, 12, 30, 15, 123456)
+
+
+def make_request(**headers) -> Request:
+    raw_headers = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw_headers})
+
+
+def test_etag_depends_on_version():
+    """ETag меняется вместе с версией ресурса"""
+    assert make_etag("item", 1, UPDATED_AT) == make_etag("item", 1, UPDATED_AT)
+    assert make_etag("item", 1, UPDATED_AT) != make_etag("item", 2, UPDATED_AT)
+    assert make_etag("item", 1).startswith('W/"')
+
+
+def test_if_none_match():
+    """Совпадение ETag из списка, слабое сравнение и *"""
+    etag = make_etag("item", 1)
+    
+    assert is_not_modified(make_request(if_none_match=etag), etag)
+    assert is_not_modified(make_request(if_none_match=f'"other", {etag.removeprefix("W/")}'), etag)
+    assert is_not_modified(make_request(if_none_match="*"), etag)
+    assert not is_not_modified(make_request(if_none_match='W/"other"'), etag)
+    assert not is_not_modified(make_request(), etag)
+
+
+def test_if_modified_since_has_second_precision():
+    """Дата сравнивается с точностью до секунды, как в заголовке"""
+    etag = make_etag("item", 1)
+    
+    assert is_not_modified(make_request(if_modified_since="Sat, 01 Mar 2025 12:30:15 GMT"), etag, UPDATED_AT)
+    assert not is_not_modified(make_request(if_modified_since="Sat, 01 Mar 2025 12:30:14 GMT"), etag, UPDATED_AT)
+    assert not is_not_modified(make_request(if_modified_since="вчера"), etag, UPDATED_AT)
+    assert not is_not_modified(make_request(if_modified_since="Sat, 01 Mar 2025 12:30:15 GMT"), etag)
+
+
+def test_if_none_match_takes_precedence():
+    """При If-None-Match дата не проверяется"""
+    request = make_request(if_none_match='W/"other"', if_modified_since="Sat, 01 Mar 2025 12:30:15 GMT")
+    
+    assert not is_not_modified(request, make_etag("item", 1), UPDATED_AT)
+
+
+def test_conditional_response_sets_validators():
+    """Валидаторы выставляются и на обычный ответ, и на 304"""
+    etag = make_etag("item", 1)
+    response = Response()
+    
+    assert conditional_response(make_request(), response, etag, UPDATED_AT) is None
+    assert response.headers["etag"] == etag
+    assert response.headers["last-modified"] == "Sat, 01 Mar 2025 12:30:15 GMT"
+    
+    not_modified = conditional_response(make_request(if_none_match=etag), Response(), etag, UPDATED_AT)
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == etag
+
+
+async def catalog_version(session_factory) -> tuple:
+    async with DBManager(session_factory=session_factory) as db:
+        return await ItemsService(db).get_catalog_version()
+
+
+@pytest.mark.asyncio
+async def test_catalog_version_follows_stock_changes(session_factory):
+    """Версия списков читается из БД: ее меняют и заказы, и запись мимо процесса"""
+    async with session_factory() as session:
+        await session.execute(update(ItemModel).values(updated_at=UPDATED_AT))
+        await session.commit()
+    initial = await catalog_version(session_factory)
+    assert await catalog_version(session_factory) == initial
+
+    async with DBManager(session_factory=session_factory) as db:
+        await CartService(db).add_item(1, CartItemAdd(item_id=1, quantity=2))
+        await OrdersService(db).create_order(1, OrderCreate(
+            shipping_address="ул. Тестовая, 1",
+            contact_phone="+79990000000",
+            items=[{"item_id": 1, "quantity": 2}],
+        ))
+    ordered = await catalog_version(session_factory)
+    assert ordered != initial
+
+    # Изменение другим процессом - напрямую в БД
+    async with session_factory() as session:
+        await session.execute(
+            update(ItemModel).filter_by(id=2).values(price=900, updated_at=datetime(2030, 1, 1))
+        )
+        await session.commit()
+    assert await catalog_version(session_factory) not in (initial, ordered)
+
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api.idempotency import idempotent
+from app.config import settings
+from app.database.db_manager import DBManager
+from app.exceptions.idempotency import IdempotencyKeyInProgressHTTPError, IdempotencyKeyReusedHTTPError
+from app.models.cart import CartItemModel
+from app.models.idempotency_keys import IdempotencyKeyModel
+from app.schemes.cart import CartItemAdd
+from app.services.cart import CartService
+from app.services import idempotency
+from app.services.idempotency import IdempotencyService
+from app.utils.clock import utcnow
+
+REQUEST = SimpleNamespace(method="POST", url=SimpleNamespace(path="/cart/items"))
+
+
+async def add_to_cart(session_factory, key: str, quantity: int = 1, fail: Exception | None = None):
+    """Добавляет товар 1 в корзину покупателя 1 с ключом key; fail - ошибка после добавления"""
+    async with DBManager(session_factory=session_factory) as db:
+        async def handler():
+            await CartService(db).add_item(1, CartItemAdd(item_id=1, quantity=quantity))
+            if fail is not None:
+                raise fail
+            return {"status": "OK"}
+
+        return await idempotent(db, REQUEST, 1, key, {"item_id": 1, "quantity": quantity}, handler)
+
+
+async def cart_quantity(session_factory) -> int | None:
+    async with session_factory() as session:
+        result = await session.execute(select(CartItemModel.quantity).filter_by(user_id=1, item_id=1))
+        return result.scalar_one_or_none()
+
+
+async def stored_key(session_factory, key: str) -> IdempotencyKeyModel | None:
+    async with session_factory() as session:
+        result = await session.execute(select(IdempotencyKeyModel).filter_by(key=key))
+        return result.scalar_one_or_none()
+
+
+@pytest.mark.asyncio
+async def test_repeat_is_replayed(session_factory):
+    assert await add_to_cart(session_factory, "k1") == {"status": "OK"}
+    replay = await add_to_cart(session_factory, "k1")
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert await cart_quantity(session_factory) == 1
+
+    # Ответ хранится IDEMPOTENCY_KEY_TTL, а не срок аренды
+    record = await stored_key(session_factory, "k1")
+    assert record.status_code == 200
+    assert record.expires_at > utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LEASE_TTL)
+
+    with pytest.raises(IdempotencyKeyReusedHTTPError):
+        await add_to_cart(session_factory, "k1", quantity=2)
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_replayed_without_changes(session_factory):
+    with pytest.raises(HTTPException):
+        await add_to_cart(session_factory, "k1", fail=HTTPException(status_code=400, detail="Нет"))
+    assert await cart_quantity(session_factory) is None
+    replay = await add_to_cart(session_factory, "k1")
+    assert replay.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_failure_rolls_back_and_releases_key(session_factory):
+    """Сбой после коммита сервиса откатывает и изменения, и ключ: повтор выполняется заново"""
+    with pytest.raises(RuntimeError):
+        await add_to_cart(session_factory, "k1", fail=RuntimeError("сбой"))
+    assert await cart_quantity(session_factory) is None
+    assert await stored_key(session_factory, "k1") is None
+
+    assert await add_to_cart(session_factory, "k1") == {"status": "OK"}
+    assert await cart_quantity(session_factory) == 1
+
+
+@pytest.mark.asyncio
+async def test_lease_of_crashed_request_expires(session_factory, monkeypatch):
+    """Ключ запроса, упавшего до сохранения ответа, освобождается по истечении аренды"""
+    async with DBManager(session_factory=session_factory) as db:
+        lease = await IdempotencyService(db).begin(1, "k1", "POST /cart/items", {"item_id": 1, "quantity": 1})
+    with pytest.raises(IdempotencyKeyInProgressHTTPError):
+        await add_to_cart(session_factory, "k1")
+
+    later = utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LEASE_TTL + 1)
+    monkeypatch.setattr(idempotency, "utcnow", lambda: later)
+    assert await add_to_cart(session_factory, "k1") == {"status": "OK"}
+
+    # Опоздавший первый запрос не перезаписывает ответ занявшего ключ заново
+    async with DBManager(session_factory=session_factory) as db:
+        await IdempotencyService(db).complete(1, "k1", lease, 500, {"detail": "поздно"})
+    assert (await stored_key(session_factory, "k1")).status_code == 200
@@ -0,0 +1,184 @@
+import pytest
+from sqlalchemy import event, insert, select, update
+
+from app.database.db_manager import DBManager
+from app.exceptions.base import ObjectNotFoundError
+from app.models.cart import CartItemModel
+from app.models.items import ItemModel
+from app.models.order_items import OrderItemModel
+from app.models.orders import OrderModel, OrderStatus
+from app.models.reservations import StockReservationModel
+from app.schemes.cart import CartItemAdd
+from app.schemes.orders import OrderCreate
+from app.services.cart import CartService
+from app.services.orders import OrdersService
+
+ORDER = OrderCreate(
+    shipping_address="ул. Тестовая, 1",
+    contact_phone="+79990000000",
+    items=[{"item_id": 1, "quantity": 1}],
+)
+
+
+async def add_to_cart(session_factory, user_id: int, item_id: int, quantity: int) -> None:
+    async with DBManager(session_factory=session_factory) as db:
+        await CartService(db).add_item(user_id, CartItemAdd(item_id=item_id, quantity=quantity))
+
+
+async def create_order(session_factory, user_id: int) -> int:
+    async with DBManager(session_factory=session_factory) as db:
+        return await OrdersService(db).create_order(user_id, ORDER)
+
+
+async def stock(session_factory) -> list[tuple[int, int]]:
+    """(остаток, удержано) всех товаров по возрастанию id"""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(ItemModel.quantity, ItemModel.reserved_quantity).order_by(ItemModel.id)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def rows(session_factory, *columns) -> list[tuple]:
+    async with session_factory() as session:
+        result = await session.execute(select(*columns).order_by(*columns))
+        return [tuple(row) for row in result.all()]
+
+
+@pytest.mark.asyncio
+async def test_create_order_from_cart(session_factory):
+    """Заказ по цене продажи, списание остатков, пустая корзина и снятые удержания"""
+    async with session_factory() as session:
+        await session.execute(update(ItemModel).filter_by(id=2).values(discount_price=800))
+        await session.commit()
+    await add_to_cart(session_factory, 1, 1, 2)
+    await add_to_cart(session_factory, 1, 2, 3)
+    await add_to_cart(session_factory, 2, 1, 4)
+
+    order_id = await create_order(session_factory, 1)
+    assert await rows(session_factory, OrderModel.id, OrderModel.user_id, OrderModel.total_amount) == [
+        (order_id, 1, 2 * 1000 + 3 * 800),
+    ]
+    assert await rows(
+        session_factory, OrderItemModel.item_id, OrderItemModel.quantity, OrderItemModel.price_at_purchase
+    ) == [(1, 2, 1000), (2, 3, 800)]
+    assert await stock(session_factory) == [(8, 4), (7, 0), (10, 0)]
+    # Корзина и удержания другого покупателя не тронуты
+    assert await rows(session_factory, CartItemModel.user_id, CartItemModel.item_id) == [(2, 1)]
+    assert await rows(session_factory, StockReservationModel.user_id, StockReservationModel.quantity) == [
+        (2, 4),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_empty_cart(session_factory):
+    with pytest.raises(ValueError, match="Корзина пуста"):
+        await create_order(session_factory, 1)
+    assert await rows(session_factory, OrderModel.id) == []
+
+
+@pytest.mark.asyncio
+async def test_short_stock_changes_nothing(session_factory):
+    """Если одного товара не хватает, заказ не создается, остальное не списывается"""
+    await add_to_cart(session_factory, 1, 1, 2)
+    await add_to_cart(session_factory, 2, 2, 8)
+    # Удержание второго товара у покупателя истекло, позиция в корзине осталась
+    async with session_factory() as session:
+        await session.execute(insert(CartItemModel).values(user_id=1, item_id=2, quantity=3))
+        await session.commit()
+
+    with pytest.raises(ValueError, match="Доступно: 2, запрошено: 3"):
+        await create_order(session_factory, 1)
+    assert await rows(session_factory, OrderModel.id) == []
+    assert await stock(session_factory) == [(10, 2), (10, 8), (10, 0)]
+    assert await rows(session_factory, CartItemModel.user_id, CartItemModel.item_id) == [
+        (1, 1), (1, 2), (2, 2),
+    ]
+    assert await rows(session_factory, StockReservationModel.user_id, StockReservationModel.item_id) == [
+        (1, 1), (2, 2),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_statement_count_does_not_grow_with_cart(session_factory):
+    """Число запросов оформления не зависит от числа позиций в корзине"""
+    await add_to_cart(session_factory, 1, 1, 1)
+    for item_id in (1, 2, 3):
+        await add_to_cart(session_factory, 2, item_id, 1)
+
+    engine = session_factory.kw["bind"].sync_engine
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        counts = []
+        for user_id in (1, 2):
+            statements.clear()
+            await create_order(session_factory, user_id)
+            counts.append(len(statements))
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+    assert counts[0] == counts[1]
+
+
+async def order_statuses(session_factory) -> dict[int, OrderStatus]:
+    async with session_factory() as session:
+        result = await session.execute(select(OrderModel.id, OrderModel.status))
+        return dict(result.all())
+
+
+@pytest.mark.asyncio
+async def test_cancel_order_restocks(session_factory):
+    await add_to_cart(session_factory, 1, 1, 2)
+    await add_to_cart(session_factory, 1, 2, 3)
+    order_id = await create_order(session_factory, 1)
+
+    async with DBManager(session_factory=session_factory) as db:
+        await OrdersService(db).cancel_order(1, order_id)
+    assert await order_statuses(session_factory) == {order_id: OrderStatus.CANCELLED}
+    assert await stock(session_factory) == [(10, 0), (10, 0), (10, 0)]
+
+    # Повторная отмена не возвращает товар второй раз
+    async with DBManager(session_factory=session_factory) as db:
+        with pytest.raises(ValueError):
+            await OrdersService(db).cancel_order(1, order_id)
+        # Чужой заказ для покупателя не существует
+        with pytest.raises(ObjectNotFoundError):
+            await OrdersService(db).cancel_order(2, order_id)
+        with pytest.raises(ObjectNotFoundError):
+            await OrdersService(db).cancel_order(1, 42)
+    assert await stock(session_factory) == [(10, 0), (10, 0), (10, 0)]
+
+
+@pytest.mark.asyncio
+async def test_cancel_orders_in_bulk(session_factory):
+    """Массовая отмена возвращает товары по всем позициям и пропускает неотменяемые заказы"""
+    order_ids = []
+    for user_id, lines in ((1, [(1, 1), (2, 2)]), (2, [(1, 3)]), (3, [(3, 4)])):
+        for item_id, quantity in lines:
+            await add_to_cart(session_factory, user_id, item_id, quantity)
+        order_ids.append(await create_order(session_factory, user_id))
+    first, second, shipped = order_ids
+    async with session_factory() as session:
+        await session.execute(
+            update(OrderModel).filter_by(id=shipped).values(status=OrderStatus.SHIPPED)
+        )
+        await session.commit()
+    assert await stock(session_factory) == [(6, 0), (8, 0), (6, 0)]
+
+    async with DBManager(session_factory=session_factory) as db:
+        result = await OrdersService(db).cancel_orders([second, shipped, first, 42])
+    assert result == {"cancelled": sorted([first, second]), "skipped": sorted([shipped, 42])}
+    assert await order_statuses(session_factory) == {
+        first: OrderStatus.CANCELLED, second: OrderStatus.CANCELLED, shipped: OrderStatus.SHIPPED,
+    }
+    assert await stock(session_factory) == [(10, 0), (10, 0), (6, 0)]
+
+    async with DBManager(session_factory=session_factory) as db:
+        assert await OrdersService(db).cancel_orders([first, second]) == {
+            "cancelled": [], "skipped": sorted([first, second]),
+        }
+    assert await stock(session_factory) == [(10, 0), (10, 0), (6, 0)]
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app.database.db_manager import DBManager
+from app.exceptions.items import InvalidCursorError
+from app.models.items import ItemModel
+from app.schemes.items import ItemSearchParams
+from app.services.items import ItemsService, search_cache
+from app.utils.pagination import decode_cursor, encode_cursor
+
+# Цены добавленных товаров: много равных, у товаров из conftest цена 1000
+PRICES = [500, 1000, 1500, 500, 1000, 1500, 1000]
+
+
+@pytest.mark.parametrize("sort_by,key", [
+    ("price", 1999),
+    ("name", "Ноутбук Apple"),
+    ("created_at", datetime(2025, 5, 1, 12, 30, 15, 123456)),
+    ("rating", 4.333333333333333),
+])
+def test_cursor_roundtrip(sort_by, key):
+    """Курсор восстанавливает ключ сортировки и id без потерь"""
+    cursor = encode_cursor(sort_by, "desc", key, 42)
+    
+    assert decode_cursor(cursor, sort_by, "desc") == (key, 42)
+
+
+def test_cursor_for_other_sort_is_rejected():
+    """Курсор нельзя применить к другой сортировке"""
+    cursor = encode_cursor("price", "asc", 100, 1)
+    
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "price", "desc")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "name", "asc")
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "eyJzIjoicHJpY2UifQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    """Испорченный курсор приводит к InvalidCursorError"""
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "price", "asc")
+
+
+async def add_items(session_factory) -> dict[int, int]:
+    """Добавляет товары с повторяющимися ценами, возвращает цены всех товаров: id -> цена"""
+    async with session_factory() as session:
+        await session.execute(insert(ItemModel), [
+            {"name": f"Товар {i}", "sku": f"SKU-P{i}", "price": price, "quantity": 1,
+             "category_id": 1, "brand_id": 1}
+            for i, price in enumerate(PRICES)
+        ])
+        await session.commit()
+    search_cache.clear()
+    return {item_id: price for item_id, price in enumerate([1000] * 3 + PRICES, start=1)}
+
+
+async def search(session_factory, **kwargs) -> dict:
+    params = ItemSearchParams(**kwargs.pop("params", {}))
+    async with DBManager(session_factory=session_factory) as db:
+        return await ItemsService(db).search_items(params, **kwargs)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+async def test_cursor_pages_continue_across_equal_keys(session_factory, sort_order):
+    """Курсор продолжает выдачу без пропусков и повторов, когда значения сортировки совпадают"""
+    prices = await add_items(session_factory)
+    params = {"sort_by": "price", "sort_order": sort_order}
+
+    page = await search(session_factory, params=params, per_page=3)
+    ids = [item.id for item in page["items"]]
+    while page["pagination"]["next_cursor"]:
+        cursor = page["pagination"]["next_cursor"]
+        page = await search(session_factory, params=params, per_page=3, cursor=cursor)
+        assert len(page["items"]) <= 3
+        ids.extend(item.id for item in page["items"])
+
+    expected = sorted(prices, key=lambda item_id: (prices[item_id], item_id), reverse=sort_order == "desc")
+    assert ids == expected
+
+
+@pytest.mark.asyncio
+async def test_total_on_last_and_empty_pages(session_factory):
+    """Общее количество приходит и на последней странице, и за пределами выдачи"""
+    await add_items(session_factory)
+
+    last = await search(session_factory, page=3, per_page=4)
+    assert len(last["items"]) == 2
+    assert (last["pagination"]["total"], last["pagination"]["total_pages"]) == (10, 3)
+    assert last["pagination"]["next_cursor"] is None
+
+    beyond = await search(session_factory, page=5, per_page=4)
+    assert beyond["items"] == []
+    assert (beyond["pagination"]["total"], beyond["pagination"]["total_pages"]) == (10, 3)
+
+    filtered = await search(session_factory, params={"min_price": 1200}, page=1, per_page=4)
+    assert [item.price for item in filtered["items"]] == [1500, 1500]
+    assert filtered["pagination"]["total"] == 2
+
+    nothing = await search(session_factory, params={"min_price": 5000}, page=1, per_page=4)
+    assert nothing["items"] == []
+    assert (nothing["pagination"]["total"], nothing["pagination"]["total_pages"]) == (0, 0)
+
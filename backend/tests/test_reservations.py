@@ -0,0 +1,226 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.database.db_manager import DBManager
+from app.models.cart import CartItemModel
+from app.models.items import ItemModel
+from app.models.reservations import StockReservationModel
+from app.schemes.cart import CartItemAdd
+from app.schemes.items import ItemCreate, ItemSearchParams, ItemUpdate
+from app.schemes.orders import OrderCreate
+from app.services.cart import CartService
+from app.services.items import ItemsService, search_cache
+from app.services.orders import OrdersService
+from app.services.reservations import ReservationsService
+from app.utils.clock import utcnow
+
+
+async def stock(session_factory, item_id: int) -> tuple[int, int]:
+    """(остаток, удержано) товара"""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(ItemModel.quantity, ItemModel.reserved_quantity).filter_by(id=item_id)
+        )
+        return tuple(result.one())
+
+
+async def holds(session_factory) -> dict[tuple[int, int], int]:
+    """Все удержания: (покупатель, товар) -> количество"""
+    async with session_factory() as session:
+        result = await session.execute(select(
+            StockReservationModel.user_id, StockReservationModel.item_id, StockReservationModel.quantity
+        ))
+        return {(user_id, item_id): quantity for user_id, item_id, quantity in result.all()}
+
+
+async def hold(session_factory, user_id: int, item_id: int, quantity: int) -> None:
+    async with DBManager(session_factory=session_factory) as db:
+        await ReservationsService(db).hold(user_id, item_id, quantity, ttl=60)
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_holds_count_once(session_factory):
+    """Два одновременных первых удержания одного товара покупателем не удваивают reserved_quantity"""
+    await asyncio.gather(hold(session_factory, 1, 1, 3), hold(session_factory, 1, 1, 3))
+    assert await holds(session_factory) == {(1, 1): 3}
+    assert await stock(session_factory, 1) == (10, 3)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_reserved(session_factory):
+    await hold(session_factory, 1, 1, 3)
+    await hold(session_factory, 2, 1, 2)
+    async with session_factory() as session:
+        await session.execute(update(ItemModel).values(reserved_quantity=7))
+        await session.commit()
+
+    async with DBManager(session_factory=session_factory) as db:
+        assert await db.items.reconcile_reserved() == 3
+        await db.commit()
+    assert [await stock(session_factory, item_id) for item_id in (1, 2, 3)] == [
+        (10, 5), (10, 0), (10, 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stock_change_keeps_held_quantity(session_factory):
+    """Продавец не может списать остаток ниже удержанного в корзинах"""
+    await hold(session_factory, 1, 1, 6)
+    async with DBManager(session_factory=session_factory) as db:
+        with pytest.raises(ValueError):
+            await db.items.update_quantity(1, -5)
+        assert (await db.items.update_quantity(1, -4)).quantity == 6
+        await db.commit()
+    assert await stock(session_factory, 1) == (6, 6)
+
+
+@pytest.mark.asyncio
+async def test_item_update_keeps_held_quantity(session_factory):
+    await hold(session_factory, 1, 1, 6)
+    async with DBManager(session_factory=session_factory) as db:
+        with pytest.raises(ValueError):
+            await ItemsService(db).update_item(1, ItemUpdate(quantity=5))
+    assert await stock(session_factory, 1) == (10, 6)
+
+    async with DBManager(session_factory=session_factory) as db:
+        await ItemsService(db).update_item(1, ItemUpdate(quantity=6))
+    assert await stock(session_factory, 1) == (6, 6)
+
+
+@pytest.mark.asyncio
+async def test_import_keeps_held_quantity(session_factory):
+    """Импорт каталога не опускает остаток ниже удержанного, прочие поля обновляет"""
+    await hold(session_factory, 1, 1, 6)
+    rows = [
+        ItemCreate(name=f"Новый товар {i}", sku=f"SKU-{i}", price=500, quantity=2,
+                   category_id=1, brand_id=1)
+        for i in (1, 2)
+    ]
+    async with DBManager(session_factory=session_factory) as db:
+        assert await db.items.upsert_by_sku(rows) == (0, 2)
+        await db.commit()
+    assert await stock(session_factory, 1) == (6, 6)
+    assert await stock(session_factory, 2) == (2, 0)
+    async with session_factory() as session:
+        names = (await session.execute(select(ItemModel.name).order_by(ItemModel.id))).scalars().all()
+    assert names[:2] == ["Новый товар 1", "Новый товар 2"]
+
+
+async def cart(session_factory, user_id: int, action: str, *args) -> None:
+    """Действие CartService покупателя: add_item(item_id, quantity), update_item, remove_item, clear_cart"""
+    async with DBManager(session_factory=session_factory) as db:
+        service = CartService(db)
+        if action == "add_item":
+            item_id, quantity = args
+            await service.add_item(user_id, CartItemAdd(item_id=item_id, quantity=quantity))
+        else:
+            await getattr(service, action)(user_id, *args)
+
+
+@pytest.mark.asyncio
+async def test_hold_follows_cart_quantity(session_factory):
+    """Удержание меняется вместе с количеством в корзине, reserved_quantity - на разницу"""
+    await cart(session_factory, 1, "add_item", 1, 3)
+    await cart(session_factory, 1, "add_item", 1, 2)
+    assert await stock(session_factory, 1) == (10, 5)
+    await cart(session_factory, 1, "update_item", 1, 2)
+    await cart(session_factory, 2, "add_item", 1, 4)
+    assert await holds(session_factory) == {(1, 1): 2, (2, 1): 4}
+    assert await stock(session_factory, 1) == (10, 6)
+
+    # Покупателю доступно не удержанное другими плюс его собственное удержание
+    with pytest.raises(ValueError, match="Доступно: 8"):
+        await cart(session_factory, 2, "update_item", 1, 9)
+    await cart(session_factory, 2, "update_item", 1, 8)
+    assert await stock(session_factory, 1) == (10, 10)
+    with pytest.raises(ValueError):
+        await cart(session_factory, 3, "add_item", 1, 1)
+    assert await holds(session_factory) == {(1, 1): 2, (2, 1): 8}
+
+
+@pytest.mark.asyncio
+async def test_remove_and_clear_release_holds(session_factory):
+    await cart(session_factory, 1, "add_item", 1, 3)
+    await cart(session_factory, 1, "add_item", 2, 4)
+    await cart(session_factory, 2, "add_item", 2, 1)
+
+    await cart(session_factory, 1, "remove_item", 1)
+    assert await holds(session_factory) == {(1, 2): 4, (2, 2): 1}
+    assert [await stock(session_factory, item_id) for item_id in (1, 2)] == [(10, 0), (10, 5)]
+
+    await cart(session_factory, 1, "clear_cart")
+    assert await holds(session_factory) == {(2, 2): 1}
+    assert await stock(session_factory, 2) == (10, 1)
+
+
+@pytest.mark.asyncio
+async def test_sweeper_releases_expired_holds_in_batches(session_factory):
+    """Истекшие удержания снимаются пачками, каждая в своей транзакции; действующие остаются"""
+    for user_id in (1, 2, 3):
+        await hold(session_factory, user_id, 1, user_id)
+    await hold(session_factory, 1, 2, 5)
+    async with session_factory() as session:
+        await session.execute(
+            update(StockReservationModel)
+            .where(StockReservationModel.item_id == 1)
+            .values(expires_at=utcnow() - timedelta(seconds=1))
+        )
+        await session.commit()
+
+    async with DBManager(session_factory=session_factory) as db:
+        commits = 0
+        commit = db.commit
+
+        async def count_commit():
+            nonlocal commits
+            commits += 1
+            await commit()
+
+        db.commit = count_commit
+        assert await ReservationsService(db).release_expired(batch_size=2) == 3
+    assert commits == 2
+    assert await holds(session_factory) == {(1, 2): 5}
+    assert [await stock(session_factory, item_id) for item_id in (1, 2)] == [(10, 0), (10, 5)]
+
+
+@pytest.mark.asyncio
+async def test_checkout_keeps_other_buyers_holds(session_factory):
+    """Оформление не забирает товар, удержанный другими покупателями"""
+    order = OrderCreate(
+        shipping_address="ул. Тестовая, 1", contact_phone="+79990000000",
+        items=[{"item_id": 1, "quantity": 1}],
+    )
+    await cart(session_factory, 2, "add_item", 1, 8)
+    # Удержание первого покупателя истекло и снято, позиция в корзине осталась
+    async with session_factory() as session:
+        session.add(CartItemModel(user_id=1, item_id=1, quantity=3))
+        await session.commit()
+
+    async with DBManager(session_factory=session_factory) as db:
+        with pytest.raises(ValueError, match="Доступно: 2"):
+            await OrdersService(db).create_order(1, order)
+    assert await stock(session_factory, 1) == (10, 8)
+
+    async with DBManager(session_factory=session_factory) as db:
+        await OrdersService(db).create_order(2, order)
+    assert await stock(session_factory, 1) == (2, 0)
+    assert await holds(session_factory) == {}
+
+
+@pytest.mark.asyncio
+async def test_fully_held_item_is_not_in_stock(session_factory):
+    """Товар, весь остаток которого удержан в корзинах, не попадает в фильтр "в наличии" и его фасеты"""
+    await hold(session_factory, 1, 2, 10)
+    search_cache.clear()
+    params = ItemSearchParams(in_stock=True)
+    async with DBManager(session_factory=session_factory) as db:
+        page = await ItemsService(db).search_items(params)
+        facets = await ItemsService(db).get_facets(params)
+    
+    assert sorted(item.id for item in page["items"]) == [1, 3]
+    assert page["pagination"]["total"] == 2
+    assert [brand["count"] for brand in facets["brands"]] == [2]
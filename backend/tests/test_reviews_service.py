@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+from app.database.db_manager import DBManager
+from app.exceptions.base import ObjectNotFoundError
+from app.models.order_items import OrderItemModel
+from app.models.orders import OrderModel, OrderStatus
+from app.schemes.reviews import ReviewCreate, ReviewUpdate
+from app.services.reviews import ReviewsService
+
+ITEM_ID = 1
+
+
+async def deliver(session_factory, *user_ids: int) -> None:
+    """Доставленные заказы товара ITEM_ID: без покупки отзыв не оставить"""
+    async with session_factory() as session:
+        for user_id in user_ids:
+            order_id = (await session.execute(
+                insert(OrderModel).values(
+                    user_id=user_id, total_amount=1000, status=OrderStatus.DELIVERED,
+                    shipping_address="ул. Тестовая, 1", contact_phone="+79990000000",
+                ).returning(OrderModel.id)
+            )).scalar_one()
+            await session.execute(insert(OrderItemModel).values(
+                order_id=order_id, item_id=ITEM_ID, quantity=1, price_at_purchase=1000,
+            ))
+        await session.commit()
+
+
+async def create_review(session_factory, user_id: int, rating: int) -> int:
+    async with DBManager(session_factory=session_factory) as db:
+        review = await ReviewsService(db).create_review(
+            user_id, ReviewCreate(item_id=ITEM_ID, rating=rating, description="Отличный товар")
+        )
+    return review.id
+
+
+async def moderate(session_factory, review_id: int, status: str) -> None:
+    async with DBManager(session_factory=session_factory) as db:
+        await ReviewsService(db).moderate_review(review_id, status)
+
+
+async def rating(session_factory) -> tuple[float, int]:
+    async with DBManager(session_factory=session_factory) as db:
+        return await db.items.get_rating(ITEM_ID)
+
+
+async def reconcile(session_factory) -> int:
+    """Сколько товаров сверка исправила бы: 0 - агрегаты сошлись с отзывами"""
+    async with DBManager(session_factory=session_factory) as db:
+        return await db.items.reconcile_ratings()
+
+
+@pytest.mark.asyncio
+async def test_review_lifecycle_deltas(session_factory):
+    """Создание, модерация, правка и удаление отзывов меняют агрегаты товара"""
+    await deliver(session_factory, 1, 2)
+    first = await create_review(session_factory, 1, rating=5)
+    second = await create_review(session_factory, 2, rating=2)
+    # Отзывы на модерации в рейтинг не входят
+    assert await rating(session_factory) == (0.0, 0)
+
+    await moderate(session_factory, first, "approved")
+    await moderate(session_factory, second, "approved")
+    assert await rating(session_factory) == (3.5, 2)
+
+    async with DBManager(session_factory=session_factory) as db:
+        await ReviewsService(db).update_review(1, first, ReviewUpdate(rating=4))
+    assert await rating(session_factory) == (3.0, 2)
+
+    await moderate(session_factory, second, "rejected")
+    assert await rating(session_factory) == (4.0, 1)
+
+    async with DBManager(session_factory=session_factory) as db:
+        await ReviewsService(db).delete_review(1, first)
+    assert await rating(session_factory) == (0.0, 0)
+    assert await reconcile(session_factory) == 0
+
+
+@pytest.mark.asyncio
+async def test_edit_of_pending_review_keeps_aggregates(session_factory):
+    await deliver(session_factory, 1)
+    review_id = await create_review(session_factory, 1, rating=5)
+    async with DBManager(session_factory=session_factory) as db:
+        await ReviewsService(db).update_review(
+            1, review_id, ReviewUpdate(rating=1, description="Передумал, так себе")
+        )
+    assert await rating(session_factory) == (0.0, 0)
+
+    await moderate(session_factory, review_id, "approved")
+    assert await rating(session_factory) == (1.0, 1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_approvals_count_once(session_factory):
+    """Два одновременных одобрения одного отзыва добавляют его в рейтинг один раз"""
+    await deliver(session_factory, 1)
+    review_id = await create_review(session_factory, 1, rating=4)
+    await asyncio.gather(*(moderate(session_factory, review_id, "approved") for _ in range(2)))
+    assert await rating(session_factory) == (4.0, 1)
+    assert await reconcile(session_factory) == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_read_is_retried(session_factory):
+    """Если отзыв изменили после чтения, изменение агрегатов считается от нового состояния"""
+    await deliver(session_factory, 1)
+    review_id = await create_review(session_factory, 1, rating=4)
+    async with DBManager(session_factory=session_factory) as db:
+        stale = await db.reviews.get_one_or_none(id=review_id)
+    await moderate(session_factory, review_id, "approved")
+
+    async with DBManager(session_factory=session_factory) as db:
+        reads = []
+        get_one_or_none = db.reviews.get_one_or_none
+
+        async def read_stale_first(**filter_by):
+            reads.append(filter_by)
+            return stale if len(reads) == 1 else await get_one_or_none(**filter_by)
+
+        db.reviews.get_one_or_none = read_stale_first
+        await ReviewsService(db).moderate_review(review_id, "approved")
+
+    assert len(reads) == 2
+    assert await rating(session_factory) == (4.0, 1)
+
+
+@pytest.mark.asyncio
+async def test_missing_review(session_factory):
+    async with DBManager(session_factory=session_factory) as db:
+        with pytest.raises(ObjectNotFoundError):
+            await ReviewsService(db).moderate_review(42, "approved")
+        with pytest.raises(ObjectNotFoundError):
+            await ReviewsService(db).delete_review(1, 42)
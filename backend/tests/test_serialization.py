@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.utils.serialization import json_response, type_adapter
+
+
+class Brand(BaseModel):
+    id: int
+    name: str
+
+
+class Item(BaseModel):
+    id: int
+    brand: Brand
+    created_at: datetime
+    rating: float | None = None
+
+
+def test_models_are_serialized_like_fastapi():
+    """Вложенные схемы и даты кодируются так же, как ответом по умолчанию"""
+    item = Item(id=1, brand=Brand(id=2, name="Volt"), created_at=datetime(2025, 1, 2, 3, 4, 5, 6))
+    
+    response = json_response({"items": [item], "total": 1})
+    
+    assert json.loads(response.body) == {
+        "items": [{"id": 1, "brand": {"id": 2, "name": "Volt"}, "created_at": "2025-01-02T03:04:05.000006", "rating": None}],
+        "total": 1,
+    }
+    assert response.media_type == "application/json"
+
+
+def test_headers_are_taken_from_endpoint_response():
+    """Заголовки, выставленные эндпоинтом на Response, попадают в ответ"""
+    endpoint_response = Response()
+    del endpoint_response.headers["content-length"]
+    endpoint_response.headers["ETag"] = 'W/"1"'
+    
+    response = json_response([1, 2], endpoint_response)
+    
+    assert response.headers["etag"] == 'W/"1"'
+    assert response.headers["content-length"] == str(len(response.body))
+
+
+def test_type_adapter_is_cached():
+    """TypeAdapter для типа создается один раз"""
+    assert type_adapter(list[Item]) is type_adapter(list[Item])
+    
+    items = type_adapter(list[Item]).validate_python(
+        [{"id": 1, "brand": {"id": 1, "name": "Volt"}, "created_at": "2025-01-01T00:00:00"}]
+    )
+    assert items[0].brand.name == "Volt"
@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import insert, select
+
+from app.database.db_manager import DBManager
+from app.exceptions.items import InvalidSpecFilterError
+from app.models.specification_types import SpecificationTypeModel
+from app.models.specifications import SpecificationModel
+from app.schemes.specifications import SpecificationCreate, SpecificationUpdate
+from app.utils.spec_values import parse_numeric_value, parse_spec_filters
+
+
+@pytest.mark.parametrize("value,unit,expected", [
+    ("16", "ГБ", 16.0),
+    ("16 ГБ", "ГБ", 16.0),
+    ("1 ТБ", "ГБ", 1024.0),
+    ("512 MB", "ГБ", 0.5),
+    ("3200 МГц", "ГГц", 3.2),
+    ("2,5 кг", "г", 2500.0),
+    ("15.6 дюйма", None, 15.6),
+    ("16 ГБ", "ГГц", 16.0),
+    ("Intel Core i7-12700H", None, None),
+    ("", "ГБ", None),
+])
+def test_parse_numeric_value(value, unit, expected):
+    """Число приводится к единице типа характеристики, если единицы совместимы"""
+    result = parse_numeric_value(value, unit)
+    
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
+def test_parse_spec_filters():
+    """Фильтры разбираются в (тип, оператор, число)"""
+    assert parse_spec_filters(["RAM>=16", "Оперативная память <= 32,5", "12=4"]) == [
+        ("RAM", ">=", 16.0),
+        ("Оперативная память", "<=", 32.5),
+        ("12", "=", 4.0),
+    ]
+
+
+@pytest.mark.parametrize("expression", ["RAM", ">=16", "RAM>=много", "RAM=>16"])
+def test_invalid_spec_filter(expression):
+    with pytest.raises(InvalidSpecFilterError):
+        parse_spec_filters([expression])
+
+
+async def numeric_values(session_factory) -> dict[int, float | None]:
+    async with session_factory() as session:
+        result = await session.execute(select(SpecificationModel.id, SpecificationModel.numeric_value))
+        return dict(result.all())
+
+
+@pytest.mark.asyncio
+async def test_numeric_value_is_parsed_on_write(session_factory):
+    """Характеристики, записанные через репозиторий, сразу получают numeric_value"""
+    async with session_factory() as session:
+        await session.execute(insert(SpecificationTypeModel), [
+            {"id": 1, "name": "Оперативная память", "unit": "ГБ", "category_id": 1},
+            {"id": 2, "name": "Процессор", "unit": None, "category_id": 1},
+        ])
+        await session.commit()
+    
+    async with DBManager(session_factory=session_factory) as db:
+        spec = await db.specifications.add(
+            SpecificationCreate(value="1 ТБ", item_id=1, specification_type_id=1)
+        )
+        await db.specifications.add_bulk([
+            SpecificationCreate(value="512 MB", item_id=2, specification_type_id=1),
+            SpecificationCreate(value="Intel Core i7", item_id=2, specification_type_id=2),
+        ])
+        await db.commit()
+    assert spec.numeric_value == 1024.0
+    assert spec.specification_type.unit == "ГБ"
+    assert await numeric_values(session_factory) == {1: 1024.0, 2: 0.5, 3: None}
+    
+    async with DBManager(session_factory=session_factory) as db:
+        await db.specifications.edit(SpecificationUpdate(value="16 ГБ"), exclude_unset=True, id=1)
+        await db.specifications.edit(SpecificationUpdate(value="8"), exclude_unset=True, id=3)
+        await db.specifications.edit(SpecificationUpdate(value="Много"), exclude_unset=True, id=2)
+        await db.commit()
+    assert await numeric_values(session_factory) == {1: 16.0, 2: None, 3: 8.0}
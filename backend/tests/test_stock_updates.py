@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+
+from app.database.db_manager import DBManager
+from app.models.items import ItemModel
+
+
+async def stock(session_factory) -> list[tuple[int, int]]:
+    """(остаток, удержано) всех товаров по возрастанию id"""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(ItemModel.quantity, ItemModel.reserved_quantity).order_by(ItemModel.id)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def take(session_factory, changes: dict[int, int], respect_reserved: bool = True) -> dict[int, int]:
+    """Списание как при продаже: если изменены не все товары, транзакция откатывается"""
+    async with DBManager(session_factory=session_factory) as db:
+        updated = await db.items.update_quantities(changes, respect_reserved=respect_reserved)
+        if len(updated) == len(changes):
+            await db.commit()
+        return updated
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sales_never_take_reserved_stock(session_factory):
+    """Одновременные списания не опускают остаток ниже удержанного другими"""
+    async with session_factory() as session:
+        await session.execute(update(ItemModel).filter_by(id=1).values(reserved_quantity=2))
+        await session.commit()
+
+    results = await asyncio.gather(*(take(session_factory, {1: -3}) for _ in range(5)))
+    assert results.count({}) == 3
+    assert sorted(result[1] for result in results if result) == [4, 7]
+    assert await stock(session_factory) == [(4, 2), (10, 0), (10, 0)]
+
+
+@pytest.mark.asyncio
+async def test_floor_without_reservations_is_zero(session_factory):
+    async with session_factory() as session:
+        await session.execute(update(ItemModel).filter_by(id=1).values(reserved_quantity=8))
+        await session.commit()
+
+    assert await take(session_factory, {1: -11}, respect_reserved=False) == {}
+    assert await take(session_factory, {1: -10}, respect_reserved=False) == {1: 0}
+    assert await take(session_factory, {2: 5}, respect_reserved=False) == {2: 15}
+    assert await stock(session_factory) == [(0, 8), (15, 0), (10, 0)]
+
+
+@pytest.mark.asyncio
+async def test_short_item_is_left_out(session_factory):
+    """Нехватка одного товара видна по ответу, остальные изменения откатывает вызывающий"""
+    assert await take(session_factory, {1: -5, 2: -11, 3: -1}) == {1: 5, 3: 9}
+    assert await stock(session_factory) == [(10, 0), (10, 0), (10, 0)]
+    assert await take(session_factory, {3: -1, 1: -5}) == {1: 5, 3: 9}
+    assert await stock(session_factory) == [(5, 0), (10, 0), (9, 0)]
+
+
+@pytest.mark.asyncio
+async def test_rows_are_locked_in_id_order(session_factory):
+    """Строки товаров блокируются по возрастанию id независимо от порядка изменений"""
+    async with DBManager(session_factory=session_factory) as db:
+        statements = []
+        execute = db.items.session.execute
+
+        async def record(statement, *args, **kwargs):
+            statements.append(statement)
+            return await execute(statement, *args, **kwargs)
+
+        db.items.session.execute = record
+        await db.items.update_quantities({3: -1, 1: -1, 2: -1})
+
+    [statement] = statements
+    sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+    assert "WHERE items.id IN (SELECT items.id FROM items WHERE items.id IN (" in sql
+    assert "ORDER BY items.id FOR UPDATE)" in sql
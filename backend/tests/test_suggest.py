@@ -0,0 +1,154 @@
+import asyncio
+import random
+
+import pytest
+
+from app.utils.suggest import MAX_KEY_LENGTH, SuggestIndex, normalize
+
+
+class FakeRepository:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+        # Если задано, чтение ждет этого события
+        self.blocked: asyncio.Event | None = None
+    
+    async def get_names(self):
+        self.calls += 1
+        if self.blocked is not None:
+            await self.blocked.wait()
+        return self.rows
+
+
+class FakeDB:
+    def __init__(self, items=(), brands=(), categories=()):
+        self.items = FakeRepository(list(items))
+        self.brands = FakeRepository(list(brands))
+        self.categories = FakeRepository(list(categories))
+
+
+def make_index(items=(), brands=(), categories=()) -> SuggestIndex:
+    index = SuggestIndex()
+    index.load({"items": list(items), "brands": list(brands), "categories": list(categories)})
+    return index
+
+
+def names(suggestions: list[dict]) -> list[str]:
+    return [suggestion["name"] for suggestion in suggestions]
+
+
+def test_prefix_matches_any_word():
+    """Подсказка находится по началу любого слова названия"""
+    index = make_index(
+        items=[(1, "Apple iPhone 15"), (2, "Чехол для iPhone"), (3, "Samsung Galaxy")],
+        brands=[(1, "Apple")],
+    )
+    
+    result = index.suggest("iph", limit=10)
+    
+    assert sorted(names(result["items"])) == ["Apple iPhone 15", "Чехол для iPhone"]
+    assert result["brands"] == []
+    assert names(index.suggest("APP", limit=10)["brands"]) == ["Apple"]
+    assert names(index.suggest("iphone 1", limit=10)["items"]) == ["Apple iPhone 15"]
+
+
+def test_normalization_ignores_case_punctuation_and_yo():
+    """Регистр, знаки препинания и ё не влияют на поиск"""
+    index = make_index(categories=[(1, "Ёмкостные аккумуляторы")])
+    
+    assert normalize("  Wi-Fi  роутер!") == "wi fi роутер"
+    assert names(index.suggest("емк", limit=5)["categories"]) == ["Ёмкостные аккумуляторы"]
+    assert index.suggest("  !! ", limit=5) == {"items": [], "brands": [], "categories": []}
+
+
+def test_each_object_is_suggested_once_and_limit_applies():
+    """Объект с несколькими подходящими словами выдается один раз"""
+    index = make_index(items=[(1, "USB USB-C кабель"), (2, "USB хаб"), (3, "USB флешка")])
+    
+    assert len(index.suggest("usb", limit=10)["items"]) == 3
+    assert len(index.suggest("usb", limit=2)["items"]) == 2
+
+
+def test_add_update_and_remove():
+    """Изменения объектов сразу видны в подсказках"""
+    index = make_index(items=[(1, "Ноутбук ASUS"), (2, "Ноутбук Lenovo")])
+    
+    index.add("items", 3, "Ноутбук HP")
+    index.add("items", 1, "Планшет ASUS")
+    index.remove("items", 2)
+    index.remove("items", 42)
+    
+    assert names(index.suggest("ноут", limit=10)["items"]) == ["Ноутбук HP"]
+    assert names(index.suggest("asus", limit=10)["items"]) == ["Планшет ASUS"]
+    assert len(index) == 2
+
+
+def test_matches_brute_force_search():
+    """Результаты совпадают с перебором всех названий"""
+    rng = random.Random(5)
+    words = ["pro", "max", "mini", "power", "pad", "phone", "макс", "мини"]
+    index = make_index()
+    catalog = {}
+    for step in range(600):
+        item_id = rng.randint(1, 150)
+        if rng.random() < 0.2:
+            index.remove("items", item_id)
+            catalog.pop(item_id, None)
+        else:
+            name = " ".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+            index.add("items", item_id, name)
+            catalog[item_id] = name
+    
+    for prefix in ["p", "po", "pro ma", "мин", "pad phone", "x"]:
+        expected = {
+            item_id for item_id, name in catalog.items()
+            if any(" ".join(name.split()[start:]).startswith(prefix) for start in range(len(name.split())))
+        }
+        found = {suggestion["id"] for suggestion in index.suggest(prefix, limit=1000)["items"]}
+        assert found == expected
+
+
+def test_long_query_is_checked_against_full_name():
+    """Запрос длиннее ключа сверяется с полным названием"""
+    long_name = "a" * MAX_KEY_LENGTH + " first"
+    index = make_index(items=[(1, long_name), (2, "a" * MAX_KEY_LENGTH + " second")])
+    
+    assert names(index.suggest("a" * MAX_KEY_LENGTH + " f", limit=10)["items"]) == [long_name]
+
+
+@pytest.mark.asyncio
+async def test_reload_replaces_index():
+    """Индекс перечитывается из БД только перезагрузкой, подсказки БД не читают"""
+    index = SuggestIndex()
+    db = FakeDB(items=[(1, "Монитор")], brands=[(1, "Dell")])
+    
+    await index.reload(db)
+    assert names(index.suggest("del", limit=5)["brands"]) == ["Dell"]
+    assert names(index.suggest("мон", limit=5)["items"]) == ["Монитор"]
+    assert db.items.calls == 1
+    
+    db.items.rows = [(2, "Моноблок")]
+    await index.reload(db)
+    assert db.items.calls == 2
+    assert names(index.suggest("мон", limit=5)["items"]) == ["Моноблок"]
+
+
+@pytest.mark.asyncio
+async def test_changes_during_reload_are_kept():
+    """Изменения, сделанные пока перезагрузка читала БД, не теряются при подмене индекса"""
+    index = make_index(items=[(1, "Ноутбук ASUS"), (2, "Ноутбук Lenovo")])
+    db = FakeDB(items=[(1, "Ноутбук ASUS"), (2, "Ноутбук Lenovo")])
+    db.items.blocked = asyncio.Event()
+    
+    reload = asyncio.create_task(index.reload(db))
+    await asyncio.sleep(0)
+    index.add("items", 3, "Ноутбук HP")
+    index.remove("items", 2)
+    # Пока БД читается, подсказки отвечают по прежнему индексу
+    assert names(index.suggest("hp", limit=5)["items"]) == ["Ноутбук HP"]
+    db.items.blocked.set()
+    await reload
+    
+    assert sorted(names(index.suggest("ноут", limit=10)["items"])) == ["Ноутбук ASUS", "Ноутбук HP"]
+    index.add("items", 4, "Ноутбук Acer")
+    assert len(index) == 3
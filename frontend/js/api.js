@@ -10,6 +10,7 @@ const API_ENDPOINTS = {
     items: {
         list: '/items/',
         detail: (id) => `/items/${id}`,
+        batch: '/items/batch',
         search: '/items/'
     },
     categories: {
@@ -175,6 +176,12 @@ class VoltMarketAPI {
         return await this.request(API_ENDPOINTS.items.detail(id));
     }
 
+    // Несколько товаров одним запросом: { items, missing }
+    async getItemsBatch(ids) {
+        const queryParams = new URLSearchParams({ ids: ids.join(',') }).toString();
+        return await this.request(`${API_ENDPOINTS.items.batch}?${queryParams}`);
+    }
+
     // Категории
     async getCategories() {
         return await this.request(API_ENDPOINTS.categories.list);